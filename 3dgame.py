@@ -1,45 +1,126 @@
+import argparse
+import os
+import time
 import pygame
 from pygame.locals import *
-from OpenGL.GL import *
-from OpenGL.GLU import *
+
 import random
 import math
+import numpy as np
 
+from profiler import FrameProfiler, QualityGovernor
+from recording import FrameEncoder, Recorder, ReplayFile, new_seed, seed_rngs
+from simulation_thread import SimulationThread
 
-#ignore everything up to line 73, before that is just documentation stuff, prerequeists, barley written by me
 
-# Initialize Pygame
-pygame.init()
+#ignore everything up to line 73, before that is just documentation stuff, prerequeists, barley written by me
 
 # Screen dimensions
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 
+# Camera: perspective set up in init_gl, view set up every frame in main
+FOV_Y = 45.0
+NEAR_PLANE = 0.1
+FAR_PLANE = 100.0
+CAMERA_DISTANCE = 8.0
+CAMERA_TILT_AXIS = (1.0, 1.0, 0.0)
+CAMERA_TILT_RATE = 0.5  # degrees of tilt per degree of rotation_angle
+
 
 # I HAVE NO IDEA WHAT I'M DOING, BUT HERE'S SOME CODE,
 # Imma be honnest, I just copied snippests from a docs and made it work
 # only some parts, this is geniune code
-def init_gl():
-    """Initialize OpenGL settings"""
+# PyOpenGL's GL and GLU modules, set by load_gl
+gl = None
+glu = None
+
+def load_gl(offscreen=False):
+    """Import PyOpenGL's GL and GLU modules the first time a front end needs
+    them, so the simulation can be imported without GL"""
+    global gl, glu
+    if gl is not None:
+        return
+    # PyOpenGL picks its platform when it is first imported, so an offscreen
+    # run on a machine with no display has to ask for EGL before that
+    if offscreen and not os.environ.get("DISPLAY"):
+        os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+    from OpenGL import GL as gl, GLU as glu
+
+# From EGL_MESA_platform_surfaceless, which PyOpenGL doesn't define
+EGL_PLATFORM_SURFACELESS_MESA = 0x31DD
+
+def create_offscreen_context(width, height):
+    """Make a GL context current without showing a window
+
+    With PYOPENGL_PLATFORM=egl this is an EGL pbuffer, on Mesa's surfaceless
+    platform when there is no X11 or Wayland display (so it works on headless
+    machines without EGL_PLATFORM set, e.g. with llvmpipe); otherwise a hidden
+    pygame window. Either way frames are read back with glReadPixels.
+    """
+    if os.environ.get("PYOPENGL_PLATFORM") != "egl":
+        pygame.display.init()
+        pygame.display.set_mode((width, height), DOUBLEBUF | OPENGL | HIDDEN)
+        return
+
+    import ctypes
+    from OpenGL import EGL
+    display = EGL.EGL_NO_DISPLAY
+    if not os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY"):
+        # The default display goes through X11 or Wayland, which aren't
+        # there; Mesa's surfaceless platform needs neither
+        try:
+            display = EGL.eglGetPlatformDisplay(EGL_PLATFORM_SURFACELESS_MESA,
+                                                EGL.EGL_DEFAULT_DISPLAY, None)
+        except (AttributeError, EGL.EGLError):
+            pass  # EGL before 1.5, try the default display
+    if not display:
+        display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    if not display or not EGL.eglInitialize(display, None, None):
+        raise RuntimeError("could not initialise EGL for offscreen rendering")
+    attributes = (EGL.EGLint * 13)(
+        EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+        EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8,
+        EGL.EGL_DEPTH_SIZE, 24,
+        EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+        EGL.EGL_NONE)
+    config = EGL.EGLConfig()
+    found = EGL.EGLint()
+    EGL.eglChooseConfig(display, attributes, ctypes.pointer(config), 1, ctypes.pointer(found))
+    if not found.value:
+        raise RuntimeError("no EGL config for offscreen rendering")
+    surface = EGL.eglCreatePbufferSurface(
+        display, config, (EGL.EGLint * 5)(EGL.EGL_WIDTH, width, EGL.EGL_HEIGHT, height, EGL.EGL_NONE))
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+    EGL.eglMakeCurrent(display, surface, surface, context)
+
+def init_gl(offscreen=False):
+    """Initialize pygame (for a window) and OpenGL settings"""
+    load_gl(offscreen)
     # Set up the display
-    pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), DOUBLEBUF | OPENGL)
-    pygame.display.set_caption("3D Bouncing Balls")
+    if offscreen:
+        create_offscreen_context(SCREEN_WIDTH, SCREEN_HEIGHT)
+    else:
+        pygame.init()
+        pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), DOUBLEBUF | OPENGL)
+        pygame.display.set_caption("3D Bouncing Balls")
 
     # Set up perspective - copied from OpenGL tutorial
-    glMatrixMode(GL_PROJECTION)
-    glLoadIdentity()
-    gluPerspective(45.0, float(SCREEN_WIDTH)/float(SCREEN_HEIGHT), 0.1, 100.0)
+    gl.glMatrixMode(gl.GL_PROJECTION)
+    gl.glLoadIdentity()
+    glu.gluPerspective(FOV_Y, float(SCREEN_WIDTH)/float(SCREEN_HEIGHT), NEAR_PLANE, FAR_PLANE)
 
-    glMatrixMode(GL_MODELVIEW)
-    glLoadIdentity()
+    gl.glMatrixMode(gl.GL_MODELVIEW)
+    gl.glLoadIdentity()
 
     # Enable depth testing,
-    glEnable(GL_DEPTH_TEST)
-    glDepthFunc(GL_LEQUAL)
+    gl.glEnable(gl.GL_DEPTH_TEST)
+    gl.glDepthFunc(gl.GL_LEQUAL)
 
     # Lighting setup - this part from OpenGL docs
-    glEnable(GL_LIGHTING)
-    glEnable(GL_LIGHT0)
+    gl.glEnable(gl.GL_LIGHTING)
+    gl.glEnable(gl.GL_LIGHT0)
 
     # Set light properties,
     # why these values? I have no idea, they just work
@@ -51,21 +132,352 @@ def init_gl():
     # Diffuse light: main directional lighting that creates shadows (R, G, B, Alpha)
     light_diffuse = [0.8, 0.8, 0.8, 1.0]
 
-    glLightfv(GL_LIGHT0, GL_POSITION, light_pos)
-    glLightfv(GL_LIGHT0, GL_AMBIENT, light_ambient)
-    glLightfv(GL_LIGHT0, GL_DIFFUSE, light_diffuse)
+    gl.glLightfv(gl.GL_LIGHT0, gl.GL_POSITION, light_pos)
+    gl.glLightfv(gl.GL_LIGHT0, gl.GL_AMBIENT, light_ambient)
+    gl.glLightfv(gl.GL_LIGHT0, gl.GL_DIFFUSE, light_diffuse)
 
     # Material properties
-    glEnable(GL_COLOR_MATERIAL)
-    glColorMaterial(GL_FRONT, GL_AMBIENT_AND_DIFFUSE)
-
-def draw_sphere(radius=1.0, slices=20, stacks=20):
-    """Draw a sphere using GLU quadrics"""
-    quad = gluNewQuadric()
-    gluQuadricDrawStyle(quad, GLU_FILL)
-    gluQuadricNormals(quad, GLU_SMOOTH)
-    gluSphere(quad, radius, slices, stacks)
-    gluDeleteQuadric(quad)
+    gl.glEnable(gl.GL_COLOR_MATERIAL)
+    gl.glColorMaterial(gl.GL_FRONT, gl.GL_AMBIENT_AND_DIFFUSE)
+
+# Sphere detail levels, finest first, and the smallest projected radius (in
+# pixels) each one is used for. Balls smaller than every threshold get the
+# last level. When the chosen levels add up to more than the triangle budget
+# every ball is pushed down a level until they fit
+LOD_LEVELS = [(24, 24), (16, 16), (10, 10), (6, 6)]
+LOD_MIN_PIXELS = [40.0, 20.0, 8.0]
+LOD_TRIANGLE_BUDGET = 120_000
+# Most balls one glDrawElements call in draw_spheres draws, fewer when the GL
+# has too little uniform space to hold their centers, radii and colors
+BALL_BATCH_SIZE = 256
+QUALITY_GOVERNOR = True  # coarser spheres while frames run over the 60 FPS budget
+
+class SphereMesh:
+    """Unit sphere tessellated once, reused for every ball with that detail level"""
+    def __init__(self, slices, stacks):
+        self.slices = slices
+        self.stacks = stacks
+
+        # Vertex grid: stacks go pole to pole, slices go around
+        phi = np.linspace(0.0, math.pi, stacks + 1)[:, None]
+        theta = np.linspace(0.0, 2.0 * math.pi, slices + 1)[None, :]
+        x = np.sin(phi) * np.cos(theta)
+        y = np.cos(phi) * np.ones_like(theta)
+        z = np.sin(phi) * np.sin(theta)
+        # On a unit sphere the normal is the same as the position
+        self.vertices = np.stack([x, y, z], axis=-1).reshape(-1, 3).astype(np.float32)
+
+        rows = np.arange(stacks)[:, None] * (slices + 1)
+        cols = np.arange(slices)[None, :]
+        a = (rows + cols).ravel()
+        b = a + slices + 1
+        self.indices = np.stack([a, a + 1, b, a + 1, b + 1, b], axis=-1).ravel().astype(np.uint32)
+
+        # GL vertex and index buffer names, uploaded by bind() on first use
+        self.buffers = None
+
+    def bind(self, batch_size):
+        """Bind this mesh's GL buffers, uploading them the first time it is
+        drawn: `batch_size` copies of the unit sphere, with the copy each
+        vertex belongs to in its w, and their triangles"""
+        if self.buffers is None:
+            vertex_count = len(self.vertices)
+            slots = np.repeat(np.arange(batch_size, dtype=np.float32), vertex_count)
+            vertices = np.column_stack([np.tile(self.vertices, (batch_size, 1)), slots])
+            offsets = (np.arange(batch_size, dtype=np.uint32) * vertex_count)[:, None]
+            indices = (self.indices[None, :] + offsets).ravel()
+            self.buffers = gl.glGenBuffers(2)
+            gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.buffers[0])
+            gl.glBufferData(gl.GL_ARRAY_BUFFER, vertices.nbytes, vertices, gl.GL_STATIC_DRAW)
+            gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, self.buffers[1])
+            gl.glBufferData(gl.GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, gl.GL_STATIC_DRAW)
+        else:
+            gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.buffers[0])
+            gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, self.buffers[1])
+        # Offsets into the bound buffer; on a unit sphere the normal is the position
+        gl.glVertexPointer(4, gl.GL_FLOAT, 0, None)
+        gl.glNormalPointer(gl.GL_FLOAT, 16, None)
+
+_sphere_meshes = {}
+
+def get_sphere_mesh(slices, stacks):
+    """Return the cached mesh for this tessellation level, building it once"""
+    key = (slices, stacks)
+    if key not in _sphere_meshes:
+        _sphere_meshes[key] = SphereMesh(slices, stacks)
+    return _sphere_meshes[key]
+
+def ball_arrays(balls):
+    """Positions, radii and colors of the balls as float32 arrays"""
+    positions = np.array([(ball.x, ball.y, ball.z) for ball in balls], dtype=np.float32).reshape(-1, 3)
+    radii = np.array([ball.radius for ball in balls], dtype=np.float32)
+    colors = np.array([(ball.r, ball.g, ball.b) for ball in balls], dtype=np.float32).reshape(-1, 3)
+    return positions, radii, colors
+
+class BallArrayBuffer:
+    """Preallocated arrays a SimulationThread fills with ball_arrays() output
+    in place, grown when balls are added"""
+    def __init__(self, capacity=64):
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.positions = np.zeros((capacity, 3), dtype=np.float32)
+        self.radii = np.zeros(capacity, dtype=np.float32)
+        self.colors = np.zeros((capacity, 3), dtype=np.float32)
+
+    def fill(self, balls):
+        """Same arrays as ball_arrays(balls), as read-only views of this buffer"""
+        n = len(balls)
+        if n > len(self.radii):
+            self._allocate(max(n, 2 * len(self.radii)))
+        views = (self.positions[:n], self.radii[:n], self.colors[:n])
+        if n:
+            views[0][...] = [(ball.x, ball.y, ball.z) for ball in balls]
+            views[1][...] = [ball.radius for ball in balls]
+            views[2][...] = [(ball.r, ball.g, ball.b) for ball in balls]
+        for view in views:
+            view.flags.writeable = False
+        return views
+
+# Vertex shader for draw_spheres: moves and scales each copy of the unit
+# sphere to its ball and lights it per vertex like the fixed-function
+# GL_LIGHT0 and GL_COLOR_MATERIAL setup in init_gl (no specular, no attenuation)
+SPHERE_VERTEX_SHADER = """
+uniform vec4 balls[BATCH_SIZE];   // center xyz, radius w
+uniform vec3 colors[BATCH_SIZE];
+
+void main() {
+    int slot = int(gl_Vertex.w);
+    vec4 ball = balls[slot];
+    vec4 eye = gl_ModelViewMatrix * vec4(gl_Vertex.xyz * ball.w + ball.xyz, 1.0);
+    vec3 normal = normalize(gl_NormalMatrix * gl_Normal);
+    vec4 light = gl_LightSource[0].position;
+    vec3 to_light = normalize(light.xyz - eye.xyz * light.w);
+    vec3 ambient = gl_LightModel.ambient.rgb + gl_LightSource[0].ambient.rgb;
+    vec3 diffuse = gl_LightSource[0].diffuse.rgb * max(dot(normal, to_light), 0.0);
+    gl_FrontColor = vec4(min(colors[slot] * (ambient + diffuse), 1.0), 1.0);
+    gl_Position = gl_ProjectionMatrix * eye;
+}
+"""
+
+class SphereProgram:
+    """The GLSL program draw_spheres uses, sized to the GL's uniform space"""
+    def __init__(self):
+        # Each ball takes two uniform vectors, keep some for the built-in matrices
+        vectors = int(gl.glGetIntegerv(gl.GL_MAX_VERTEX_UNIFORM_COMPONENTS)) // 4
+        self.batch_size = min(BALL_BATCH_SIZE, (vectors - 64) // 2)
+
+        shader = gl.glCreateShader(gl.GL_VERTEX_SHADER)
+        gl.glShaderSource(shader, f"#version 120\n#define BATCH_SIZE {self.batch_size}\n"
+                                  + SPHERE_VERTEX_SHADER)
+        gl.glCompileShader(shader)
+        if not gl.glGetShaderiv(shader, gl.GL_COMPILE_STATUS):
+            raise RuntimeError(f"sphere shader: {gl.glGetShaderInfoLog(shader)}")
+        self.program = gl.glCreateProgram()
+        gl.glAttachShader(self.program, shader)
+        gl.glLinkProgram(self.program)
+        if not gl.glGetProgramiv(self.program, gl.GL_LINK_STATUS):
+            raise RuntimeError(f"sphere program: {gl.glGetProgramInfoLog(self.program)}")
+        self.balls = gl.glGetUniformLocation(self.program, "balls")
+        self.colors = gl.glGetUniformLocation(self.program, "colors")
+
+_sphere_program = None
+
+def get_sphere_program():
+    """Return the sphere program, building it the first time"""
+    global _sphere_program
+    if _sphere_program is None:
+        _sphere_program = SphereProgram()
+    return _sphere_program
+
+def set_sphere_arrays(enabled):
+    """Switch on or off the arrays and program draw_spheres uses, unbinding
+    the mesh buffers again when switching off"""
+    for array in (gl.GL_VERTEX_ARRAY, gl.GL_NORMAL_ARRAY):
+        if enabled:
+            gl.glEnableClientState(array)
+        else:
+            gl.glDisableClientState(array)
+    gl.glUseProgram(get_sphere_program().program if enabled else 0)
+    if not enabled:
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+        gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, 0)
+
+def draw_spheres(mesh, positions, radii, colors, set_state=True):
+    """Draw spheres from per-ball arrays with one glDrawElements per batch
+    of balls; every sphere uses `mesh`
+
+    The mesh stays on the GL side, only the balls' centers, radii and
+    colors are sent, as uniforms, for each batch. Pass set_state=False when
+    drawing several meshes in a row inside one set_sphere_arrays(True)/(False)
+    pair.
+    """
+    program = get_sphere_program()
+    if set_state:
+        set_sphere_arrays(True)
+    mesh.bind(program.batch_size)
+    balls = np.column_stack([positions, radii]).astype(np.float32)
+    colors = np.ascontiguousarray(colors, dtype=np.float32)
+    for start in range(0, len(balls), program.batch_size):
+        end = min(start + program.batch_size, len(balls))
+        gl.glUniform4fv(program.balls, end - start, balls[start:end])
+        gl.glUniform3fv(program.colors, end - start, colors[start:end])
+        gl.glDrawElements(gl.GL_TRIANGLES, (end - start) * len(mesh.indices), gl.GL_UNSIGNED_INT, None)
+    if set_state:
+        set_sphere_arrays(False)
+
+def apply_camera(rotation_angle):
+    """Load the view transform for this frame onto the modelview matrix"""
+    gl.glLoadIdentity()
+    gl.glTranslatef(0.0, 0.0, -CAMERA_DISTANCE)
+    gl.glRotatef(rotation_angle * CAMERA_TILT_RATE, *CAMERA_TILT_AXIS)
+
+def projected_radii(radii, depths):
+    """Approximate on-screen radius in pixels of balls at these eye space depths"""
+    focal = (SCREEN_HEIGHT / 2.0) / math.tan(math.radians(FOV_Y) / 2.0)
+    return radii * focal / np.maximum(depths, NEAR_PLANE)
+
+class FrustumCuller:
+    """Drop balls outside the view frustum of the current GL matrices
+
+    The six planes come straight from projection @ modelview (the
+    Gribb/Hartmann extraction), so they follow whatever camera main() set
+    up. F switches culling off in game to compare.
+    """
+    def __init__(self):
+        self.enabled = True
+        # Debug numbers for the last frame
+        self.drawn = 0
+        self.culled = 0
+
+    @staticmethod
+    def current_matrices():
+        """(projection, modelview) as row-major numpy matrices"""
+        projection = np.array(gl.glGetFloatv(gl.GL_PROJECTION_MATRIX), dtype=np.float64).reshape(4, 4).T
+        modelview = np.array(gl.glGetFloatv(gl.GL_MODELVIEW_MATRIX), dtype=np.float64).reshape(4, 4).T
+        return projection, modelview
+
+    def visible(self, positions, radii):
+        """Indices of the balls to draw, nearest first, and their eye space depths"""
+        projection, modelview = self.current_matrices()
+        # The camera looks down -z in eye space
+        depths = -(positions @ modelview[2, :3] + modelview[2, 3])
+        if self.enabled:
+            clip = projection @ modelview
+            planes = np.array([clip[3] + clip[0], clip[3] - clip[0],   # left, right
+                               clip[3] + clip[1], clip[3] - clip[1],   # bottom, top
+                               clip[3] + clip[2], clip[3] - clip[2]])  # near, far
+            planes /= np.linalg.norm(planes[:, :3], axis=1)[:, None]
+            distances = positions @ planes[:, :3].T + planes[:, 3]
+            inside = np.flatnonzero((distances >= -radii[:, None]).all(axis=1))
+        else:
+            inside = np.arange(len(positions))
+        # Front to back, so the depth test rejects hidden fragments early
+        order = inside[np.argsort(depths[inside], kind="stable")]
+        self.drawn = len(order)
+        self.culled = len(positions) - len(order)
+        return order, depths[order]
+
+    def describe(self):
+        state = "on" if self.enabled else "off"
+        return f"culling {state}: {self.drawn} drawn, {self.culled} culled"
+
+class SphereLOD:
+    """Pick a sphere tessellation for each ball from its size on screen"""
+    def __init__(self, levels=LOD_LEVELS, min_pixels=LOD_MIN_PIXELS,
+                 triangle_budget=LOD_TRIANGLE_BUDGET):
+        self.levels = levels
+        self.min_pixels = np.array(min_pixels)
+        self.triangle_budget = triangle_budget
+        self.level_triangles = np.array([2 * slices * stacks for slices, stacks in levels])
+        # Levels every ball is pushed coarser by, set by the quality governor
+        self.quality_bias = 0
+        # Debug numbers for the last frame
+        self.counts = [0] * len(levels)
+        self.triangles = 0
+
+    def select(self, radii, depths):
+        """Level index per ball, coarsened as a whole by quality_bias and then
+        as far as needed to fit the triangle budget"""
+        pixels = projected_radii(radii, depths)
+        # Thresholds are decreasing, so count how many each ball fails
+        chosen = (pixels[:, None] < self.min_pixels[None, :]).sum(axis=1)
+        coarsest = len(self.levels) - 1
+        for bias in range(min(self.quality_bias, coarsest), len(self.levels)):
+            levels = np.minimum(chosen + bias, coarsest)
+            triangles = int(self.level_triangles[levels].sum())
+            if triangles <= self.triangle_budget:
+                break
+        self.counts = np.bincount(levels, minlength=len(self.levels)).tolist()
+        self.triangles = triangles
+        return levels
+
+    def describe(self):
+        """Per level ball counts for the debug view, e.g. 'LOD 24:3 16:10 10:0 6:0'"""
+        parts = [f"{slices}:{count}" for (slices, _), count in zip(self.levels, self.counts)]
+        return f"LOD {' '.join(parts)} ({self.triangles} tris)"
+
+def draw_frame(arrays, lod, culler, rotation_angle):
+    """Clear, set up this frame's camera and draw every visible ball
+
+    `arrays` is what ball_arrays() returns for the balls to draw.
+    """
+    # Clear buffers, # this is the part that makes the screen black
+    gl.glClear(gl.GL_COLOR_BUFFER_BIT | gl.GL_DEPTH_BUFFER_BIT)
+
+    # Reset modelview matrix, move camera back and add some rotation for better view
+    apply_camera(rotation_angle)
+
+    draw_ball_arrays(*arrays, lod, culler)
+
+def draw_ball_arrays(positions, radii, colors, lod, culler):
+    """Draw the visible balls grouped by detail level, batched draws per level
+
+    Uses the modelview matrix already loaded for this frame. Balls keep
+    their front to back order inside each level, and the finest (closest)
+    level goes first. Colors travel with the centers and radii, so no GL
+    state changes between balls, and the arrays and sphere program are
+    switched on once for all levels.
+    """
+    if not len(positions):
+        culler.drawn = culler.culled = 0
+        return
+    order, depths = culler.visible(positions, radii)
+    levels = lod.select(radii[order], depths)
+    set_sphere_arrays(True)
+    for level, (slices, stacks) in enumerate(lod.levels):
+        rows = order[levels == level]
+        if len(rows):
+            draw_spheres(get_sphere_mesh(slices, stacks),
+                         positions[rows], radii[rows], colors[rows], set_state=False)
+    set_sphere_arrays(False)
+
+# Swept wall bounces: a ball is reflected at the moment it reaches a wall
+# and keeps moving for the rest of the frame, instead of being clamped to the
+# wall at the end of it, so fast balls can't skip past the wall. --ccd turns it on
+CONTINUOUS_COLLISION = False
+MAX_WALL_HITS = 4  # bounces per axis per frame before falling back to a clamp
+
+def sweep_wall(position, velocity, radius, boundary):
+    """Move one coordinate a frame along `velocity` inside +-boundary.
+    Returns (position, velocity, bounced)"""
+    low, high = -boundary + radius, boundary - radius
+    position = max(low, min(high, position))
+    remaining = 1.0
+    bounced = False
+    for _ in range(MAX_WALL_HITS):
+        end = position + velocity * remaining
+        if velocity < 0 and end <= low:
+            wall = low
+        elif velocity > 0 and end >= high:
+            wall = high
+        else:
+            return end, velocity, bounced
+        remaining -= (wall - position) / velocity
+        position = wall
+        velocity = -velocity
+        bounced = True
+    return max(low, min(high, position + velocity * remaining)), velocity, bounced
 
 class BouncingBall:
     def __init__(self, x=None, y=None, z=None):
@@ -98,6 +510,18 @@ class BouncingBall:
 
     def update_position(self):
         """Update ball position and handle collisions"""
+        if CONTINUOUS_COLLISION:
+            self.x, self.vx, bounced = sweep_wall(self.x, self.vx, self.radius, self.boundary)
+            if bounced:
+                self.r = random.random()
+            self.y, self.vy, bounced = sweep_wall(self.y, self.vy, self.radius, self.boundary)
+            if bounced:
+                self.g = random.random()
+            self.z, self.vz, bounced = sweep_wall(self.z, self.vz, self.radius, self.boundary)
+            if bounced:
+                self.b = random.random()
+            return
+
         # Move the ball, difference from last one is that this is 3D
         self.x += self.vx
         self.y += self.vy
@@ -123,21 +547,190 @@ class BouncingBall:
             self.z = max(-self.boundary + self.radius, min(self.boundary - self.radius, self.z))
             self.b = random.random()
 
-    def render(self):
-        # more stuff that needs a phd to understand.
-        # also why reinvent the wheel?
-        # in the real world you would use a game engine for this
-        """Render the ball"""
-        glPushMatrix()
-
-        glTranslatef(self.x, self.y, self.z)
-        glColor3f(self.r, self.g, self.b)
+# Recordings store one row per ball: x, y, z, vx, vy, vz, radius, r, g, b.
+# Rows past RECORD_CAPACITY (lots of SPACE presses) are left out of the file
+RECORD_LAYOUT = "balls3d"
+RECORD_FIELDS = 10
+RECORD_CAPACITY = 256
+
+def ball_rows(balls):
+    """Ball state as float32 rows for a Recorder"""
+    return np.array([(ball.x, ball.y, ball.z, ball.vx, ball.vy, ball.vz,
+                      ball.radius, ball.r, ball.g, ball.b) for ball in balls],
+                    dtype=np.float32).reshape(len(balls), RECORD_FIELDS)
+
+def row_arrays(rows):
+    """ball_arrays() output for rows written by ball_rows()"""
+    return rows[:, 0:3], rows[:, 6], rows[:, 7:10]
+
+# Ball-ball collisions. Finding which balls might touch (the broad phase) is
+# swappable so sweep-and-prune and the loose octree can be compared on the
+# same scene, press B in game to switch between them.
+class SweepAndPrune:
+    """Broad phase: sort balls along the axis with the most spread and sweep"""
+    name = "sweep-and-prune"
+
+    def find_pairs(self, balls):
+        """Return (i, j) index pairs whose bounding boxes overlap"""
+        if len(balls) < 2:
+            return []
+
+        # Pick the axis the balls are most spread out along, fewer false overlaps
+        centers = [(ball.x, ball.y, ball.z) for ball in balls]
+        spreads = []
+        for axis in range(3):
+            values = [c[axis] for c in centers]
+            mean = sum(values) / len(values)
+            spreads.append(sum((v - mean) ** 2 for v in values))
+        axis = spreads.index(max(spreads))
+
+        order = sorted(range(len(balls)), key=lambda i: centers[i][axis] - balls[i].radius)
+        pairs = []
+        active = []
+        for i in order:
+            start = centers[i][axis] - balls[i].radius
+            # Drop balls whose interval ended before this one starts
+            active = [j for j in active if centers[j][axis] + balls[j].radius >= start]
+            for j in active:
+                if _boxes_overlap(balls[i], balls[j]):
+                    pairs.append((j, i) if j < i else (i, j))
+            active.append(i)
+        return pairs
+
+class _OctreeNode:
+    def __init__(self, center, half):
+        self.center = center
+        self.half = half
+        self.items = []
+        self.children = None
+
+class LooseOctree:
+    """Broad phase: loose octree, each node's bounds are stretched by `looseness`
+
+    A ball lives in the deepest node whose cell holds its center and whose
+    loose bounds hold the whole ball, so it never has to be split across nodes.
+    """
+    name = "loose octree"
+
+    def __init__(self, half_size=3.5, max_depth=5, looseness=2.0):
+        self.half_size = half_size
+        self.max_depth = max_depth
+        self.looseness = looseness
+
+    def find_pairs(self, balls):
+        """Return (i, j) index pairs whose bounding boxes overlap"""
+        root = _OctreeNode((0.0, 0.0, 0.0), self.half_size)
+        for i, ball in enumerate(balls):
+            self._insert(root, i, ball)
+
+        pairs = []
+        for i, ball in enumerate(balls):
+            self._query(root, i, ball, balls, pairs)
+        return pairs
+
+    def _insert(self, node, index, ball):
+        depth = 0
+        # Go down while the ball still fits inside a child's loose bounds
+        while depth < self.max_depth and ball.radius <= node.half / 2 * (self.looseness - 1):
+            if node.children is None:
+                node.children = [None] * 8
+            octant = ((ball.x > node.center[0])
+                      | (ball.y > node.center[1]) << 1
+                      | (ball.z > node.center[2]) << 2)
+            if node.children[octant] is None:
+                quarter = node.half / 2
+                center = (node.center[0] + (quarter if octant & 1 else -quarter),
+                          node.center[1] + (quarter if octant & 2 else -quarter),
+                          node.center[2] + (quarter if octant & 4 else -quarter))
+                node.children[octant] = _OctreeNode(center, quarter)
+            node = node.children[octant]
+            depth += 1
+        node.items.append(index)
+
+    def _query(self, node, index, ball, balls, pairs):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            reach = node.half * self.looseness + ball.radius
+            if (abs(ball.x - node.center[0]) > reach
+                    or abs(ball.y - node.center[1]) > reach
+                    or abs(ball.z - node.center[2]) > reach):
+                continue
+            for j in node.items:
+                # Only report each pair once, from the lower index
+                if j > index and _boxes_overlap(ball, balls[j]):
+                    pairs.append((index, j))
+            if node.children is not None:
+                stack.extend(child for child in node.children if child is not None)
+
+def _boxes_overlap(a, b):
+    reach = a.radius + b.radius
+    return abs(a.x - b.x) <= reach and abs(a.y - b.y) <= reach and abs(a.z - b.z) <= reach
+
+class BallCollisions:
+    """Elastic ball-ball collisions, using each ball's radius as its mass"""
+    def __init__(self, broadphase=None):
+        self.broadphase = broadphase or SweepAndPrune()
+        self.pairs_tested = 0
+        self.hits = 0
+
+    def resolve(self, balls):
+        pairs = self.broadphase.find_pairs(balls)
+        self.pairs_tested = len(pairs)
+        self.hits = 0
+
+        for i, j in pairs:
+            a = balls[i]
+            b = balls[j]
+            dx = b.x - a.x
+            dy = b.y - a.y
+            dz = b.z - a.z
+            distance = math.sqrt(dx * dx + dy * dy + dz * dz)
+            reach = a.radius + b.radius
+            if distance >= reach:
+                continue
+            if distance == 0:
+                nx, ny, nz = 1.0, 0.0, 0.0
+            else:
+                nx, ny, nz = dx / distance, dy / distance, dz / distance
+
+            # Push them apart so they stop overlapping, lighter ball moves more
+            total = a.radius + b.radius
+            overlap = reach - distance
+            a.x -= nx * overlap * b.radius / total
+            a.y -= ny * overlap * b.radius / total
+            a.z -= nz * overlap * b.radius / total
+            b.x += nx * overlap * a.radius / total
+            b.y += ny * overlap * a.radius / total
+            b.z += nz * overlap * a.radius / total
+
+            # Only bounce if they are moving towards each other
+            closing = (a.vx - b.vx) * nx + (a.vy - b.vy) * ny + (a.vz - b.vz) * nz
+            if closing <= 0:
+                continue
+
+            # 1D elastic collision along the normal: impulse = 2 m1 m2 / (m1 + m2)
+            impulse = 2.0 * closing / total
+            a.vx -= impulse * b.radius * nx
+            a.vy -= impulse * b.radius * ny
+            a.vz -= impulse * b.radius * nz
+            b.vx += impulse * a.radius * nx
+            b.vy += impulse * a.radius * ny
+            b.vz += impulse * a.radius * nz
+            self.hits += 1
 
-        draw_sphere(self.radius, 24, 24)
-
-        glPopMatrix()
 # only code here i actually fully understand
-def main():
+def main(seed=None, record_path=None, profile_path=None, threaded=False):
+    """Run the game; with `threaded`, balls move on a SimulationThread and
+    this loop only handles input and draws the arrays it publishes"""
+    # Seed first so the starting balls (and every bounce color) can be reproduced
+    seed = seed if seed is not None else new_seed()
+    seed_rngs(seed)
+    recorder = None
+    if record_path:
+        recorder = Recorder(record_path, RECORD_CAPACITY, RECORD_FIELDS, RECORD_LAYOUT,
+                            SCREEN_WIDTH, SCREEN_HEIGHT, 1.0 / 60, seed)
+
     init_gl()
 
     clock = pygame.time.Clock()
@@ -149,45 +742,252 @@ def main():
         ball = BouncingBall()
         balls.append(ball)
 
+    # B switches the broad phase so both can be compared on the same balls
+    broadphases = [SweepAndPrune(), LooseOctree()]
+    broadphase_index = 0
+    collisions = BallCollisions(broadphases[0])
+
+    # Same phase hooks as the 2D simulation; P shows the frame percentiles in
+    # the title bar since there is no 2D overlay in the GL window
+    profiler = FrameProfiler()
+    show_profile = False
+    # Update phases timed on another thread would land in whatever frame
+    # the render loop has open, so the threaded mode leaves them out
+    update_profiler = FrameProfiler(enabled=False) if threaded else profiler
+
+    # Sphere detail follows each ball's size on screen; L shows the per
+    # level counts in the title bar
+    lod = SphereLOD()
+    culler = FrustumCuller()
+    show_lod = False
+    # Coarser spheres while frames run over budget; shown in the title bar
+    governor = QualityGovernor(1.0 / 60, len(LOD_LEVELS))
+
+    def update_caption():
+        caption = "3D Bouncing Balls - " + broadphases[broadphase_index].name
+        if governor.level:
+            caption += " - " + governor.describe()
+        if show_lod:
+            caption += " - " + culler.describe() + " - " + lod.describe()
+        if show_profile:
+            caption += " - " + profiler.caption()
+        pygame.display.set_caption(caption)
+
+    update_caption()
+
+    steps = 0
+
+    def step_balls():
+        """Update all balls, then let them bounce off each other"""
+        nonlocal steps
+        with update_profiler.phase("update.objects"):
+            for ball in balls:
+                ball.update_position()
+        with update_profiler.phase("update.collisions"):
+            collisions.resolve(balls)
+        if recorder is not None:
+            recorder.record(steps, ball_rows(balls))
+        steps += 1
+
+    sim_thread = None
+    if threaded:
+        sim_thread = SimulationThread(step_balls, lambda buffer: buffer.fill(balls), 1.0 / 60,
+                                      BallArrayBuffer)
+        sim_thread.start()
+
+    def run_command(command):
+        """Change the balls from the input handler, on whichever thread owns them"""
+        if sim_thread is not None:
+            sim_thread.submit(command)
+        else:
+            command()
+
+    def set_broadphase(index):
+        collisions.broadphase = broadphases[index]
+
     rotation_angle = 0.0
+    frame = 0
     running = True
 
     while running:
         # Handle events
+        with profiler.phase("events"):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        running = False
+                    # Add some balls with spacebar
+                    elif event.key == pygame.K_SPACE:
+                        run_command(lambda: balls.append(BouncingBall()))
+                    elif event.key == pygame.K_b:
+                        broadphase_index = (broadphase_index + 1) % len(broadphases)
+                        run_command(lambda index=broadphase_index: set_broadphase(index))
+                        update_caption()
+                    elif event.key == pygame.K_p:
+                        show_profile = not show_profile
+                        update_caption()
+                    elif event.key == pygame.K_l:
+                        show_lod = not show_lod
+                        update_caption()
+                    elif event.key == pygame.K_f:
+                        culler.enabled = not culler.enabled
+                        update_caption()
+
+        if sim_thread is None:
+            step_balls()
+            arrays = ball_arrays(balls)
+        else:
+            arrays = sim_thread.latest
+        frame += 1
+
+        with profiler.phase("render.objects"):
+            draw_frame(arrays, lod, culler, rotation_angle)
+
+        rotation_angle += 1.0
+        if rotation_angle > 360:
+            rotation_angle = 0
+
+        with profiler.phase("render.flip"):
+            pygame.display.flip()
+        with profiler.phase("tick"):
+            clock.tick(60)  # 60 FPS
+        if QUALITY_GOVERNOR and governor.update(clock.get_rawtime() / 1000.0):
+            lod.quality_bias = governor.level
+            update_caption()
+        profiler.end_frame()
+        if (show_profile or show_lod) and frame % 30 == 0:
+            update_caption()
+
+    if sim_thread is not None:
+        sim_thread.stop()
+    if profile_path:
+        profiler.export(profile_path)
+    if recorder is not None:
+        recorder.close()
+        print(f"Recorded {recorder.frames} frames to {record_path} (seed {seed})")
+    pygame.quit()
+
+def replay(path):
+    """Play back a --record recording; scrubbing never re-simulates
+
+    SPACE pauses, LEFT/RIGHT step one frame (ten with SHIFT), HOME/END jump
+    to either end and ESC quits. The camera turns with the recorded frames,
+    as it did while they were recorded.
+    """
+    recording = ReplayFile(path)
+    if recording.layout != RECORD_LAYOUT:
+        raise ValueError(f"cannot play a '{recording.layout}' recording")
+    init_gl()
+    clock = pygame.time.Clock()
+    lod = SphereLOD()
+    culler = FrustumCuller()
+    last = len(recording) - 1
+    frame = 0
+    paused = False
+    accumulator = 0.0
+    running = last >= 0
+
+    while running:
+        accumulator += clock.tick(60) / 1000.0
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.KEYDOWN:
+                stride = 10 if event.mod & pygame.KMOD_SHIFT else 1
                 if event.key == pygame.K_ESCAPE:
                     running = False
-                # Add some balls with spacebar
                 elif event.key == pygame.K_SPACE:
-                    balls.append(BouncingBall())
-
-        # Clear buffers, # this is the part that makes the screen black
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-
-        # Reset modelview matrix
-        glLoadIdentity()
+                    paused = not paused
+                elif event.key == pygame.K_LEFT:
+                    frame -= stride
+                elif event.key == pygame.K_RIGHT:
+                    frame += stride
+                elif event.key == pygame.K_HOME:
+                    frame = 0
+                elif event.key == pygame.K_END:
+                    frame = last
+        # Whole recorded steps per tick, at the rate they were recorded
+        if paused:
+            accumulator = 0.0
+        else:
+            steps = int(accumulator / recording.dt)
+            accumulator -= steps * recording.dt
+            frame += steps
+        frame = max(0, min(frame, last))
+
+        # The live loop turns the camera one degree per frame, back to 0 after 360
+        draw_frame(row_arrays(recording[frame]), lod, culler, float(frame % 361))
+        pygame.display.set_caption(
+            f"3D Bouncing Balls Replay - frame {frame + 1}/{last + 1} "
+            f"(step {recording.step(frame)}) {'paused' if paused else 'playing'} "
+            f"- seed {recording.seed}")
+        pygame.display.flip()
+    recording.close()
+    pygame.quit()
 
-        # Move camera back and add some rotation for better view
-        glTranslatef(0.0, 0.0, -8.0)
-        glRotatef(rotation_angle * 0.5, 1.0, 1.0, 0.0)
+def render_offscreen(frames, encoder, seed=None, num_balls=6):
+    """Simulate and render `frames` frames straight into `encoder`
 
-        # Update and draw all balls
-        for ball in balls:
-            ball.update_position()
-            ball.render()
+    Same scene and camera motion as main(), but nothing waits on
+    clock.tick, so frames come out as fast as GL and the encoder allow.
+    """
+    seed_rngs(seed if seed is not None else new_seed())
+    init_gl(offscreen=True)
+    gl.glPixelStorei(gl.GL_PACK_ALIGNMENT, 1)
 
-        rotation_angle += 1.0
-        if rotation_angle > 360:
-            rotation_angle = 0
+    balls = [BouncingBall() for _ in range(num_balls)]
+    collisions = BallCollisions(SweepAndPrune())
+    lod = SphereLOD()
+    culler = FrustumCuller()
+    rotation_angle = 0.0
+    try:
+        for _ in range(frames):
+            for ball in balls:
+                ball.update_position()
+            collisions.resolve(balls)
+            draw_frame(ball_arrays(balls), lod, culler, rotation_angle)
 
-        pygame.display.flip()
-        clock.tick(60)  # 60 FPS
+            pixels = gl.glReadPixels(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT, gl.GL_RGB, gl.GL_UNSIGNED_BYTE)
+            # GL rows run bottom to top, image files top to bottom
+            rows = np.frombuffer(pixels, dtype=np.uint8).reshape(SCREEN_HEIGHT, SCREEN_WIDTH * 3)
+            encoder.submit(rows[::-1].tobytes())
 
-    pygame.quit()
+            rotation_angle += 1.0
+            if rotation_angle > 360:
+                rotation_angle = 0
+    finally:
+        encoder.close()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="3D bouncing balls")
+    parser.add_argument("--seed", type=int, help="seed the RNGs so the run can be repeated")
+    parser.add_argument("--record", metavar="PATH", help="record every frame to PATH")
+    parser.add_argument("--replay", metavar="PATH", help="play back a recording instead of simulating")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="on exit, write per-phase frame timings to PATH (.json or .csv)")
+    parser.add_argument("--offscreen", metavar="DIR",
+                        help="render frames without a window into DIR as fast as possible")
+    parser.add_argument("--frames", type=int, default=600, help="frames to render in offscreen mode")
+    parser.add_argument("--balls", type=int, default=6, help="balls to simulate in offscreen mode")
+    parser.add_argument("--format", choices=["png", "raw"], default="png",
+                        help="offscreen frame format")
+    parser.add_argument("--sim-thread", action="store_true",
+                        help="move the balls on their own thread, decoupled from rendering")
+    parser.add_argument("--ccd", action="store_true",
+                        help="swept wall bounces, so fast balls can't pass through walls")
+    args = parser.parse_args()
+    CONTINUOUS_COLLISION = args.ccd
+    if args.replay:
+        replay(args.replay)
+    elif args.offscreen:
+        encoder = FrameEncoder(args.offscreen, SCREEN_WIDTH, SCREEN_HEIGHT, args.format)
+        start = time.perf_counter()
+        render_offscreen(args.frames, encoder, args.seed, args.balls)
+        elapsed = time.perf_counter() - start
+        print(f"Rendered {args.frames} frames to {args.offscreen} in {elapsed:.2f}s "
+              f"({args.frames / elapsed:.1f} frames/sec)")
+    else:
+        main(args.seed, args.record, args.profile, args.sim_thread)
@@ -0,0 +1,303 @@
+"""Throughput benchmarks for the bouncing simulation.
+
+Usage:
+    python benchmark.py parallel --bodies 10000 100000 1000000 --workers 1 2 4
+    python benchmark.py ccd --bodies 500 --scales 1 2 4 8
+    python benchmark.py startup --repeats 5 --fail-above 2.0
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from upgraded_game import GameConfig, ObjectCollisionSystem, ParallelPhysicsWorld, PhysicsWorld
+
+def _populate(world: PhysicsWorld, bodies: int, width: int, height: int):
+    """Fill a world with bodies at random positions, velocities and sizes"""
+    rng = np.random.default_rng(0)
+    world.add_bodies(
+        np.column_stack([rng.uniform(30, width - 30, bodies), rng.uniform(30, height - 30, bodies)]),
+        rng.uniform(-200, 200, (bodies, 2)),
+        rng.uniform(20, 40, bodies),
+    )
+
+def bench_parallel(bodies: int, workers: int, steps: int,
+                   width: int = GameConfig.WIDTH, height: int = GameConfig.HEIGHT) -> Dict[str, float]:
+    """Time `steps` physics steps; workers == 0 means the in-process PhysicsWorld"""
+    world = ParallelPhysicsWorld(workers, bodies, width) if workers else PhysicsWorld(bodies)
+    try:
+        _populate(world, bodies, width, height)
+        dt = 1.0 / GameConfig.PHYSICS_HZ
+        world.step(dt, width, height)  # warm-up: first touch of every page
+        start = time.perf_counter()
+        for _ in range(steps):
+            world.step(dt, width, height)
+        elapsed = time.perf_counter() - start
+    finally:
+        world.close()
+
+    return {
+        "bodies": bodies,
+        "workers": workers,
+        "steps": steps,
+        "seconds": elapsed,
+        "steps_per_second": steps / elapsed,
+        "body_steps_per_second": bodies * steps / elapsed,
+    }
+
+def run_parallel(args: argparse.Namespace) -> List[Dict[str, float]]:
+    results = []
+    print(f"{'bodies':>9} {'workers':>7} {'steps/s':>9} {'body-steps/s':>14} {'speedup':>8}")
+    for bodies in args.bodies:
+        baseline = None
+        for workers in [0] + args.workers:
+            result = bench_parallel(bodies, workers, args.steps)
+            baseline = baseline or result["steps_per_second"]
+            label = workers if workers else "inproc"
+            print(f"{bodies:>9} {label:>7} {result['steps_per_second']:>9.1f} "
+                  f"{result['body_steps_per_second']:>14.3e} "
+                  f"{result['steps_per_second'] / baseline:>7.2f}x")
+            results.append(result)
+    return results
+
+def simulate(bodies: int, dt: float, steps: int, continuous: bool, speed: float, fast: float = 1.0,
+             width: int = GameConfig.WIDTH, height: int = GameConfig.HEIGHT) -> Dict[str, object]:
+    """Step a PhysicsWorld with object collisions; the same bodies every call.
+    The `fast` fraction of them move at up to `speed`, the rest at up to 200 px/s"""
+    np.random.seed(0)  # bounce factors
+    world = PhysicsWorld(bodies)
+    _populate(world, bodies, width, height)
+    world.velocities[:int(round(bodies * fast))] *= speed / 200.0
+    collisions = ObjectCollisionSystem()
+    swept = overlap = 0
+    previous_setting = GameConfig.CONTINUOUS_COLLISION
+    GameConfig.CONTINUOUS_COLLISION = continuous
+    try:
+        start = time.perf_counter()
+        for _ in range(steps):
+            world.step(dt, width, height)
+            n = world.count
+            collisions.step(world.positions[:n], world.velocities[:n], world.sizes[:n],
+                            world.masses[:n], world.bounce_factors[:n],
+                            world.previous_positions[:n] if continuous else None, dt,
+                            bounds=(width, height), launch_velocities=world.launch_velocities[:n])
+            swept += collisions.swept_hits
+            overlap += collisions.overlap_hits
+        elapsed = time.perf_counter() - start
+    finally:
+        GameConfig.CONTINUOUS_COLLISION = previous_setting
+    return {"positions": world.positions[:bodies].copy(), "impacts": swept + overlap,
+            "swept": swept, "overlap": overlap, "seconds": elapsed}
+
+def run_ccd(args: argparse.Namespace) -> List[Dict[str, float]]:
+    """Discrete vs swept collisions at growing step sizes, against a fine reference.
+
+    Every run covers the same simulated time, `duration` rounded up to a
+    whole number of the largest step. The reference uses swept collisions
+    at 1/`reference` of the base step. Impacts are split into those found
+    by the sweep and by the overlap pass; missed impacts are body pairs
+    that passed through each other, relative to the reference count;
+    error is the distance of each body from its reference position, which
+    only means much over a short run since many-body collisions are chaotic.
+    Speedup is simulated time per second against discrete at the base step;
+    swept runs only sweep the pairs fast enough to tunnel, so with a few
+    fast bodies among slow ones they can take longer steps for less work.
+    """
+    base_dt = 1.0 / GameConfig.PHYSICS_HZ
+    longest = math.lcm(*args.scales)
+    base_steps = -(-int(round(args.duration / base_dt)) // longest) * longest
+    results = []
+    reference = simulate(args.bodies, base_dt / args.reference, base_steps * args.reference,
+                         True, args.speed, args.fast)
+    print(f"{args.bodies} bodies, {args.fast:.0%} at up to {args.speed:.0f} px/s, "
+          f"for {base_steps * base_dt:.3f}s, "
+          f"reference step {base_dt / args.reference * 1000:.2f} ms "
+          f"with {reference['impacts']} impacts ({reference['swept']} swept)")
+    print(f"{'step ms':>8} {'mode':>10} {'swept':>6} {'overlap':>8} {'missed':>7} "
+          f"{'mean err px':>12} {'sim s/s':>9} {'speedup':>8}")
+    baseline = None
+    for scale in args.scales:
+        dt = base_dt * scale
+        steps = base_steps // scale
+        for continuous in (False, True):
+            run = simulate(args.bodies, dt, steps, continuous, args.speed, args.fast)
+            error = np.hypot(*(run["positions"] - reference["positions"]).T)
+            result = {
+                "dt": dt,
+                "continuous": continuous,
+                "impacts": run["impacts"],
+                "swept": run["swept"],
+                "overlap": run["overlap"],
+                "missed": 1.0 - run["impacts"] / max(reference["impacts"], 1),
+                "mean_error": float(error.mean()),
+                "sim_seconds_per_second": steps * dt / run["seconds"],
+            }
+            baseline = baseline or result["sim_seconds_per_second"]
+            result["speedup"] = result["sim_seconds_per_second"] / baseline
+            print(f"{dt * 1000:>8.2f} {'swept' if continuous else 'discrete':>10} "
+                  f"{run['swept']:>6} {run['overlap']:>8} {result['missed']:>7.1%} "
+                  f"{result['mean_error']:>12.2f} {result['sim_seconds_per_second']:>9.1f} "
+                  f"{result['speedup']:>7.2f}x")
+            results.append(result)
+    return results
+
+# Each probe runs in a fresh interpreter and prints the seconds from just
+# before its import to the end of each stage as one JSON line
+_PROBE_PRELUDE = """
+import json, time
+start = time.perf_counter()
+"""
+
+STARTUP_PROBES = {
+    "classic": """
+import game
+import pygame
+imported = time.perf_counter()
+objects = [game.MovingObject(shape) for shape in ("square", "circle", "triangle")]
+for obj in objects:
+    obj.update()
+stepped = time.perf_counter()
+pygame.display.init()
+screen = pygame.display.set_mode((game.WIDTH, game.HEIGHT))
+for obj in objects:
+    obj.draw(screen)
+pygame.image.tobytes(screen, "RGB")
+rendered = time.perf_counter()
+""",
+    "2d": """
+import upgraded_game as game
+import pygame
+imported = time.perf_counter()
+core = game.SimulationCore()
+core.spawn_batch(100, seed=0)
+core.step(1.0 / game.GameConfig.PHYSICS_HZ)
+stepped = time.perf_counter()
+simulation = game.BouncingSimulation(
+    core, screen=pygame.Surface((game.GameConfig.WIDTH, game.GameConfig.HEIGHT)), threaded=False)
+simulation.show_menu = False
+simulation.render(1.0)
+pygame.image.tobytes(simulation.screen, "RGB")
+rendered = time.perf_counter()
+core.close()
+""",
+    "3d": """
+import importlib.util
+spec = importlib.util.spec_from_file_location("game3d", "3dgame.py")
+game = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(game)
+imported = time.perf_counter()
+balls = [game.BouncingBall() for _ in range(6)]
+for ball in balls:
+    ball.update_position()
+game.BallCollisions(game.SweepAndPrune()).resolve(balls)
+stepped = time.perf_counter()
+game.init_gl(offscreen=True)
+game.draw_frame(game.ball_arrays(balls), game.SphereLOD(), game.FrustumCuller(), 0.0)
+game.gl.glReadPixels(0, 0, game.SCREEN_WIDTH, game.SCREEN_HEIGHT, game.gl.GL_RGB, game.gl.GL_UNSIGNED_BYTE)
+rendered = time.perf_counter()
+""",
+}
+
+_PROBE_REPORT = """
+print(json.dumps({"import": imported - start, "first_step": stepped - start,
+                  "first_frame": rendered - start}))
+"""
+
+def measure_startup(probe: str) -> Optional[Dict[str, float]]:
+    """Run one startup probe in a new interpreter; None if it failed (e.g. no GL)"""
+    env = dict(os.environ)
+    # A dummy video driver (and EGL for the 3D probe) so nothing opens a window
+    env.setdefault("SDL_VIDEODRIVER", "dummy")
+    env.pop("DISPLAY", None)
+    code = _PROBE_PRELUDE + STARTUP_PROBES[probe] + _PROBE_REPORT
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        return None
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["process"] = elapsed
+    return timings
+
+def run_startup(args: argparse.Namespace) -> List[Dict[str, float]]:
+    """Median time from import to the first simulated step and first rendered frame.
+
+    "process" is the whole child run as seen from outside, interpreter
+    start-up and exit included. With --fail-above the exit status is 1 when
+    any probe's first frame takes longer, or when a probe fails outright, so
+    a CI job can catch regressions.
+    """
+    results = []
+    slow = []
+    failed = []
+    print(f"{'probe':>8} {'import ms':>10} {'step ms':>9} {'frame ms':>9} {'process ms':>11}")
+    for probe in args.probes:
+        runs = [measure_startup(probe) for _ in range(args.repeats)]
+        runs = [run for run in runs if run is not None]
+        if not runs:
+            print(f"{probe:>8} {'failed':>10}")
+            failed.append(probe)
+            continue
+        result = {key: float(np.median([run[key] for run in runs])) for key in runs[0]}
+        result["probe"] = probe
+        print(f"{probe:>8} {result['import'] * 1000:>10.1f} {result['first_step'] * 1000:>9.1f} "
+              f"{result['first_frame'] * 1000:>9.1f} {result['process'] * 1000:>11.1f}")
+        if args.fail_above is not None and result["first_frame"] > args.fail_above:
+            slow.append(probe)
+        results.append(result)
+    if args.fail_above is not None and (slow or failed):
+        problems = []
+        if failed:
+            problems.append(f"failed: {', '.join(failed)}")
+        if slow:
+            problems.append(f"first frame slower than {args.fail_above}s: {', '.join(slow)}")
+        sys.exit("; ".join(problems))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Bouncing simulation benchmarks")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    parallel = subcommands.add_parser(
+        "parallel", help="strip-partitioned multiprocess physics vs the in-process PhysicsWorld")
+    parallel.add_argument("--bodies", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parallel.add_argument("--workers", type=int, nargs="+",
+                          default=sorted({1, 2, 4, multiprocessing.cpu_count()}))
+    parallel.add_argument("--steps", type=int, default=100)
+    parallel.set_defaults(func=run_parallel)
+
+    ccd = subcommands.add_parser(
+        "ccd", help="accuracy and throughput of swept vs discrete collisions at larger steps")
+    ccd.add_argument("--bodies", type=int, default=200)
+    ccd.add_argument("--scales", type=int, nargs="+", default=[1, 2, 4, 8],
+                     help="step sizes as multiples of 1/PHYSICS_HZ")
+    ccd.add_argument("--duration", type=float, default=0.1, help="simulated seconds per run")
+    ccd.add_argument("--speed", type=float, default=2000.0, help="largest initial speed, px/s")
+    ccd.add_argument("--fast", type=float, default=0.05,
+                     help="fraction of the bodies moving at up to --speed (the rest: 200 px/s)")
+    ccd.add_argument("--reference", type=int, default=8,
+                     help="reference run uses 1/N of the base step")
+    ccd.set_defaults(func=run_ccd)
+
+    startup = subcommands.add_parser(
+        "startup", help="time from import to the first simulated step and the first rendered frame")
+    startup.add_argument("--probes", nargs="+", choices=sorted(STARTUP_PROBES),
+                         default=list(STARTUP_PROBES))
+    startup.add_argument("--repeats", type=int, default=5, help="runs per probe; the median is shown")
+    startup.add_argument("--fail-above", type=float, metavar="SECONDS",
+                         help="exit with status 1 if a first frame takes longer than this")
+    startup.set_defaults(func=run_startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,15 @@
 import pygame
 import random
 
-pygame.init()
-
 # Constants
 WIDTH, HEIGHT = 600, 400
 FPS = 60
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 
-# Create window
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Object Bounce Simulation")
-clock = pygame.time.Clock()
-
-# Font 
-font = pygame.font.SysFont(None, 40)
+# Dirty rectangle mode: only push the parts of the screen that changed
+DIRTY_RECTS = False
+DIRTY_AREA_LIMIT = 0.4  # flip the whole screen when more than this fraction changed
 
 # Object class 
 class MovingObject:
@@ -44,17 +38,18 @@ class MovingObject:
             self.color = self.random_color()
 
     def draw(self, screen): # (Source: pygame docs)
+        # pygame.draw returns the rectangle it touched, the dirty rect mode needs it
         if self.shape == 'square':
-            pygame.draw.rect(screen, self.color, (self.x, self.y, self.size, self.size))
+            return pygame.draw.rect(screen, self.color, (self.x, self.y, self.size, self.size))
         elif self.shape == 'circle':
-            pygame.draw.circle(screen, self.color, (self.x + self.size // 2, self.y + self.size // 2), self.size // 2)
+            return pygame.draw.circle(screen, self.color, (self.x + self.size // 2, self.y + self.size // 2), self.size // 2)
         elif self.shape == 'triangle':
             points = [(self.x, self.y + self.size), (self.x + self.size // 2, self.y), (self.x + self.size, self.y + self.size)]
-            pygame.draw.polygon(screen, self.color, points)
+            return pygame.draw.polygon(screen, self.color, points)
 
 # Menu function lets you pick the object you want to bounce.
 
-def menu():
+def menu(screen, font):
     screen.fill(BLACK)
     title = font.render("Select an Object to Spawn", True, WHITE)
     screen.blit(title, (WIDTH//2 - 150, 50))
@@ -70,42 +65,83 @@ def menu():
     pygame.display.flip()
 
 # Game loop
-objects = []
-running = True
-menu_open = True
-
-while running:
-    screen.fill(BLACK)
-    pygame.draw.rect(screen, WHITE, (0, 0, WIDTH, HEIGHT), 5)
-
-    if menu_open:
-        menu()
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_1:
-                    objects.append(MovingObject('square'))
-                    menu_open = False
-                if event.key == pygame.K_2:
-                    objects.append(MovingObject('circle'))
-                    menu_open = False
-                if event.key == pygame.K_3:
-                    objects.append(MovingObject('triangle'))
-                    menu_open = False
-    else:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            if event.type == pygame.KEYDOWN and event.key == pygame.K_m:
-                menu_open = True
-
-        # Updates the objects and draws to the screen.
-        for obj in objects:
-            obj.update()
-            obj.draw(screen)
-
-        pygame.display.flip()
-        clock.tick(FPS)
-
-pygame.quit()
+def main():
+    pygame.init()
+
+    # Create window
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Object Bounce Simulation")
+    clock = pygame.time.Clock()
+
+    # Font 
+    font = pygame.font.SysFont(None, 40)
+
+    # Background with the border already on it, blitted back over old object positions
+    background = pygame.Surface((WIDTH, HEIGHT))
+    background.fill(BLACK)
+    pygame.draw.rect(background, WHITE, (0, 0, WIDTH, HEIGHT), 5)
+
+    objects = []
+    running = True
+    menu_open = True
+    previous_rects = []  # where objects were drawn last frame
+    full_redraw = True
+
+    while running:
+        if DIRTY_RECTS and not full_redraw:
+            # Only paint the background back where objects were last frame
+            for rect in previous_rects:
+                screen.blit(background, rect, rect)
+        else:
+            screen.blit(background, (0, 0))
+
+        if menu_open:
+            menu(screen, font)
+            full_redraw = True
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_1:
+                        objects.append(MovingObject('square'))
+                        menu_open = False
+                    if event.key == pygame.K_2:
+                        objects.append(MovingObject('circle'))
+                        menu_open = False
+                    if event.key == pygame.K_3:
+                        objects.append(MovingObject('triangle'))
+                        menu_open = False
+        else:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_m:
+                    menu_open = True
+
+            # Updates the objects and draws to the screen.
+            drawn = []
+            for obj in objects:
+                obj.update()
+                drawn.append(obj.draw(screen))
+
+            if DIRTY_RECTS and not full_redraw:
+                # Each object's old and new rectangles overlap, so push them as one
+                if len(drawn) == len(previous_rects):
+                    dirty = [old.union(new) for old, new in zip(previous_rects, drawn)]
+                else:
+                    dirty = previous_rects + drawn
+                dirty_area = sum(rect.width * rect.height for rect in dirty)
+                if dirty_area > DIRTY_AREA_LIMIT * WIDTH * HEIGHT:
+                    pygame.display.flip()
+                else:
+                    pygame.display.update(dirty)
+            else:
+                pygame.display.flip()
+            previous_rects = drawn
+            full_redraw = False
+            clock.tick(FPS)
+
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""Per-phase frame timing with rolling percentiles, an overlay and export.
+
+    profiler = FrameProfiler()
+    while running:
+        with profiler.phase("update"):
+            ...
+        profiler.end_frame()
+
+Phase times are summed within a frame (a phase entered several times, like
+physics substeps, counts once with its total) and kept for the last
+`window` frames in fixed-size ring buffers, so memory use never grows.
+QualityGovernor uses the same kind of timings to trade detail for speed.
+"""
+import csv
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pygame
+
+PERCENTILES = (50, 95, 99)
+
+class _Phase:
+    """Reusable context manager that adds its elapsed time to the open frame"""
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "FrameProfiler", name: str):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        current = self.profiler._current
+        current[self.name] = current.get(self.name, 0.0) + elapsed
+        return False
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_PHASE = _NullPhase()
+
+class FrameProfiler:
+    """Rolling per-phase frame timings; phase names are free-form strings"""
+    def __init__(self, window: int = 600, enabled: bool = True):
+        self.window = window
+        self.enabled = enabled
+        self.frames = 0
+        self._phases: Dict[str, _Phase] = {}
+        self._samples: Dict[str, np.ndarray] = {}
+        self._current: Dict[str, float] = {}
+        self._frame_start = time.perf_counter()
+
+    def phase(self, name: str):
+        """Context manager timing one phase of the current frame"""
+        if not self.enabled:
+            return _NULL_PHASE
+        phase = self._phases.get(name)
+        if phase is None:
+            phase = self._phases[name] = _Phase(self, name)
+        return phase
+
+    def end_frame(self):
+        """Close the current frame and push its timings into the ring buffers"""
+        now = time.perf_counter()
+        if not self.enabled:
+            self._frame_start = now
+            return
+        self._current["frame"] = now - self._frame_start
+        self._frame_start = now
+
+        slot = self.frames % self.window
+        for name, elapsed in self._current.items():
+            samples = self._samples.get(name)
+            if samples is None:
+                # Phases first seen mid-run read as zero for earlier frames
+                samples = self._samples[name] = np.zeros(self.window)
+            samples[slot] = elapsed
+        for name, samples in self._samples.items():
+            if name not in self._current:
+                samples[slot] = 0.0
+        self._current = {}
+        self.frames += 1
+
+    @property
+    def phase_names(self) -> List[str]:
+        """Phases seen so far, grouped by name with the whole-frame total last"""
+        return sorted(self._samples, key=lambda name: (name == "frame", name))
+
+    def samples(self, name: str) -> np.ndarray:
+        """Timings (seconds) of `name` for the buffered frames, oldest first"""
+        buffer = self._samples[name]
+        if self.frames < self.window:
+            return buffer[:self.frames].copy()
+        slot = self.frames % self.window
+        return np.concatenate([buffer[slot:], buffer[:slot]])
+
+    def percentiles(self, name: str) -> Tuple[float, ...]:
+        """p50/p95/p99 of a phase over the window, in seconds"""
+        if name not in self._samples or not self.frames:
+            return tuple(0.0 for _ in PERCENTILES)
+        return tuple(np.percentile(self.samples(name), PERCENTILES))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per-phase p50/p95/p99/mean/max in milliseconds"""
+        result = {}
+        for name in self.phase_names:
+            samples = self.samples(name) * 1000.0
+            stats = dict(zip((f"p{p}" for p in PERCENTILES), np.percentile(samples, PERCENTILES)))
+            stats["mean"] = samples.mean()
+            stats["max"] = samples.max()
+            result[name] = {key: float(value) for key, value in stats.items()}
+        return result
+
+    def export(self, path: str):
+        """Write the window to `path`: JSON (summary plus samples) or CSV (one row per frame)"""
+        names = self.phase_names
+        if path.endswith(".csv"):
+            columns = np.column_stack([self.samples(name) * 1000.0 for name in names])
+            first = self.frames - len(columns)
+            with open(path, "w", newline="") as handle:
+                writer = csv.writer(handle)
+                writer.writerow(["frame"] + [f"{name}_ms" for name in names])
+                for offset, row in enumerate(columns):
+                    writer.writerow([first + offset] + [f"{value:.4f}" for value in row])
+        else:
+            with open(path, "w") as handle:
+                json.dump({
+                    "frames": self.frames,
+                    "window": self.window,
+                    "summary_ms": self.summary(),
+                    "samples_ms": {name: (self.samples(name) * 1000.0).round(4).tolist()
+                                   for name in names},
+                }, handle, indent=2)
+
+    def caption(self) -> str:
+        """One-line summary for a window title, for renderers without a 2D overlay"""
+        p50, p95, p99 = (value * 1000.0 for value in self.percentiles("frame"))
+        return f"frame p50 {p50:.1f} / p95 {p95:.1f} / p99 {p99:.1f} ms"
+
+class QualityGovernor:
+    """Step visual quality down while frames run over budget and back up with headroom.
+
+    Feed update() each frame's busy time (without the FPS limiter's sleep).
+    Level 0 is full quality and `levels - 1` the cheapest. After every
+    change a full `window` of frames is measured before the next, so each
+    step shows its effect first. The level drops when that window averages
+    over `frame_budget`, and rises only when it averages under `headroom`
+    of it for `recover_frames` frames. If a raised level has to be dropped
+    again within two windows, the wait before the next raise doubles (up
+    to 8x), so a scene right at the edge doesn't flip back and forth.
+    """
+    def __init__(self, frame_budget: float, levels: int, window: int = 30,
+                 headroom: float = 0.7, recover_frames: int = 120):
+        self.frame_budget = frame_budget
+        self.levels = levels
+        self.window = window
+        self.headroom = headroom
+        self.recover_frames = recover_frames
+        self.level = 0
+        self.changes = 0
+        self._samples = np.zeros(window)
+        self._frames = 0  # since the last change
+        self._hold = recover_frames
+        self._raised = False
+
+    def update(self, frame_time: float) -> bool:
+        """Record one frame; True when the level changed"""
+        self._samples[self._frames % self.window] = frame_time
+        self._frames += 1
+        if self._frames < self.window:
+            return False
+        mean = self._samples.mean()
+        if mean > self.frame_budget and self.level < self.levels - 1:
+            if self._raised and self._frames <= 2 * self.window:
+                self._hold = min(self._hold * 2, self.recover_frames * 8)
+            else:
+                self._hold = self.recover_frames
+            return self._change(self.level + 1, raised=False)
+        if self.level > 0 and mean < self.frame_budget * self.headroom and self._frames >= self._hold:
+            return self._change(self.level - 1, raised=True)
+        return False
+
+    def _change(self, level: int, raised: bool) -> bool:
+        self.level = level
+        self.changes += 1
+        self._frames = 0
+        self._raised = raised
+        return True
+
+    def describe(self) -> str:
+        """e.g. 'quality 3/4', the highest number being full quality"""
+        return f"quality {self.levels - self.level}/{self.levels}"
+
+class ProfilerOverlay:
+    """Translucent panel with a frame-time graph and per-phase percentiles.
+
+    The panel is re-composed every `refresh` frames and blitted in between,
+    so the overlay itself stays cheap.
+    """
+    GRAPH_FRAMES = 180
+    GRAPH_HEIGHT = 60
+    WIDTH = 330
+
+    def __init__(self, profiler: FrameProfiler, frame_budget: float = 1 / 60, refresh: int = 15):
+        self.profiler = profiler
+        self.frame_budget = frame_budget
+        self.refresh = refresh
+        self.visible = False
+        self._panel: Optional[pygame.Surface] = None
+        self._composed_at = -1
+        self._font: Optional[pygame.font.Font] = None
+
+    def render_text(self, text: str) -> pygame.Surface:
+        # Monospace so the columns line up; the numbers change every refresh,
+        # so these are rendered directly rather than through a text cache
+        if self._font is None:
+            self._font = pygame.font.SysFont("monospace", 13)
+        return self._font.render(text, True, (230, 230, 230))
+
+    def toggle(self):
+        self.visible = not self.visible
+        self._composed_at = -1
+
+    def _compose(self) -> pygame.Surface:
+        names = self.profiler.phase_names
+        line_height = 18
+        height = self.GRAPH_HEIGHT + 30 + line_height * (len(names) + 1)
+        panel = pygame.Surface((self.WIDTH, height), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+
+        # Frame time graph; the budget line sits at half the graph height
+        graph = pygame.Rect(8, 8, self.WIDTH - 16, self.GRAPH_HEIGHT)
+        scale = graph.height / (2 * self.frame_budget)
+        budget_y = graph.bottom - int(self.frame_budget * scale)
+        pygame.draw.line(panel, (200, 80, 80), (graph.left, budget_y), (graph.right, budget_y))
+        if "frame" in names:
+            frame_times = self.profiler.samples("frame")[-self.GRAPH_FRAMES:]
+            if len(frame_times) > 1:
+                xs = graph.left + np.arange(len(frame_times)) * (graph.width / (self.GRAPH_FRAMES - 1))
+                ys = graph.bottom - np.minimum(frame_times * scale, graph.height)
+                pygame.draw.lines(panel, (120, 220, 120), False,
+                                  np.column_stack([xs, ys]).astype(int).tolist())
+
+        y = graph.bottom + 8
+        panel.blit(self.render_text(f"{'phase':<18}{'p50':>7}{'p95':>7}{'p99':>7} ms"), (8, y))
+        for name in names:
+            y += line_height
+            p50, p95, p99 = (value * 1000.0 for value in self.profiler.percentiles(name))
+            panel.blit(self.render_text(f"{name:<18}{p50:>7.2f}{p95:>7.2f}{p99:>7.2f}"), (8, y))
+        return panel
+
+    def draw(self, screen: pygame.Surface) -> Optional[pygame.Rect]:
+        """Blit the panel in the top-right corner; returns the area drawn"""
+        if not self.visible:
+            return None
+        frames = self.profiler.frames
+        if self._panel is None or self._composed_at < 0 or frames - self._composed_at >= self.refresh:
+            self._panel = self._compose()
+            self._composed_at = frames
+        return screen.blit(self._panel, (screen.get_width() - self.WIDTH - 10, 10))
@@ -0,0 +1,320 @@
+"""Append-only binary recording and memory-mapped replay of simulation runs,
+plus the background writer they share with the telemetry sink and the
+thread-pool encoder used for offscreen frame dumps.
+
+File layout (little endian):
+    header  64 bytes, see HEADER_DTYPE
+    frames  fixed-size records, see frame_dtype(); frame i starts at
+            HEADER_DTYPE.itemsize + i * frame_dtype(...).itemsize
+
+Every frame holds `capacity` body rows of `fields` float32 values, of which
+the first `count` are valid, so any frame can be located without an index.
+"""
+import json
+import os
+import queue
+import random
+import struct
+import threading
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+MAGIC = b"BSREC\x00\x00\x01"
+VERSION = 1
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("capacity", "<u4"),
+    ("fields", "<u4"),
+    ("width", "<u4"),
+    ("height", "<u4"),
+    ("reserved", "<u4"),
+    ("seed", "<i8"),
+    ("dt", "<f8"),
+    ("layout", "S16"),
+])
+
+def frame_dtype(capacity: int, fields: int) -> np.dtype:
+    """Record type of one frame for the given body capacity and row width"""
+    return np.dtype([
+        ("step", "<u4"),
+        ("count", "<u4"),
+        ("bodies", "<f4", (capacity, fields)),
+    ])
+
+def seed_rngs(seed: int):
+    """Seed both RNGs the simulations draw from, so a run can be repeated"""
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+
+def new_seed() -> int:
+    """A fresh seed to record when the user did not pick one"""
+    return random.SystemRandom().randrange(2**31)
+
+class BackgroundWriter:
+    """Write items to a file from a daemon thread.
+
+    write() only enqueues, so the caller never waits on disk I/O. Items are
+    bytes, or anything `encode` turns into bytes on the writer thread. When
+    the writer falls `max_pending` items behind, write() blocks, or with
+    `drop_when_full` discards the item and counts it in `dropped`. Errors
+    raised on the thread are re-raised on the next write() or close().
+    """
+    def __init__(self, path: Union[str, os.PathLike], max_pending: int = 1024,
+                 encode: Optional[Callable[[Any], bytes]] = None, drop_when_full: bool = False):
+        self.path = path
+        self.encode = encode
+        self.drop_when_full = drop_when_full
+        self._file = open(path, "wb")
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_pending)
+        self._error: Optional[BaseException] = None
+        self.bytes_written = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="recording-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                if self._error is not None:
+                    continue  # keep draining so write() never waits on a dead writer
+                try:
+                    chunk = self.encode(item) if self.encode is not None else item
+                    self._file.write(chunk)
+                    self.bytes_written += len(chunk)
+                except Exception as error:
+                    self._error = error
+        finally:
+            self._file.close()
+
+    def _raise_pending(self):
+        if self._error is not None:
+            raise IOError(f"writing {self.path} failed") from self._error
+
+    def _put(self, item: Any):
+        """Blocking put that gives up if the writer thread is gone"""
+        while True:
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if not self._thread.is_alive():
+                    self._raise_pending()
+                    raise IOError(f"writer thread for {self.path} stopped")
+
+    def write(self, item: Any):
+        self._raise_pending()
+        if not self.drop_when_full:
+            self._put(item)
+            return
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Flush everything queued and close the file"""
+        if self._thread.is_alive():
+            self._put(None)
+            self._thread.join()
+        self._raise_pending()
+
+class Recorder:
+    """Serialize per-step body rows into the replay format on a writer thread"""
+    def __init__(self, path: Union[str, os.PathLike], capacity: int, fields: int, layout: str,
+                 width: int, height: int, dt: float, seed: int):
+        self.capacity = capacity
+        self.fields = fields
+        self.frames = 0
+        self.truncated = 0
+        self._frame = np.zeros(1, dtype=frame_dtype(capacity, fields))
+
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header["magic"] = MAGIC
+        header["version"] = VERSION
+        header["capacity"] = capacity
+        header["fields"] = fields
+        header["width"] = width
+        header["height"] = height
+        header["seed"] = seed
+        header["dt"] = dt
+        header["layout"] = layout.encode("ascii")
+        self.writer = BackgroundWriter(path)
+        self.writer.write(header.tobytes())
+
+    def record(self, step: int, rows: np.ndarray):
+        """Append one frame; rows beyond the capacity are dropped and counted"""
+        count = min(len(rows), self.capacity)
+        if count < len(rows):
+            self.truncated += 1
+        frame = self._frame[0]
+        frame["step"] = step
+        frame["count"] = count
+        bodies = frame["bodies"]
+        bodies[:count] = rows[:count]
+        bodies[count:] = 0.0
+        # tobytes copies, so the buffer can be refilled while the writer catches up
+        self.writer.write(self._frame.tobytes())
+        self.frames += 1
+
+    def close(self):
+        self.writer.close()
+
+class TelemetrySink:
+    """Stream telemetry samples (flat dicts) to a file without blocking the loop.
+
+    A path ending in .jsonl gets one JSON object per line; otherwise every
+    sample is packed into one `record_dtype` record, so the file reads back
+    with np.fromfile(path, dtype=record_dtype). Encoding happens on the
+    writer thread, and samples are dropped (and counted) rather than
+    stalling the caller when the queue is full.
+    """
+    def __init__(self, path: Union[str, os.PathLike], record_dtype: Optional[np.dtype] = None,
+                 max_pending: int = 256):
+        self.binary = not os.fspath(path).endswith(".jsonl")
+        if self.binary and record_dtype is None:
+            raise ValueError("binary telemetry needs a record dtype, or use a .jsonl path")
+        self.record_dtype = record_dtype
+        encode = self._encode_record if self.binary else self._encode_json
+        self.writer = BackgroundWriter(path, max_pending, encode=encode, drop_when_full=True)
+
+    @property
+    def dropped(self) -> int:
+        return self.writer.dropped
+
+    @staticmethod
+    def _encode_json(sample: Dict[str, Any]) -> bytes:
+        return (json.dumps(sample) + "\n").encode("utf-8")
+
+    def _encode_record(self, sample: Dict[str, Any]) -> bytes:
+        record = np.zeros(1, dtype=self.record_dtype)
+        for name in self.record_dtype.names:
+            record[name] = sample[name]
+        return record.tobytes()
+
+    def write(self, sample: Dict[str, Any]):
+        self.writer.write(sample)
+
+    def close(self):
+        self.writer.close()
+
+def encode_png(pixels: bytes, width: int, height: int, level: int = 3) -> bytes:
+    """Encode top-down RGB24 pixels as a PNG (zlib releases the GIL, so this
+    runs in parallel on encoder threads)"""
+    rows = np.frombuffer(pixels, dtype=np.uint8).reshape(height, width * 3)
+    scanlines = np.zeros((height, width * 3 + 1), dtype=np.uint8)  # filter byte 0 (none)
+    scanlines[:, 1:] = rows
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return (struct.pack(">I", len(data)) + tag + data
+                + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)  # 8-bit RGB
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(scanlines.tobytes(), level)) + chunk(b"IEND", b""))
+
+class FrameEncoder:
+    """Write rendered frames to numbered files on a thread pool.
+
+    submit() takes top-down RGB24 bytes and returns at once unless
+    `max_pending` frames are already queued or encoding, in which case it
+    waits for one to finish; that backpressure keeps memory bounded when
+    rendering outpaces encoding. `fmt` is "png", or "raw" for unencoded
+    .rgb files described by a frames.json manifest.
+    """
+    def __init__(self, directory: Union[str, os.PathLike], width: int, height: int,
+                 fmt: str = "png", workers: Optional[int] = None, max_pending: Optional[int] = None):
+        if fmt not in ("png", "raw"):
+            raise ValueError(f"unknown frame format {fmt!r}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.width = width
+        self.height = height
+        self.fmt = fmt
+        workers = workers or min(4, os.cpu_count() or 1)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="frame-encoder")
+        self._slots = threading.BoundedSemaphore(max_pending or 2 * workers)
+        self._errors: List[BaseException] = []
+        self.frames = 0
+
+    def _path(self, index: int) -> str:
+        extension = "png" if self.fmt == "png" else "rgb"
+        return os.path.join(self.directory, f"frame_{index:06d}.{extension}")
+
+    def _encode(self, index: int, pixels: bytes):
+        data = encode_png(pixels, self.width, self.height) if self.fmt == "png" else pixels
+        with open(self._path(index), "wb") as handle:
+            handle.write(data)
+
+    def _finished(self, future: Future):
+        self._slots.release()
+        if future.exception() is not None:
+            self._errors.append(future.exception())
+
+    def _raise_pending(self):
+        if self._errors:
+            raise IOError(f"encoding frames into {self.directory} failed") from self._errors[0]
+
+    def submit(self, pixels: bytes):
+        """Queue the next frame (blocks while max_pending frames are in flight)"""
+        self._raise_pending()
+        if len(pixels) != self.width * self.height * 3:
+            raise ValueError(f"expected {self.width}x{self.height} RGB24 pixels")
+        self._slots.acquire()
+        self._pool.submit(self._encode, self.frames, pixels).add_done_callback(self._finished)
+        self.frames += 1
+
+    def close(self):
+        """Wait for every frame to be written"""
+        self._pool.shutdown(wait=True)
+        if self.fmt == "raw":
+            with open(os.path.join(self.directory, "frames.json"), "w") as handle:
+                json.dump({"width": self.width, "height": self.height, "pixel_format": "rgb24",
+                           "frames": self.frames, "pattern": "frame_%06d.rgb"}, handle, indent=2)
+        self._raise_pending()
+
+class ReplayFile:
+    """Memory-mapped view of a recording; frames are read lazily in O(1)"""
+    def __init__(self, path: Union[str, os.PathLike]):
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if len(header) != 1 or header["magic"][0] != MAGIC:
+            raise ValueError(f"{path} is not a simulation recording")
+        header = header[0]
+        if header["version"] != VERSION:
+            raise ValueError(f"{path} has unsupported recording version {header['version']}")
+
+        self.capacity = int(header["capacity"])
+        self.fields = int(header["fields"])
+        self.width = int(header["width"])
+        self.height = int(header["height"])
+        self.seed = int(header["seed"])
+        self.dt = float(header["dt"])
+        self.layout = header["layout"].decode("ascii")
+
+        dtype = frame_dtype(self.capacity, self.fields)
+        # Ignore a partially written trailing frame (e.g. from a crashed run)
+        frames = (os.path.getsize(path) - HEADER_DTYPE.itemsize) // dtype.itemsize
+        self.frames = np.memmap(path, dtype=dtype, mode="r", offset=HEADER_DTYPE.itemsize,
+                                shape=(frames,)) if frames else np.zeros(0, dtype=dtype)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        """Valid body rows of frame `index`, shape (count, fields)"""
+        frame = self.frames[index]
+        return frame["bodies"][:frame["count"]]
+
+    def step(self, index: int) -> int:
+        """Simulation step number frame `index` was recorded at"""
+        return int(self.frames[index]["step"])
+
+    def close(self):
+        self.frames = None
@@ -0,0 +1,125 @@
+"""Fixed-rate simulation on a worker thread, decoupled from rendering.
+
+The worker owns the simulation state. Other threads never touch it
+directly: they send commands (plain callables) through a queue, and read
+the most recent immutable snapshot the worker published. Snapshots are
+double-buffered: the worker refills the buffer the renderer isn't showing
+while it keeps using the other, then publishes it with a single reference
+assignment, so the render path never takes a lock and no step allocates a
+new copy of the state.
+"""
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional, Tuple
+
+class SimulationThread:
+    """Call `step` every `dt` seconds on a daemon thread and publish `snapshot(buffer)`
+
+    `make_buffer` is called twice up front for the two buffers; `snapshot`
+    fills one of them in place and returns the (read-only) view the renderer
+    gets from `latest`. A snapshot stays valid until the next `latest` call,
+    and the worker never refills the buffer behind it before then.
+
+    Like the single-threaded loops, after a hitch at most `max_catch_up`
+    steps are run back to back and the rest of the backlog is dropped.
+    """
+    def __init__(self, step: Callable[[], None], snapshot: Callable[[Any], Any], dt: float,
+                 make_buffer: Callable[[], Any], max_catch_up: int = 5, name: str = "simulation"):
+        self.dt = dt
+        self.max_catch_up = max_catch_up
+        self.paused = False
+        self.steps = 0
+        self._step = step
+        self._snapshot = snapshot
+        self._commands: "queue.SimpleQueue[Callable[[], None]]" = queue.SimpleQueue()
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._buffers = [make_buffer(), make_buffer()]
+        # Index of the buffer the renderer last took from `latest`
+        self._reading = 0
+        self._published: Tuple[int, Any, float] = (0, snapshot(self._buffers[0]), time.perf_counter())
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Stop after the current step; safe to call more than once"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._raise_pending()
+
+    def submit(self, command: Callable[[], None]):
+        """Run `command` on the simulation thread before its next step"""
+        self._commands.put(command)
+
+    def set_paused(self, paused: bool):
+        def apply():
+            self.paused = paused
+        self.submit(apply)
+
+    def _raise_pending(self):
+        if self._error is not None:
+            raise RuntimeError("simulation thread failed") from self._error
+
+    @property
+    def latest(self) -> Any:
+        """The newest published snapshot"""
+        self._raise_pending()
+        while True:
+            published = self._published
+            self._reading = published[0]
+            # Had the worker published since, it may already be refilling
+            # the buffer marked above; take the newer one instead
+            if self._published is published:
+                return published[1]
+
+    def alpha(self) -> float:
+        """How far the wall clock is past the latest snapshot, in steps (0..1),
+        for interpolating between its previous and current positions"""
+        if self.paused:
+            return 1.0
+        return min((time.perf_counter() - self._published[2]) / self.dt, 1.0)
+
+    def _drain_commands(self):
+        while True:
+            try:
+                command = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            command()
+
+    def _publish(self):
+        """Refill the buffer that isn't published and swap it in"""
+        back = 1 - self._published[0]
+        if self._reading == back:
+            # The renderer hasn't taken the newest snapshot yet and may still
+            # be drawing this one; it gets the newest, and this goes next time
+            return
+        snapshot = self._snapshot(self._buffers[back])
+        self._published = (back, snapshot, time.perf_counter())
+
+    def _run(self):
+        next_step = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                self._drain_commands()
+                now = time.perf_counter()
+                if now < next_step:
+                    self._stop.wait(next_step - now)
+                    continue
+
+                caught_up = 0
+                while next_step <= now and caught_up < self.max_catch_up:
+                    if not self.paused:
+                        self._step()
+                        self.steps += 1
+                    next_step += self.dt
+                    caught_up += 1
+                if next_step <= now:
+                    next_step = now + self.dt
+                self._publish()
+        except BaseException as error:
+            self._error = error
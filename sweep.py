@@ -0,0 +1,139 @@
+"""Parameter sweeps over GameConfig physics settings on a process pool.
+
+Usage:
+    python sweep.py --set GRAVITY 0.1 0.3 1.0 --set PHYSICS_DAMPING 0.95 0.98 \\
+        --set BOUNCE_FACTOR_RANGE [0.5,0.7] [0.7,0.9] --objects 50 200 --seeds 0 1 2 \\
+        --steps 2000 --out sweep.csv
+
+Every combination of the --set values, object counts and seeds is one
+independent headless run. Values are parsed as JSON where possible, so
+lists and numbers come through typed. Each run is described by a Scenario,
+the same format as upgraded_game.py --scenario, so any row of the result
+table can be reproduced on its own. Rows are appended to --out (.csv, or
+.jsonl for one JSON object per line) as runs finish, in completion order.
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List
+
+from upgraded_game import GameConfig, Scenario, run_headless
+
+# GameConfig as imported, restored before every run since pool workers are reused
+_DEFAULTS = {name: value for name, value in vars(GameConfig).items() if name.isupper()}
+
+METRICS = ["objects", "steps", "seconds", "steps_per_second", "total_collisions", "rested",
+           "mean_time_to_rest", "resting", "sleeping"]
+
+def parse_value(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+def expand_grid(grid: Dict[str, List[Any]], objects: List[int], seeds: List[int],
+                base: Dict[str, Any]) -> List[Scenario]:
+    """One scenario per combination, with `base` under every override set"""
+    names = list(grid)
+    scenarios = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        for count, seed in itertools.product(objects, seeds):
+            config = dict(base, **dict(zip(names, values)))
+            scenarios.append(Scenario.from_dict(
+                {"seed": seed, "config": config, "spawn": [{"count": count}]}))
+    return scenarios
+
+def run_scenario(scenario: Scenario, steps: int, dt: float) -> Dict[str, Any]:
+    """Run one scenario headless in this process and return its metrics"""
+    for name, value in _DEFAULTS.items():
+        setattr(GameConfig, name, value)
+    scenario.apply_config()
+    if "MAX_OBJECTS" not in scenario.config:
+        GameConfig.MAX_OBJECTS = max(GameConfig.MAX_OBJECTS, scenario.count)
+    return run_headless(scenario.count, steps, dt, scenario=scenario)
+
+def _run_job(data: Dict[str, Any], steps: int, dt: float) -> Dict[str, Any]:
+    # Scenarios cross the process boundary as plain dicts
+    return run_scenario(Scenario.from_dict(data), steps, dt)
+
+class ResultWriter:
+    """Append result rows to a CSV or JSONL file, flushing after each one"""
+    def __init__(self, path: str, columns: List[str]):
+        self.columns = columns
+        self.jsonl = path.endswith(".jsonl")
+        self._file = open(path, "w", newline="")
+        self._csv = None
+        if not self.jsonl:
+            self._csv = csv.DictWriter(self._file, columns)
+            self._csv.writeheader()
+
+    def write(self, row: Dict[str, Any]):
+        if self.jsonl:
+            self._file.write(json.dumps(row) + "\n")
+        else:
+            self._csv.writerow({name: json.dumps(value) if isinstance(value, (list, tuple)) else value
+                                for name, value in row.items()})
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+def run_sweep(scenarios: List[Scenario], steps: int, dt: float, out: str,
+              workers: int = 0) -> List[Dict[str, Any]]:
+    """Run every scenario on a process pool (all cores by default), streaming rows to `out`"""
+    names = sorted({name for scenario in scenarios for name in scenario.config})
+    writer = ResultWriter(out, ["run", "seed"] + names + METRICS)
+    rows = []
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            futures = {pool.submit(_run_job, scenario.to_dict(), steps, dt): index
+                       for index, scenario in enumerate(scenarios)}
+            for future in as_completed(futures):
+                index = futures[future]
+                scenario = scenarios[index]
+                metrics = future.result()
+                row = {"run": index, "seed": scenario.seed, **scenario.config}
+                row.update((name, metrics[name]) for name in METRICS)
+                writer.write(row)
+                rows.append(row)
+                print(f"[{len(rows)}/{len(scenarios)}] run {index}: "
+                      f"{row['steps_per_second']:.0f} steps/s, {row['total_collisions']} collisions, "
+                      f"{row['rested']} rested")
+    finally:
+        writer.close()
+    print(f"{len(rows)} runs in {time.perf_counter() - start:.1f}s, results in {out}")
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep GameConfig settings over headless runs")
+    parser.add_argument("--set", nargs="+", action="append", default=[], metavar=("NAME", "VALUE"),
+                        help="a GameConfig setting and the values to try (repeatable)")
+    parser.add_argument("--objects", type=int, nargs="+", default=[100], help="object counts to try")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0], help="seeds to run each setting with")
+    parser.add_argument("--steps", type=int, default=1000, help="physics steps per run")
+    parser.add_argument("--dt", type=float, default=1.0 / GameConfig.PHYSICS_HZ,
+                        help="seconds per step")
+    parser.add_argument("--backend", choices=["object", "numpy"], default="numpy",
+                        help="physics backend of every run (each run is already its own process)")
+    parser.add_argument("--workers", type=int, default=0, help="processes (default: all cores)")
+    parser.add_argument("--out", default="sweep.csv", help="result table, .csv or .jsonl")
+    args = parser.parse_args()
+
+    grid = {}
+    for values in args.set:
+        if len(values) < 2:
+            parser.error(f"--set {values[0]} needs at least one value")
+        grid[values[0]] = [parse_value(value) for value in values[1:]]
+    try:
+        scenarios = expand_grid(grid, args.objects, args.seeds, {"PHYSICS_BACKEND": args.backend})
+    except ValueError as error:
+        parser.error(str(error))
+    run_sweep(scenarios, args.steps, args.dt, args.out, args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+# The modules are flat scripts at the repo root and open pygame displays
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from upgraded_game import GameConfig
+
+@pytest.fixture(autouse=True)
+def game_config():
+    """GameConfig, put back the way it was after each test"""
+    saved = {name: value for name, value in vars(GameConfig).items() if name.isupper()}
+    yield GameConfig
+    for name, value in saved.items():
+        setattr(GameConfig, name, value)
+
+@pytest.fixture(scope="session")
+def game3d():
+    """3dgame.py, which isn't an importable module name, loaded from its path"""
+    spec = importlib.util.spec_from_file_location("game3d", os.path.join(ROOT, "3dgame.py"))
+    game = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(game)
+    return game
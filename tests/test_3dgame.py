@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from recording import seed_rngs
+
+@pytest.mark.parametrize("broadphase", ["SweepAndPrune", "LooseOctree"])
+def test_broad_phases_find_every_overlapping_pair(game3d, broadphase):
+    seed_rngs(4)
+    balls = [game3d.BouncingBall() for _ in range(200)]
+    expected = {(i, j) for i in range(len(balls)) for j in range(i + 1, len(balls))
+                if game3d._boxes_overlap(balls[i], balls[j])}
+
+    pairs = getattr(game3d, broadphase)().find_pairs(balls)
+    assert len(pairs) == len(set(pairs))
+    assert {(min(pair), max(pair)) for pair in pairs} == expected
+    assert len(expected) > 50
+
+def test_lod_follows_screen_size_and_fits_the_triangle_budget(game3d):
+    lod = game3d.SphereLOD()
+    # Radii that project to 50, 30, 10 and 4 pixels at depth 1
+    pixels = np.array([50.0, 30.0, 10.0, 4.0])
+    radii = pixels / game3d.projected_radii(np.ones(4), np.ones(4))
+    depths = np.ones(4)
+    assert lod.select(radii, depths).tolist() == [0, 1, 2, 3]
+    # Twice as far away is half the size on screen
+    assert lod.select(radii, depths * 2).tolist() == [1, 2, 3, 3]
+
+    lod.quality_bias = 1
+    assert lod.select(radii, depths).tolist() == [1, 2, 3, 3]
+
+    # Too many fine spheres for the budget: all of them go coarser together
+    lod = game3d.SphereLOD(triangle_budget=40 * lod.level_triangles[1])
+    levels = lod.select(np.repeat(radii[:1], 50), np.ones(50))
+    assert levels.tolist() == [2] * 50
+    assert lod.triangles <= lod.triangle_budget and lod.counts == [0, 0, 50, 0]
+
+def test_culling_keeps_balls_touching_the_frustum_nearest_first(game3d):
+    # gluPerspective and the camera pull-back, as numpy matrices
+    f = 1 / np.tan(np.radians(game3d.FOV_Y) / 2)
+    near, far = game3d.NEAR_PLANE, game3d.FAR_PLANE
+    projection = np.array([[f * game3d.SCREEN_HEIGHT / game3d.SCREEN_WIDTH, 0, 0, 0],
+                           [0, f, 0, 0],
+                           [0, 0, (far + near) / (near - far), 2 * far * near / (near - far)],
+                           [0, 0, -1, 0]])
+    modelview = np.eye(4)
+    modelview[2, 3] = -game3d.CAMERA_DISTANCE
+    culler = game3d.FrustumCuller()
+    culler.current_matrices = lambda: (projection, modelview)
+
+    # The right edge of the view at the origin's depth
+    edge = game3d.CAMERA_DISTANCE / f * game3d.SCREEN_WIDTH / game3d.SCREEN_HEIGHT
+    positions = np.array([(0.0, 0.0, 0.0),         # centre
+                          (0.0, 0.0, 2.0),         # centre, nearer
+                          (0.0, 0.0, 9.0),         # behind the camera
+                          (edge + 3, 0.0, 0.0),    # off to the side
+                          (edge + 0.2, 0.0, 0.0),  # centre outside, but overlapping the edge
+                          (0.0, 0.0, -200.0)])     # past the far plane
+    radii = np.array([0.3, 0.3, 0.3, 0.3, 0.5, 0.3])
+
+    order, depths = culler.visible(positions, radii)
+    assert order.tolist() == [1, 0, 4]
+    assert depths == pytest.approx([6.0, 8.0, 8.0])
+    assert (culler.drawn, culler.culled) == (3, 3)
+
+    culler.enabled = False
+    assert culler.visible(positions, radii)[0].tolist() == [2, 1, 0, 3, 4, 5]
+
+@pytest.mark.parametrize("detail", [6, 24])
+def test_sphere_mesh_is_a_closed_unit_sphere(game3d, detail):
+    mesh = game3d.get_sphere_mesh(detail, detail)
+    assert game3d.get_sphere_mesh(detail, detail) is mesh
+    assert np.allclose(np.linalg.norm(mesh.vertices, axis=1), 1.0)
+
+    triangles = mesh.vertices[mesh.indices.reshape(-1, 3)]
+    assert len(triangles) == 2 * detail * detail
+    # Outward winding: the normal of each non-degenerate triangle points away from the centre
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    areas = np.linalg.norm(normals, axis=1)
+    outward = np.einsum("ij,ij->i", normals, triangles.mean(axis=1))
+    assert np.all(outward[areas > 1e-9] > 0)
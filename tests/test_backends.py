@@ -0,0 +1,67 @@
+import random
+
+import numpy as np
+import pytest
+
+from upgraded_game import GameConfig, ObjectType, PhysicsBody, PhysicsWorld, SimulationCore, Vector2D
+
+def run_core(backend: str, objects: int, steps: int, dt: float):
+    """State, collision total, trails and sleep flags after `steps` steps of a seeded SimulationCore"""
+    GameConfig.PHYSICS_BACKEND = backend
+    GameConfig.PHYSICS_WORKERS = 2
+    random.seed(2)
+    np.random.seed(2)
+    core = SimulationCore()
+    try:
+        types = list(ObjectType)
+        for i in range(objects):
+            core.spawn_object(types[i % len(types)])
+        for _ in range(steps):
+            core.step(dt)
+        return (core.get_state(), core.stats.total_collisions,
+                [core.trails.row_positions(obj.trail_row) for obj in core.objects],
+                [obj.physics.asleep for obj in core.objects])
+    finally:
+        core.close()
+
+@pytest.mark.parametrize("backend", ["numpy", "parallel"])
+@pytest.mark.parametrize("continuous", [False, True])
+def test_backends_are_bit_identical(game_config, backend, continuous):
+    game_config.CONTINUOUS_COLLISION = continuous
+    # Long steps, so the bodies pile up on the floor and into each other, and
+    # light damping, which is per 1/DAMPING_HZ seconds, so they keep moving to get there
+    game_config.PHYSICS_DAMPING = 0.999
+    expected, collisions, trails, asleep = run_core("object", 40, 300, 0.5)
+    state, actual_collisions, actual_trails, actual_asleep = run_core(backend, 40, 300, 0.5)
+
+    assert collisions > 0
+    assert state.keys() == expected.keys()
+    for name in expected:
+        assert np.array_equal(state[name], expected[name]), name
+    assert actual_collisions == collisions
+    assert (actual_trails, actual_asleep) == (trails, asleep)
+
+@pytest.mark.parametrize("backend", ["numpy", "parallel"])
+def test_sleeping_bodies_keep_their_trails(game_config, backend):
+    # No gravity and strong damping, so most bodies settle and fall asleep
+    game_config.GRAVITY = 0.0
+    game_config.PHYSICS_DAMPING = 0.9
+    game_config.OBJECT_COLLISIONS = False
+    dt = 1 / game_config.PHYSICS_HZ
+    _, _, trails, asleep = run_core("object", 20, 200, dt)
+    assert any(asleep)
+    assert run_core(backend, 20, 200, dt)[2:] == (trails, asleep)
+
+def test_damping_per_second_ignores_step_size(game_config):
+    game_config.GRAVITY = 0.0
+    speeds = []
+    for hz in (60, 120, 240):
+        body = PhysicsBody(Vector2D(0.0, 0.0), Vector2D(100.0, 0.0))
+        world = PhysicsWorld(1)
+        world.add_body(Vector2D(0.0, 0.0), Vector2D(100.0, 0.0))
+        for _ in range(hz):
+            body.update(1 / hz)
+            world.step(1 / hz, 10_000, 10_000)
+        assert world.velocities[0, 0] == pytest.approx(body.velocity.x)
+        speeds.append(body.velocity.x)
+    assert speeds == pytest.approx([100.0 * game_config.PHYSICS_DAMPING ** game_config.DAMPING_HZ] * 3)
@@ -0,0 +1,40 @@
+import pygame
+import pytest
+
+from upgraded_game import ObjectType, SpriteCache, TextCache, draw_shape
+
+def test_text_is_rendered_once_and_evicted_least_recently_used():
+    pygame.font.init()
+    cache = TextCache(max_entries=2)
+    fps = cache.render(24, "FPS: 60", (255, 255, 255))
+    objects = cache.render(24, "Objects: 3", (255, 255, 255))
+    assert cache.render(24, "FPS: 60", (255, 255, 255)) is fps
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    # A new color is a new entry, and pushes out the least recently used one
+    cache.render(24, "FPS: 60", (255, 0, 0))
+    assert cache.render(24, "FPS: 60", (255, 255, 255)) is fps
+    assert cache.render(24, "Objects: 3", (255, 255, 255)) is not objects
+    assert len(cache.surfaces) == 2 and len(cache.fonts) == 1
+
+@pytest.mark.parametrize("obj_type", list(ObjectType))
+def test_sprite_blit_matches_drawing_the_shape(obj_type):
+    direct = pygame.Surface((100, 100))
+    draw_shape(direct, obj_type, (50, 50), 31, (200, 120, 40))
+
+    sprite = SpriteCache(1 << 20).get(obj_type, 31, (200, 120, 40))
+    blitted = pygame.Surface((100, 100))
+    blitted.blit(sprite, (50 - sprite.get_width() // 2, 50 - sprite.get_height() // 2))
+    assert pygame.image.tobytes(blitted, "RGB") == pygame.image.tobytes(direct, "RGB")
+
+def test_sprites_are_evicted_past_the_byte_budget():
+    sizes = [20, 30, 40]
+    budget = sum((size + 5) ** 2 * 4 for size in sizes[1:])
+    cache = SpriteCache(budget)
+    first = cache.get(ObjectType.SQUARE, 20, (255, 0, 0))
+    for size in sizes[1:]:
+        cache.get(ObjectType.SQUARE, size, (255, 0, 0))
+
+    assert cache.evictions == 1 and cache.bytes_used <= budget
+    assert cache.get(ObjectType.SQUARE, 40, (255, 0, 0)) is not None and cache.hits == 1
+    assert cache.get(ObjectType.SQUARE, 20, (255, 0, 0)) is not first
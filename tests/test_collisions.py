@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+import upgraded_game
+from upgraded_game import ObjectCollisionSystem, PhysicsWorld, SimulationCore, SpatialHashGrid
+
+def kinetic_energy(core: SimulationCore) -> float:
+    world = core.world
+    n = world.count
+    return float(0.5 * np.sum(world.masses[:n] * np.sum(world.velocities[:n] ** 2, axis=1)))
+
+def test_dense_scene_does_not_gain_energy(game_config):
+    # No gravity or damping to hide it: contacts and walls may only take energy out
+    game_config.GRAVITY = 0.0
+    game_config.PHYSICS_DAMPING = 1.0
+    game_config.SLEEP_BODIES = False
+    game_config.PHYSICS_BACKEND = "numpy"
+    game_config.MAX_OBJECTS = 1000
+    core = SimulationCore()
+    assert core.spawn_batch(1000, seed=0) == 1000
+
+    energy = kinetic_energy(core)
+    for _ in range(60):
+        core.step(1 / game_config.PHYSICS_HZ)
+        latest = kinetic_energy(core)
+        assert latest <= energy * (1 + 1e-9)
+        energy = latest
+
+    positions = core.positions()
+    half = core.world.sizes[:core.world.count, None] / 2
+    assert np.all(np.isfinite(positions))
+    assert np.all(positions >= half - 1e-9)
+    assert np.all(positions <= np.array([core.width, core.height]) - half + 1e-9)
+
+def test_sweep_follows_wall_bounce(game_config):
+    # Body 0 reaches the right wall early in the step and hits body 1 on the
+    # way back; a straight path from its start with either velocity misses it
+    game_config.GRAVITY = 0.0
+    game_config.PHYSICS_DAMPING = 1.0
+    game_config.CONTINUOUS_COLLISION = True
+    world = PhysicsWorld(2)
+    world.add_bodies(np.array([[760.0, 300.0], [742.0, 255.0]]),
+                     np.array([[3000.0, -1500.0], [0.0, 0.0]]), np.array([20.0, 20.0]),
+                     bounce_factors=np.array([0.8, 0.8]))
+    collisions = ObjectCollisionSystem()
+    dt = 0.05
+    world.step(dt, 800, 600)
+    hits_i, _ = collisions.step(world.positions[:2], world.velocities[:2], world.sizes[:2],
+                                world.masses[:2], world.bounce_factors[:2],
+                                world.previous_positions[:2], dt, bounds=(800, 600),
+                                launch_velocities=world.launch_velocities[:2])
+
+    assert collisions.swept_hits == 1 and len(hits_i) == 1
+    assert world.velocities[1, 0] < 0
+    gap = world.positions[1] - world.positions[0]
+    assert np.hypot(*gap) >= 20 - 1e-9
+
+@pytest.mark.parametrize("brute_force", [True, False])
+def test_only_pairs_that_can_tunnel_are_swept(monkeypatch, brute_force):
+    if not brute_force:
+        monkeypatch.setattr(upgraded_game, "_SWEEP_REGROW_LIMIT", 0)
+    # Body 0 crosses body 1 within the step; bodies 2 and 3 are about to meet,
+    # but too slowly to pass through each other, and body 4 is out of reach
+    previous = np.array([[100.0, 300.0], [160.0, 300.0], [400.0, 300.0], [422.0, 300.0],
+                         [100.0, 500.0]])
+    launch = np.array([[3000.0, 0.0], [0.0, 0.0], [50.0, 0.0], [-50.0, 0.0], [0.0, 0.0]])
+    sizes = np.full(5, 20.0)
+    i, j = ObjectCollisionSystem().tunnelling(previous, launch, sizes, np.ones(5), 0.05)
+    assert sorted(zip(i.tolist(), j.tolist())) == [(0, 1)]
+
+    # Still caught by the full step, which resolves 2 and 3 in the overlap pass
+    positions = previous + launch * 0.05
+    collisions = ObjectCollisionSystem()
+    hits_i, hits_j = collisions.step(positions, launch.copy(), sizes, np.ones(5), np.ones(5),
+                                     previous, 0.05, launch_velocities=launch)
+    assert (collisions.swept_hits, collisions.overlap_hits) == (1, 1)
+    assert sorted(zip(hits_i.tolist(), hits_j.tolist())) == [(0, 1), (2, 3)]
+
+def test_spatial_hash_finds_every_contact():
+    rng = np.random.default_rng(5)
+    positions = rng.uniform(0, 400, (600, 2))
+    sizes = rng.uniform(4, 30, 600)
+    # Negative coordinates and coincident centres must hash like any others
+    positions[:10] -= 420
+    positions[10] = positions[11]
+
+    grid = SpatialHashGrid()
+    grid.rebuild(positions, sizes)
+    i, j = grid.candidate_pairs()
+    found = {(min(a, b), max(a, b)) for a, b in zip(i.tolist(), j.tolist())}
+    assert len(found) == len(i)  # each candidate pair once
+
+    gaps = np.linalg.norm(positions[:, None] - positions[None, :], axis=-1)
+    contact = np.triu(gaps < (sizes[:, None] + sizes[None, :]) / 2, k=1)
+    brute = set(zip(*(rows.tolist() for rows in np.nonzero(contact))))
+    assert brute
+    assert {pair for pair in found if contact[pair]} == brute
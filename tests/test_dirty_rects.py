@@ -0,0 +1,33 @@
+import pygame
+
+from upgraded_game import DirtyRectRenderer
+
+def test_moving_object_is_erased_and_only_dirty_areas_pushed(monkeypatch):
+    pushed = []
+    monkeypatch.setattr(pygame.display, "flip", lambda: pushed.append(None))
+    monkeypatch.setattr(pygame.display, "update", lambda rects: pushed.append(list(rects)))
+    screen = pygame.Surface((200, 100))
+    background = pygame.Surface((200, 100))
+    background.fill((20, 25, 40))
+    renderer = DirtyRectRenderer(screen, background, max_coverage=0.5)
+
+    def frame(rect):
+        renderer.restore()
+        renderer.present([screen.fill((255, 0, 0), rect)])
+
+    frame(pygame.Rect(10, 10, 20, 20))
+    frame(pygame.Rect(50, 10, 20, 20))
+
+    # The first frame is pushed whole, the second only where the square was and is
+    assert pushed[0] is None
+    for square in (pygame.Rect(10, 10, 20, 20), pygame.Rect(50, 10, 20, 20)):
+        assert any(rect.contains(square) for rect in pushed[1])
+    assert sum(rect.width * rect.height for rect in pushed[1]) < 200 * 100 / 2
+    expected = background.copy()
+    expected.fill((255, 0, 0), pygame.Rect(50, 10, 20, 20))
+    assert pygame.image.tobytes(screen, "RGB") == pygame.image.tobytes(expected, "RGB")
+
+    # Past max_coverage a full flip is cheaper
+    frame(pygame.Rect(0, 0, 150, 100))
+    assert pushed[2] is None
+    assert (renderer.full_flips, renderer.partial_updates) == (2, 1)
@@ -0,0 +1,35 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_fresh(script: str) -> dict:
+    """JSON printed last by `script`, run in a fresh interpreter with no
+    display to fall back on, so nothing earlier in the test session can
+    have initialised pygame for it"""
+    env = {name: value for name, value in os.environ.items()
+           if name not in ("DISPLAY", "WAYLAND_DISPLAY", "SDL_VIDEODRIVER")}
+    output = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, timeout=60,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+def test_headless_run_needs_no_display_or_fonts():
+    result = run_fresh("import json, pygame, upgraded_game\n"
+                       "result = upgraded_game.run_headless(10, 50)\n"
+                       "result['pygame'] = [pygame.get_init(), pygame.display.get_init(),\n"
+                       "                    pygame.font.get_init()]\n"
+                       "print(json.dumps(result))\n")
+    assert result["pygame"] == [False, False, False]
+    assert result["objects"] == 10 and result["steps"] == 50
+    assert result["steps_per_second"] > 0
+
+def test_importing_the_games_initialises_nothing():
+    # game.py would run its loop and never return if it still did so on import
+    result = run_fresh("import importlib.util, json, sys, pygame, game, upgraded_game\n"
+                       "spec = importlib.util.spec_from_file_location('game3d', '3dgame.py')\n"
+                       "spec.loader.exec_module(importlib.util.module_from_spec(spec))\n"
+                       "print(json.dumps([pygame.get_init(), pygame.display.get_init(),\n"
+                       "                  any(name.startswith('OpenGL') for name in sys.modules)]))\n")
+    assert result == [False, False, False]
@@ -0,0 +1,34 @@
+from upgraded_game import ParticlePool, Vector2D
+
+def bursts(pool: ParticlePool):
+    """The burst each live particle came from, oldest first"""
+    return pool.copy().colors[:len(pool), 0].tolist()
+
+def test_full_pool_overwrites_its_oldest_particles():
+    pool = ParticlePool(10)
+    for burst in range(4):
+        pool.emit(Vector2D(50.0, 50.0), (burst, 0, 0), 3)
+
+    # The last burst wrapped around the ring, over all of the first burst but
+    # its newest particle
+    assert pool.head == 2
+    assert bursts(pool) == [0, 1, 1, 1, 2, 2, 2, 3, 3, 3]
+
+    pool.update(0.1)
+    assert bursts(pool) == [0, 1, 1, 1, 2, 2, 2, 3, 3, 3]
+
+    # Expiring particles compacts the wrapped ring back to the front
+    pool.life[[2, 9, 0]] = 0.0
+    pool.update(0.1)
+    assert pool.head == 0
+    assert bursts(pool) == [1, 1, 1, 2, 2, 2, 3]
+
+def test_lowering_the_limit_keeps_the_newest_particles():
+    pool = ParticlePool(10)
+    for burst in range(4):
+        pool.emit(Vector2D(50.0, 50.0), (burst, 0, 0), 3)
+    pool.limit = 4
+    assert bursts(pool) == [2, 3, 3, 3]
+
+    pool.emit(Vector2D(50.0, 50.0), (4, 0, 0), 2)
+    assert bursts(pool) == [3, 3, 4, 4]
@@ -0,0 +1,70 @@
+import csv
+import json
+
+import numpy as np
+import pytest
+
+import profiler
+from profiler import FrameProfiler, QualityGovernor
+
+def test_phases_sum_per_frame_and_keep_the_last_window(monkeypatch, tmp_path):
+    clock = [0.0]
+    monkeypatch.setattr(profiler.time, "perf_counter", lambda: clock[0])
+    frames = FrameProfiler(window=4)
+
+    def spend(name, seconds):
+        with frames.phase(name):
+            clock[0] += seconds
+
+    for frame in range(6):
+        spend("update", 0.001)
+        spend("update", 0.002)  # a second substep adds to the first
+        if frame >= 3:
+            spend("render", 0.010)
+        frames.end_frame()
+
+    assert frames.phase_names == ["render", "update", "frame"]
+    assert frames.samples("update") == pytest.approx([0.003] * 4)
+    # Only frames 3 to 5 rendered, the oldest buffered frame reads zero
+    assert frames.samples("render") == pytest.approx([0.0, 0.010, 0.010, 0.010])
+    assert frames.samples("frame") == pytest.approx([0.003, 0.013, 0.013, 0.013])
+    assert frames.percentiles("frame")[0] == pytest.approx(0.013)
+
+    frames.export(str(tmp_path / "profile.json"))
+    exported = json.loads((tmp_path / "profile.json").read_text())
+    assert exported["frames"] == 6 and exported["window"] == 4
+    assert exported["samples_ms"]["render"] == pytest.approx([0.0, 10.0, 10.0, 10.0])
+    assert exported["summary_ms"]["update"]["max"] == pytest.approx(3.0)
+
+    frames.export(str(tmp_path / "profile.csv"))
+    with open(tmp_path / "profile.csv", newline="") as handle:
+        rows = list(csv.reader(handle))
+    assert rows[0] == ["frame", "render_ms", "update_ms", "frame_ms"]
+    assert [int(row[0]) for row in rows[1:]] == [2, 3, 4, 5]
+    assert np.allclose(np.array(rows[1:], dtype=float)[:, 1:],
+                       [[0.0, 3.0, 3.0], [10.0, 3.0, 13.0], [10.0, 3.0, 13.0], [10.0, 3.0, 13.0]])
+
+def test_governor_steps_down_over_budget_and_recovers_with_hysteresis():
+    governor = QualityGovernor(frame_budget=0.016, levels=3, window=10, headroom=0.7, recover_frames=30)
+
+    def frames_until_change(frame_time, limit=200):
+        for frame in range(1, limit + 1):
+            if governor.update(frame_time):
+                return frame
+        return None
+
+    # A full window over budget per step down
+    assert frames_until_change(0.030) == 10 and governor.level == 1
+    assert frames_until_change(0.030) == 10 and governor.level == 2
+    # Under the headroom it comes back only after recover_frames
+    assert frames_until_change(0.005) == 30 and governor.level == 1
+    assert governor.describe() == "quality 2/3"
+    # Dropping straight back doubles the wait before the next raise
+    assert frames_until_change(0.030) == 10 and governor.level == 2
+    assert frames_until_change(0.005) == 60 and governor.level == 1
+
+    # Never past the cheapest level, and between the headroom and the
+    # budget nothing changes
+    assert frames_until_change(0.030) == 10 and governor.level == 2
+    assert frames_until_change(0.030) is None
+    assert frames_until_change(0.014) is None and governor.level == 2
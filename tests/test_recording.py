@@ -0,0 +1,76 @@
+import json
+
+import numpy as np
+import pygame
+import pytest
+
+from recording import BackgroundWriter, FrameEncoder, Recorder, ReplayFile, seed_rngs
+from upgraded_game import GameConfig, create_recorder, run_headless
+
+def record(path, seed: int, backend: str = "object") -> bytes:
+    """Bytes of a headless recording of 30 objects for 120 steps"""
+    GameConfig.PHYSICS_BACKEND = backend
+    GameConfig.MAX_OBJECTS = 30
+    dt = 1 / GameConfig.FPS
+    seed_rngs(seed)
+    run_headless(30, 120, dt, create_recorder(str(path), dt, seed))
+    return path.read_bytes()
+
+def test_recordings_repeat_byte_for_byte(tmp_path):
+    first = record(tmp_path / "first.rec", 7)
+    assert record(tmp_path / "again.rec", 7) == first
+    assert record(tmp_path / "numpy.rec", 7, "numpy") == first
+    assert record(tmp_path / "other.rec", 8) != first
+
+def test_writer_error_is_raised_not_hung(tmp_path):
+    def encode(item):
+        raise KeyError(item)
+
+    writer = BackgroundWriter(tmp_path / "out.bin", max_pending=2, encode=encode)
+    with pytest.raises(IOError) as raised:
+        # Far more items than the queue holds: a dead writer would block here
+        for item in range(100):
+            writer.write(item)
+    assert isinstance(raised.value.__cause__, KeyError)
+    with pytest.raises(IOError):
+        writer.close()
+
+def test_3d_recording_plays_back_as_ball_arrays(tmp_path, game3d):
+    game = game3d
+    seed_rngs(3)
+    balls = [game.BouncingBall() for _ in range(5)]
+    recorder = Recorder(tmp_path / "balls.rec", game.RECORD_CAPACITY, game.RECORD_FIELDS,
+                        game.RECORD_LAYOUT, game.SCREEN_WIDTH, game.SCREEN_HEIGHT, 1 / 60, 3)
+    expected = []
+    for step in range(10):
+        for ball in balls:
+            ball.update_position()
+        recorder.record(step, game.ball_rows(balls))
+        expected.append(game.ball_arrays(balls))
+    recorder.close()
+
+    replay = ReplayFile(tmp_path / "balls.rec")
+    assert replay.layout == game.RECORD_LAYOUT and len(replay) == 10
+    for frame, arrays in enumerate(expected):
+        for played, live in zip(game.row_arrays(replay[frame]), arrays):
+            assert np.array_equal(played, live)
+
+@pytest.mark.parametrize("fmt", ["png", "raw"])
+def test_encoded_frames_hold_the_submitted_pixels_in_order(tmp_path, fmt):
+    rng = np.random.default_rng(6)
+    frames = [rng.integers(0, 256, (5, 7, 3), dtype=np.uint8) for _ in range(9)]
+    encoder = FrameEncoder(tmp_path, 7, 5, fmt, workers=3, max_pending=2)
+    for frame in frames:
+        encoder.submit(frame.tobytes())
+    encoder.close()
+
+    for index, frame in enumerate(frames):
+        if fmt == "png":
+            image = pygame.image.load(str(tmp_path / f"frame_{index:06d}.png"))
+            written = pygame.image.tobytes(image, "RGB")
+        else:
+            written = (tmp_path / f"frame_{index:06d}.rgb").read_bytes()
+        assert written == frame.tobytes()
+    if fmt == "raw":
+        manifest = json.loads((tmp_path / "frames.json").read_text())
+        assert (manifest["width"], manifest["height"], manifest["frames"]) == (7, 5, 9)
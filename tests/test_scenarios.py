@@ -0,0 +1,23 @@
+import numpy as np
+
+from upgraded_game import EXAMPLE_SCENARIO, GameConfig, Scenario, SimulationCore
+
+def test_example_scenario_runs():
+    scenario = Scenario.from_dict(EXAMPLE_SCENARIO)
+    scenario.apply_config()
+    core = SimulationCore()
+    assert scenario.populate(core) == scenario.count == 1700
+
+    for _ in range(30):
+        core.step(1 / GameConfig.PHYSICS_HZ)
+
+    positions = core.positions()
+    assert np.all(np.isfinite(positions))
+    assert np.all((positions >= 0) & (positions <= [core.width, core.height]))
+    assert np.all(np.isfinite(core.speeds()))
+
+def test_scenario_round_trip(tmp_path):
+    scenario = Scenario.from_dict(EXAMPLE_SCENARIO)
+    path = tmp_path / "scene.json"
+    scenario.save(str(path))
+    assert Scenario.load(str(path)) == scenario
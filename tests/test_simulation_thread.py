@@ -0,0 +1,34 @@
+import time
+
+from simulation_thread import SimulationThread
+
+def test_snapshots_are_double_buffered():
+    steps = [0]
+    buffers = []
+
+    def make_buffer():
+        buffers.append([None])
+        return buffers[-1]
+
+    def snapshot(buffer):
+        buffer[0] = steps[0]
+        return buffer
+
+    def step():
+        steps[0] += 1
+
+    thread = SimulationThread(step, snapshot, 0.001, make_buffer)
+    thread.start()
+    try:
+        seen = []
+        for _ in range(20):
+            held = thread.latest
+            value = held[0]
+            # The worker keeps stepping but must not refill the held buffer
+            time.sleep(0.01)
+            assert held[0] == value
+            seen.append(value)
+    finally:
+        thread.stop()
+    assert len(buffers) == 2
+    assert seen == sorted(seen) and seen[-1] > seen[0]
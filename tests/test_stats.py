@@ -0,0 +1,15 @@
+import numpy as np
+
+from upgraded_game import GameConfig, GameStats, ObjectType
+
+def test_sample_skips_non_finite_speeds():
+    stats = GameStats()
+    stats.on_spawn_batch([ObjectType.CIRCLE] * 5)
+    stats.update(GameConfig.STATS_SAMPLE_INTERVAL)
+    stats.sample(np.array([0.0, np.nan, np.inf, 1e300, GameConfig.SPEED_HISTOGRAM_MAX / 2]))
+
+    assert stats.speed_histogram.sum() == 3
+    assert stats.speed_histogram[0] == 1
+    assert stats.speed_histogram[-1] == 1
+    assert stats.speed_histogram[GameConfig.SPEED_HISTOGRAM_BINS // 2] == 1
+    assert stats.resting == 1
@@ -0,0 +1,21 @@
+import json
+
+from sweep import expand_grid, run_scenario, run_sweep
+
+def test_sweep_rows_match_running_each_scenario_alone(tmp_path):
+    scenarios = expand_grid({"GRAVITY": [0.1, 1.0], "BOUNCE_FACTOR_RANGE": [[0.5, 0.7]]},
+                            [6, 12], [0, 1], {"PHYSICS_BACKEND": "numpy"})
+    assert len(scenarios) == 8
+    assert {(s.config["GRAVITY"], s.count, s.seed) for s in scenarios} == {
+        (gravity, count, seed) for gravity in (0.1, 1.0) for count in (6, 12) for seed in (0, 1)}
+
+    # One reused worker, so each run must start from the default GameConfig
+    out = tmp_path / "sweep.jsonl"
+    rows = run_sweep(scenarios, 60, 1 / 120, str(out), workers=1)
+    streamed = [json.loads(line) for line in out.read_text().splitlines()]
+    assert streamed == rows and sorted(row["run"] for row in rows) == list(range(8))
+
+    for row in rows:
+        alone = run_scenario(scenarios[row["run"]], 60, 1 / 120)
+        assert row["objects"] == alone["objects"] == scenarios[row["run"]].count
+        assert (row["total_collisions"], row["rested"]) == (alone["total_collisions"], alone["rested"])
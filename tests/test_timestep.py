@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pygame
+import pytest
+
+from recording import seed_rngs
+from upgraded_game import BouncingSimulation, GameConfig
+
+def test_hitch_is_capped_and_rendering_interpolates(game_config, monkeypatch):
+    game_config.PHYSICS_HZ = 100
+    game_config.MAX_SUBSTEPS = 5
+    sim = BouncingSimulation(screen=pygame.Surface((GameConfig.WIDTH, GameConfig.HEIGHT)), threaded=False)
+    sim.last_time = 0
+    # Frame times in ms: two short frames, a one second hitch, a short frame
+    ticks = iter([15, 27, 1032, 1045])
+    frames = []
+    monkeypatch.setattr(pygame.time, "get_ticks", lambda: next(ticks))
+    monkeypatch.setattr(pygame, "quit", lambda: None)
+    sim.handle_events = lambda: frames.append(0)
+    sim.clock = SimpleNamespace(tick=lambda fps: 0)
+    sim.update_quality = lambda: setattr(sim, "running", len(frames) < 4)
+
+    def update_simulation(dt):
+        assert dt == 0.01
+        frames[-1] += 1
+    alphas = []
+    sim.update_simulation = update_simulation
+    sim.render = lambda alpha: alphas.append(alpha)
+    sim.run()
+
+    # The hitch runs MAX_SUBSTEPS steps and drops the rest of its backlog
+    assert frames == [1, 1, 5, 1]
+    assert alphas == pytest.approx([0.5, 0.7, 0.2, 0.5])
+
+def offscreen_positions(fps: int, frames: int):
+    """Object positions after rendering `frames` offscreen frames at `fps`"""
+    GameConfig.FPS = fps
+    seed_rngs(5)
+    sim = BouncingSimulation(screen=pygame.Surface((GameConfig.WIDTH, GameConfig.HEIGHT)), threaded=False)
+    sim.core.spawn_batch(10)
+    sim.run_offscreen(frames, SimpleNamespace(submit=lambda frame: None, close=lambda: None))
+    return sim.core.positions().copy()
+
+def test_physics_does_not_depend_on_render_rate(game_config):
+    game_config.PHYSICS_HZ = 120
+    assert np.array_equal(offscreen_positions(30, 40), offscreen_positions(60, 80))
@@ -0,0 +1,51 @@
+from collections import deque
+
+import numpy as np
+
+from upgraded_game import SpriteCache, TrailBuffer
+
+def test_rows_keep_their_newest_positions_oldest_first():
+    trails = TrailBuffer(4, capacity=1)
+    rows = trails.add_rows(3)
+    expected = [deque(maxlen=4) for _ in rows]
+    rng = np.random.default_rng(1)
+    for step in range(11):
+        points = rng.uniform(0, 500, (3, 2))
+        if step % 3:
+            trails.record(points)
+            updated = list(rows)
+        else:
+            trails.record(points[1:], np.array([1, 2]))
+            updated = [1, 2]
+        for row in updated:
+            expected[row].append(tuple(points[row].tolist()))
+    trails.record_row(0, 7.5, 8.5)
+    expected[0].append((7.5, 8.5))
+
+    assert trails.capacity >= 3
+    assert [trails.row_positions(row) for row in rows] == [list(trail) for trail in expected]
+
+def test_blit_sequence_matches_drawing_each_trail():
+    trails = TrailBuffer(6)
+    rng = np.random.default_rng(2)
+    for _ in range(2):
+        trails.add_row()
+    for step in range(9):
+        # The second trail starts late, so the two are filled to different lengths
+        rows = np.arange(2 if step > 4 else 1)
+        trails.record(rng.uniform(0, 500, (len(rows), 2)), rows)
+    sizes = np.array([40.0, 30.0])
+    colors = [(255, 0, 0), (0, 255, 0)]
+    sprites = SpriteCache(1 << 20)
+
+    for length in (None, 3):
+        expected = []
+        for row in range(2):
+            trail = trails.row_positions(row)[-length if length else 0:]
+            # The newest point is under the object, circles grow towards it
+            for age, (x, y) in enumerate(trail[:-1]):
+                radius = int(sizes[row] / 4 * age / len(trail))
+                if radius > 0:
+                    stamp = sprites.trail_stamp(radius, colors[row], int(255 * age / len(trail)))
+                    expected.append((stamp, (int(x) - radius, int(y) - radius)))
+        assert trails.blit_sequence(sizes, colors, sprites, length) == expected
@@ -1,12 +1,22 @@
+import argparse
+import copy
+import json
+import multiprocessing
+import multiprocessing.synchronize
 import pygame
 import random
 import math
-from typing import List, Dict, Tuple
+import time
+import numpy as np
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from typing import Any, List, Dict, Tuple, Optional, Sequence, Union
 from dataclasses import dataclass
 from enum import Enum
 
-# Initialize Pygame
-pygame.init()
+from profiler import FrameProfiler, ProfilerOverlay, QualityGovernor
+from recording import FrameEncoder, Recorder, ReplayFile, TelemetrySink, new_seed, seed_rngs
+from simulation_thread import SimulationThread
 
 # Constants and Configuration
 class GameConfig:
@@ -15,8 +25,39 @@ class GameConfig:
     HEIGHT = 600
     FPS = 60
     MAX_OBJECTS = 15
-    PHYSICS_DAMPING = 0.98
+    PHYSICS_DAMPING = 0.98  # velocity kept per 1/DAMPING_HZ seconds, whatever the step (see step_damping)
+    DAMPING_HZ = 60  # rate PHYSICS_DAMPING is given at, fixed so the FPS render rate can't change the drag
     GRAVITY = 0.3
+    BOUNCE_FACTOR_RANGE = (0.7, 0.9)  # each body's restitution is drawn uniformly from this
+    PHYSICS_HZ = 120  # fixed physics rate, independent of the FPS render rate
+    MAX_SUBSTEPS = 5  # catch-up steps per rendered frame before the backlog is dropped
+    PHYSICS_BACKEND = "object"  # "object", "numpy" (PhysicsWorld) or "parallel"
+    PHYSICS_WORKERS = 4  # worker processes for the "parallel" backend
+    OBJECT_COLLISIONS = True
+    CONTINUOUS_COLLISION = False  # swept wall and object impacts, so large steps don't tunnel
+    MAX_WALL_HITS = 4  # wall impacts resolved per body per step before falling back to a clamp
+    MAX_OBJECT_HITS = 8  # swept object impacts per body per step before the overlap pass takes over
+    SLEEP_BODIES = True  # stop stepping bodies that have settled until something disturbs them
+    SLEEP_SPEED = 0.05  # speed below which a body counts toward falling asleep...
+    SLEEP_GRAVITY_STEPS = 3  # ...plus this many steps of gravity, the jitter of a body resting in a pile
+    SLEEP_STEPS = 60  # consecutive slow physics steps before a body sleeps
+    WAKE_RADIUS = 100  # spawning an object wakes sleeping bodies this close (px)
+    MAX_PARTICLES = 2000
+    TEXT_CACHE_SIZE = 128  # rendered HUD/menu strings kept before LRU eviction
+    DIRTY_RECTS = False  # redraw/push only changed screen areas instead of flipping
+    DIRTY_RECT_MAX_COVERAGE = 0.4  # fraction of the screen above which we flip anyway
+    COLOR_PALETTE_SIZE = 64  # precomputed object colors, keeps the sprite cache small
+    SPRITE_CACHE_BYTES = 8 * 1024 * 1024
+    TRAIL_LENGTH = 8  # positions kept per object in the shared trail ring buffer
+    STATS_SAMPLE_INTERVAL = 0.25  # simulated seconds between telemetry samples
+    SPEED_HISTOGRAM_MAX = 4.0  # speeds covered by the histogram (the last bin is open ended)
+    SPEED_HISTOGRAM_BINS = 16
+    REST_SPEED = 0.05  # speed below which an object counts as at rest
+    TELEMETRY_PATH: Optional[str] = None  # .jsonl or binary stats stream, None to disable
+    SIMULATION_THREAD = False  # step physics on a worker thread and render its snapshots
+    QUALITY_GOVERNOR = True  # lower the detail below while frames run over the FPS budget
+    # Best first: trail positions drawn, live particle cap (None for all), object outlines
+    QUALITY_LEVELS = ((None, None, True), (5, 800, True), (3, 300, False), (0, 100, False))
     
     # Color schemes
     COLORS = {
@@ -34,6 +75,16 @@ class ObjectType(Enum):
     TRIANGLE = "triangle"
     HEXAGON = "hexagon"
 
+OBJECT_TYPES = list(ObjectType)
+
+# Anything np.random.default_rng accepts, e.g. an int or a list of ints
+SeedLike = Union[int, Sequence[int]]
+
+def step_damping(dt: float) -> float:
+    """Velocity factor for a physics step of dt seconds, so the drag per second
+    stays the same at any PHYSICS_HZ, FPS or step size"""
+    return GameConfig.PHYSICS_DAMPING ** (dt * GameConfig.DAMPING_HZ)
+
 @dataclass
 class Vector2D:
     """Data structure to represent 2D vectors for position and velocity"""
@@ -57,12 +108,18 @@ class Vector2D:
 
 class PhysicsBody:
     """Advanced physics component for realistic movement"""
-    def __init__(self, position: Vector2D, velocity: Vector2D, mass: float = 1.0):
+    def __init__(self, position: Vector2D, velocity: Vector2D, mass: float = 1.0,
+                 bounce_factor: Optional[float] = None):
         self.position = position
+        self.previous_position = Vector2D(position.x, position.y)
         self.velocity = velocity
+        self.launch_velocity = Vector2D(velocity.x, velocity.y)
         self.acceleration = Vector2D(0, 0)
         self.mass = mass
-        self.bounce_factor = random.uniform(0.7, 0.9)
+        self.size = 0.0
+        self.bounce_factor = random.uniform(*GameConfig.BOUNCE_FACTOR_RANGE) if bounce_factor is None else bounce_factor
+        self.asleep = False
+        self.sleep_counter = 0
         
     def apply_force(self, force: Vector2D):
         """Apply force based on F = ma"""
@@ -70,116 +127,1549 @@ class PhysicsBody:
     
     def update(self, dt: float):
         """Update physics using Verlet integration"""
+        self.previous_position = Vector2D(self.position.x, self.position.y)
         self.velocity = self.velocity + self.acceleration * dt
-        self.velocity = self.velocity * GameConfig.PHYSICS_DAMPING
+        self.velocity = self.velocity * step_damping(dt)
         self.position = self.position + self.velocity * dt
         self.acceleration = Vector2D(0, 0)
 
-class ParticleEffect:
-    """Particle system for visual effects"""
-    def __init__(self, position: Vector2D, color: Tuple[int, int, int]):
-        self.particles = []
-        for _ in range(random.randint(3, 8)):
-            particle = {
-                'pos': Vector2D(position.x, position.y),
-                'vel': Vector2D(random.uniform(-3, 3), random.uniform(-3, 3)),
-                'life': random.uniform(0.5, 1.5),
-                'color': color,
-                'size': random.randint(2, 5)
-            }
-            self.particles.append(particle)
-    
+    def update_sleep(self, threshold: float, steps: int) -> bool:
+        """Count slow steps and fall asleep after `steps` of them; True when it just did"""
+        if self.asleep:
+            return False
+        if math.hypot(self.velocity.x, self.velocity.y) >= threshold:
+            self.sleep_counter = 0
+            return False
+        self.sleep_counter += 1
+        if self.sleep_counter < steps:
+            return False
+        self.asleep = True
+        self.velocity = Vector2D(0, 0)
+        self.previous_position = Vector2D(self.position.x, self.position.y)
+        return True
+
+    def wake(self):
+        self.asleep = False
+        self.sleep_counter = 0
+
+class ArrayVector2D:
+    """Mutable Vector2D view onto one row of a PhysicsWorld array"""
+    __slots__ = ("_world", "_field", "_index")
+
+    def __init__(self, world: "PhysicsWorld", field: str, index: int):
+        self._world = world
+        self._field = field
+        self._index = index
+
+    @property
+    def x(self) -> float:
+        return float(getattr(self._world, self._field)[self._world.slot(self._index), 0])
+
+    @x.setter
+    def x(self, value: float):
+        getattr(self._world, self._field)[self._world.slot(self._index), 0] = value
+
+    @property
+    def y(self) -> float:
+        return float(getattr(self._world, self._field)[self._world.slot(self._index), 1])
+
+    @y.setter
+    def y(self, value: float):
+        getattr(self._world, self._field)[self._world.slot(self._index), 1] = value
+
+    def __add__(self, other):
+        return Vector2D(self.x + other.x, self.y + other.y)
+
+    def __mul__(self, scalar):
+        return Vector2D(self.x * scalar, self.y * scalar)
+
+    def magnitude(self):
+        return math.sqrt(self.x**2 + self.y**2)
+
+    def normalize(self):
+        return Vector2D(self.x, self.y).normalize()
+
+    def __repr__(self):
+        return f"ArrayVector2D(x={self.x}, y={self.y})"
+
+def _row_vector_property(field: str):
+    """Property exposing row `index` of a PhysicsWorld (N, 2) array as a vector"""
+    def getter(self):
+        return ArrayVector2D(self.world, field, self.index)
+
+    def setter(self, value):
+        getattr(self.world, field)[self.world.slot(self.index)] = (value.x, value.y)
+
+    return property(getter, setter)
+
+def _row_scalar_property(field: str):
+    """Property exposing row `index` of a PhysicsWorld (N,) array as a Python scalar"""
+    def getter(self):
+        return getattr(self.world, field)[self.world.slot(self.index)].item()
+
+    def setter(self, value):
+        getattr(self.world, field)[self.world.slot(self.index)] = value
+
+    return property(getter, setter)
+
+class ArrayPhysicsBody:
+    """PhysicsBody-compatible view onto one row of a PhysicsWorld"""
+    def __init__(self, world: "PhysicsWorld", index: int):
+        self.world = world
+        self.index = index
+
+    position = _row_vector_property("positions")
+    previous_position = _row_vector_property("previous_positions")
+    velocity = _row_vector_property("velocities")
+    launch_velocity = _row_vector_property("launch_velocities")
+    acceleration = _row_vector_property("accelerations")
+    mass = _row_scalar_property("masses")
+    size = _row_scalar_property("sizes")
+    bounce_factor = _row_scalar_property("bounce_factors")
+    asleep = _row_scalar_property("asleep")
+    sleep_counter = _row_scalar_property("sleep_counters")
+
+    def apply_force(self, force: Vector2D):
+        """Apply force based on F = ma"""
+        self.world.accelerations[self.world.slot(self.index)] += (force.x / self.mass, force.y / self.mass)
+
     def update(self, dt: float):
-        """Update particle positions and lifetimes"""
-        self.particles = [p for p in self.particles if p['life'] > 0]
-        for particle in self.particles:
-            particle['pos'] = particle['pos'] + particle['vel'] * dt
-            particle['vel'] = particle['vel'] * 0.95
-            particle['life'] -= dt
-            particle['size'] = max(1, int(particle['size'] * 0.98))
+        """Integrate this row only (PhysicsWorld.step integrates all rows at once)"""
+        world = self.world
+        i = world.slot(self.index)
+        world.previous_positions[i] = world.positions[i]
+        world.velocities[i] += world.accelerations[i] * dt
+        world.velocities[i] *= step_damping(dt)
+        world.positions[i] += world.velocities[i] * dt
+        world.accelerations[i] = 0.0
+
+    def wake(self):
+        self.world.wake(np.array([self.index]))
+
+class PhysicsWorld:
+    """Struct-of-arrays physics backend that steps every body in one vectorized pass"""
+    def __init__(self, capacity: int = 64):
+        self.count = 0
+        self.capacity = 0
+        self.positions = np.zeros((0, 2))
+        self.previous_positions = np.zeros((0, 2))
+        self.velocities = np.zeros((0, 2))
+        self.launch_velocities = np.zeros((0, 2))  # velocity each body left previous_positions with
+        self.accelerations = np.zeros((0, 2))
+        self.masses = np.zeros(0)
+        self.sizes = np.zeros(0)
+        self.bounce_factors = np.zeros(0)
+        self.asleep = np.zeros(0, dtype=bool)
+        self.sleep_counters = np.zeros(0, dtype=np.int64)
+        self._grow(capacity)
+
+    def _grow(self, capacity: int):
+        """Reallocate every array to hold at least `capacity` rows"""
+        capacity = max(capacity, 1)
+        for field in ("positions", "previous_positions", "velocities", "launch_velocities",
+                      "accelerations", "masses", "sizes", "bounce_factors", "asleep",
+                      "sleep_counters"):
+            old = getattr(self, field)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, field, new)
+        self.capacity = capacity
+
+    def add_body(self, position: Vector2D, velocity: Vector2D, mass: float = 1.0) -> ArrayPhysicsBody:
+        """Append a body and return a view onto its row"""
+        if self.count == self.capacity:
+            self._grow(self.capacity * 2)
+        i = self.count
+        self.positions[i] = (position.x, position.y)
+        self.previous_positions[i] = self.positions[i]
+        self.velocities[i] = (velocity.x, velocity.y)
+        self.launch_velocities[i] = self.velocities[i]
+        self.accelerations[i] = 0.0
+        self.masses[i] = mass
+        self.sizes[i] = 0.0
+        self.bounce_factors[i] = random.uniform(*GameConfig.BOUNCE_FACTOR_RANGE)
+        self.asleep[i] = False
+        self.sleep_counters[i] = 0
+        self.count += 1
+        return ArrayPhysicsBody(self, i)
+
+    def add_bodies(self, positions: np.ndarray, velocities: np.ndarray, sizes: np.ndarray,
+                   masses: float = 1.0, bounce_factors: Optional[np.ndarray] = None) -> range:
+        """Append many bodies in one pass and return their row range"""
+        count = len(positions)
+        if self.count + count > self.capacity:
+            self._grow(max(self.capacity * 2, self.count + count))
+        rows = slice(self.count, self.count + count)
+        self.positions[rows] = positions
+        self.previous_positions[rows] = positions
+        self.velocities[rows] = velocities
+        self.launch_velocities[rows] = velocities
+        self.accelerations[rows] = 0.0
+        self.masses[rows] = masses
+        self.sizes[rows] = sizes
+        if bounce_factors is None:
+            bounce_factors = np.random.uniform(*GameConfig.BOUNCE_FACTOR_RANGE, count)
+        self.bounce_factors[rows] = bounce_factors
+        self.asleep[rows] = False
+        self.sleep_counters[rows] = 0
+        self.count += count
+        return range(rows.start, rows.stop)
+
+    def clear(self):
+        """Remove all bodies (existing views become invalid)"""
+        self.count = 0
+
+    def close(self):
+        """Release any resources held by the backend (nothing for in-process arrays)"""
+
+    def slot(self, index: int) -> int:
+        """Array row holding body `index`; the same here, see ParallelPhysicsWorld"""
+        return index
+
+    def ordered(self, field: str) -> np.ndarray:
+        """`field` of every body in index (spawn) order; here a view, so edits go straight in"""
+        return getattr(self, field)[:self.count]
+
+    def store(self, field: str, values: np.ndarray):
+        """Write an edited ordered() array back (nothing to do when it is a view)"""
+        target = getattr(self, field)
+        if not np.shares_memory(values, target):
+            target[:self.count] = values
+
+    def step(self, dt: float, width: int, height: int) -> np.ndarray:
+        """Apply gravity, damping, integration and wall bounces to all bodies.
+
+        Returns a boolean mask of the bodies that hit a wall this step.
+        Sleeping bodies are left exactly where they are.
+        """
+        return self.step_rows(vars(self), slice(0, self.count), dt, width, height,
+                              GameConfig.GRAVITY, step_damping(dt),
+                              GameConfig.CONTINUOUS_COLLISION)
+
+    @staticmethod
+    def step_rows(arrays: Dict[str, np.ndarray], rows: slice, dt: float, width: float, height: float,
+                  gravity: float, damping: float, continuous: bool) -> np.ndarray:
+        """step() on the contiguous `rows` of `arrays` (field name to array), edited in
+        place; shared with the strip workers. Returns the wall-bounce mask of those rows."""
+        asleep = arrays["asleep"][rows]
+        sizes, bounce = arrays["sizes"][rows], arrays["bounce_factors"][rows]
+        if not asleep.any():
+            return PhysicsWorld.integrate(arrays["positions"][rows], arrays["previous_positions"][rows],
+                                          arrays["velocities"][rows], arrays["accelerations"][rows],
+                                          sizes, bounce, dt, width, height, gravity, damping,
+                                          continuous, arrays["launch_velocities"][rows])
+
+        awake = np.flatnonzero(~asleep)
+        moving = awake + rows.start
+        pos, previous = arrays["positions"][moving], arrays["previous_positions"][moving]
+        vel, acc = arrays["velocities"][moving], arrays["accelerations"][moving]
+        launch = arrays["launch_velocities"][moving]
+        collided = np.zeros(len(asleep), dtype=bool)
+        collided[awake] = PhysicsWorld.integrate(pos, previous, vel, acc, sizes[awake], bounce[awake],
+                                                 dt, width, height, gravity, damping, continuous,
+                                                 launch)
+        arrays["positions"][moving] = pos
+        arrays["previous_positions"][moving] = previous
+        arrays["velocities"][moving] = vel
+        arrays["launch_velocities"][moving] = launch
+        arrays["accelerations"][moving] = acc
+        return collided
+
+    def update_sleep(self, threshold: float, steps: int) -> int:
+        """Vectorized PhysicsBody.update_sleep for every row; returns how many are asleep"""
+        n = self.count
+        asleep = self.asleep[:n]
+        counters = self.sleep_counters[:n]
+        velocities = self.velocities[:n]
+        slow = np.hypot(velocities[:, 0], velocities[:, 1]) < threshold
+        counters[~slow] = 0
+        counters[slow & ~asleep] += 1
+        falling = ~asleep & (counters >= steps)
+        asleep[falling] = True
+        velocities[falling] = 0.0
+        self.previous_positions[:n][falling] = self.positions[:n][falling]
+        return int(asleep.sum())
+
+    def wake(self, rows: np.ndarray):
+        """Put `rows` back into the simulation (and restart their sleep countdown)"""
+        self.asleep[rows] = False
+        self.sleep_counters[rows] = 0
+
+    @staticmethod
+    def integrate(pos: np.ndarray, previous: np.ndarray, vel: np.ndarray, acc: np.ndarray,
+                  sizes: np.ndarray, bounce: np.ndarray, dt: float, width: float, height: float,
+                  gravity: float, damping: float, continuous: bool = False,
+                  launch: Optional[np.ndarray] = None) -> np.ndarray:
+        """The step kernel on plain arrays (edited in place), shared with strip workers.
+
+        `damping` is the velocity factor for this step, see step_damping().
+        With `continuous`, the velocities are also copied to `launch` before
+        any wall bounce, so the object sweep can replay the same path.
+        """
+        previous[:] = pos
+
+        # Gravity force is GRAVITY * mass, so the acceleration is mass independent
+        acc[:, 1] += gravity
+        vel += acc * dt
+        vel *= damping
+        acc[:] = 0.0
+
+        half = sizes / 2
+        if continuous:
+            if launch is not None:
+                launch[:] = vel
+            collided = PhysicsWorld._sweep_axis(pos[:, 0], vel[:, 0], half, bounce, width, dt)
+            collided |= PhysicsWorld._sweep_axis(pos[:, 1], vel[:, 1], half, bounce, height, dt)
+            return collided
+
+        pos += vel * dt
+        collided = PhysicsWorld._bounce_axis(pos[:, 0], vel[:, 0], half, bounce, width)
+        collided |= PhysicsWorld._bounce_axis(pos[:, 1], vel[:, 1], half, bounce, height)
+        return collided
+
+    @staticmethod
+    def _bounce_axis(pos: np.ndarray, vel: np.ndarray, half: np.ndarray,
+                     bounce: np.ndarray, limit: float) -> np.ndarray:
+        """Vectorized GameObject.check_boundaries for one axis (edits in place)"""
+        low = pos - half <= 0
+        high = ~low & (pos + half >= limit)
+        pos[low] = half[low]
+        vel[low] = np.abs(vel[low]) * bounce[low]
+        pos[high] = limit - half[high]
+        vel[high] = -np.abs(vel[high]) * bounce[high]
+        return low | high
+
+    @staticmethod
+    def _sweep_axis(pos: np.ndarray, vel: np.ndarray, half: np.ndarray, bounce: np.ndarray,
+                    limit: float, dt: float) -> np.ndarray:
+        """Move `pos` by `vel` for dt, reflecting off the walls at their time of impact.
+
+        Vectorized sweep_wall_axis: instead of clamping the end point, each
+        body travels the rest of the step with its reflected velocity.
+        """
+        low_bound, high_bound = half, limit - half
+        np.clip(pos, low_bound, high_bound, out=pos)  # start bodies pushed into a wall on it
+        remaining = np.full(len(pos), dt)
+        collided = np.zeros(len(pos), dtype=bool)
+        for _ in range(GameConfig.MAX_WALL_HITS):
+            end = pos + vel * remaining
+            low = (vel < 0) & (end <= low_bound)
+            high = (vel > 0) & (end >= high_bound)
+            hit = low | high
+            if not hit.any():
+                pos[:] = end
+                return collided
+            free = ~hit
+            pos[free] = end[free]
+            remaining[free] = 0.0
+            bound = np.where(low, low_bound, high_bound)[hit]
+            remaining[hit] -= (bound - pos[hit]) / vel[hit]
+            pos[hit] = bound
+            vel[hit] *= -bounce[hit]
+            collided |= hit
+        pos += vel * remaining
+        np.clip(pos, low_bound, high_bound, out=pos)
+        return collided
+
+def sweep_wall_axis(start: float, velocity: float, half: float, bounce: float,
+                    limit: float, dt: float) -> Tuple[float, float, bool]:
+    """Swept wall bounce along one axis for a single body.
+
+    Follows the straight path from `start` for dt and reflects it at each
+    wall it reaches, at the time of impact, so a step longer than the gap to
+    the wall can't skip past it. Returns (position, velocity, collided).
+    """
+    low_bound, high_bound = half, limit - half
+    position = min(max(start, low_bound), high_bound)
+    remaining = dt
+    collided = False
+    for _ in range(GameConfig.MAX_WALL_HITS):
+        end = position + velocity * remaining
+        if velocity < 0 and end <= low_bound:
+            bound = low_bound
+        elif velocity > 0 and end >= high_bound:
+            bound = high_bound
+        else:
+            return end, velocity, collided
+        remaining -= (bound - position) / velocity
+        position = bound
+        velocity = -velocity * bounce
+        collided = True
+    position = min(max(position + velocity * remaining, low_bound), high_bound)
+    return position, velocity, collided
+
+# Fields a ParallelPhysicsWorld keeps in shared memory: (trailing shape, dtype).
+# Rows are kept sorted by strip, so ids maps each row back to its body index
+_SHARED_FIELDS = {
+    "positions": ((2,), np.float64),
+    "previous_positions": ((2,), np.float64),
+    "velocities": ((2,), np.float64),
+    "launch_velocities": ((2,), np.float64),
+    "accelerations": ((2,), np.float64),
+    "masses": ((), np.float64),
+    "sizes": ((), np.float64),
+    "bounce_factors": ((), np.float64),
+    "asleep": ((), np.bool_),
+    "sleep_counters": ((), np.int64),
+    "bounced": ((), np.bool_),
+    "ids": ((), np.int64),
+}
+
+# Body index -> row map, the inverse of ids, also shared so workers keep it
+# up to date as they move rows
+_BODY_SLOTS = "slots"
+
+# Per-strip row ranges: strip s owns rows [strip_rows[s, 0], strip_rows[s, 1]).
+# After a step its worker leaves strip_rows[s, 2] bodies bound for strip s - 1
+# at the start of the range and strip_rows[s, 3] bound for s + 1 at the end
+_STRIP_ROWS, _STRIP_FIRST, _STRIP_END, _STRIP_LEFT, _STRIP_RIGHT = "strip_rows", 0, 1, 2, 3
+
+# Layout of the shared control block the master writes before each step
+_CONTROL_STOP, _CONTROL_DT, _CONTROL_WIDTH, _CONTROL_HEIGHT, \
+    _CONTROL_GRAVITY, _CONTROL_DAMPING, _CONTROL_CONTINUOUS = range(7)
+
+def _attach_shared(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing block without the worker taking ownership of it"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching registers the block again, but worker
+        # processes share the parent's resource tracker so that is a no-op
+        return shared_memory.SharedMemory(name=name)
+
+def _strip_of(x: np.ndarray, width: float, strips: int) -> np.ndarray:
+    """Index of the vertical strip each x coordinate falls in"""
+    return np.clip((x * strips / width).astype(np.int64), 0, strips - 1)
+
+def _swap_rows(arrays: Dict[str, np.ndarray], a: np.ndarray, b: np.ndarray):
+    """Exchange rows `a` and `b` of every shared field, updating the slots of both"""
+    for field in _SHARED_FIELDS:
+        array = arrays[field]
+        array[a], array[b] = array[b], array[a]
+    arrays[_BODY_SLOTS][arrays["ids"][a]] = a
+    arrays[_BODY_SLOTS][arrays["ids"][b]] = b
+
+def _gather_leavers(arrays: Dict[str, np.ndarray], first: int, side: np.ndarray) -> Tuple[int, int]:
+    """Move the rows from `first` on with side -1 to the front and those with
+    side 1 to the back, swapping only rows in the wrong place. `side` is
+    reordered along with them; returns how many went to each end."""
+    left = int((side < 0).sum())
+    wrong, room = np.flatnonzero(side[left:] < 0) + left, np.flatnonzero(side[:left] >= 0)
+    if len(wrong):
+        _swap_rows(arrays, first + wrong, first + room)
+        side[wrong], side[room] = side[room], side[wrong]
+    right = int((side > 0).sum())
+    tail = len(side) - right
+    wrong, room = np.flatnonzero(side[:tail] > 0), np.flatnonzero(side[tail:] <= 0) + tail
+    if len(wrong):
+        _swap_rows(arrays, first + wrong, first + room)
+    return left, right
+
+def _physics_strip_worker(strip: int, strips: int, block_names: Dict[str, str], capacity: int,
+                          start: multiprocessing.synchronize.Barrier,
+                          done: multiprocessing.synchronize.Barrier):
+    """Worker process loop: step the bodies owned by one strip, in shared memory"""
+    blocks = {field: _attach_shared(name) for field, name in block_names.items()}
+    arrays = {field: np.ndarray((capacity,) + shape, dtype=dtype, buffer=blocks[field].buf)
+              for field, (shape, dtype) in _SHARED_FIELDS.items()}
+    arrays[_BODY_SLOTS] = np.ndarray(capacity, dtype=np.int64, buffer=blocks[_BODY_SLOTS].buf)
+    control = np.ndarray(8, dtype=np.float64, buffer=blocks["control"].buf)
+    bounds = np.ndarray((strips, 4), dtype=np.int64, buffer=blocks[_STRIP_ROWS].buf)[strip]
+    try:
+        while True:
+            start.wait()
+            if control[_CONTROL_STOP]:
+                break
+            first, end = int(bounds[_STRIP_FIRST]), int(bounds[_STRIP_END])
+            if end > first:
+                rows = slice(first, end)
+                width = control[_CONTROL_WIDTH]
+                arrays["bounced"][rows] = PhysicsWorld.step_rows(
+                    arrays, rows, control[_CONTROL_DT], width, control[_CONTROL_HEIGHT],
+                    control[_CONTROL_GRAVITY], control[_CONTROL_DAMPING],
+                    bool(control[_CONTROL_CONTINUOUS]))
+
+                # Bodies that crossed into a neighbouring strip go to the ends
+                # of this strip's rows, for the master to hand over
+                side = np.sign(_strip_of(arrays["positions"][rows, 0], width, strips) - strip)
+                if side.any():
+                    bounds[_STRIP_LEFT:] = _gather_leavers(arrays, first, side)
+            done.wait()
+    finally:
+        del arrays, control, bounds
+        for block in blocks.values():
+            block.close()
+
+class ParallelPhysicsWorld(PhysicsWorld):
+    """PhysicsWorld stepped by worker processes, one per vertical strip of the screen.
+
+    All body state lives in multiprocessing.shared_memory blocks, so workers
+    read and write it in place; the only per-step traffic is two barrier
+    waits. Rows are kept sorted by strip, so each worker steps a contiguous
+    range of rows through plain views, and bodies that cross into a
+    neighbouring strip are swapped over the boundary after the step. Since
+    that moves bodies between rows, `slots` maps each body index (what
+    GameObjects and recordings hold) to its current row, and ordered() and
+    store() give the arrays in body order. Object-object collisions still
+    run in the main process, after every strip is done. Capacity is fixed at
+    construction because resizing would mean re-attaching every worker.
+    """
+    def __init__(self, workers: int, capacity: int, width: float = GameConfig.WIDTH):
+        self.workers = workers
+        self.width = width
+        self._blocks: Dict[str, shared_memory.SharedMemory] = {}
+        self._processes: List[multiprocessing.Process] = []
+        super().__init__(capacity)
+
+        self._start = multiprocessing.Barrier(workers + 1)
+        self._done = multiprocessing.Barrier(workers + 1)
+        block_names = {field: block.name for field, block in self._blocks.items()}
+        for strip in range(workers):
+            process = multiprocessing.Process(
+                target=_physics_strip_worker, daemon=True,
+                args=(strip, workers, block_names, self.capacity, self._start, self._done))
+            process.start()
+            self._processes.append(process)
+
+    def _grow(self, capacity: int):
+        if self._blocks:
+            raise RuntimeError(f"ParallelPhysicsWorld is full ({self.capacity} bodies)")
+        capacity = max(capacity, 1)
+        for field, (shape, dtype) in _SHARED_FIELDS.items():
+            nbytes = max(int(np.prod((capacity,) + shape)) * np.dtype(dtype).itemsize, 1)
+            block = shared_memory.SharedMemory(create=True, size=nbytes)
+            self._blocks[field] = block
+            array = np.ndarray((capacity,) + shape, dtype=dtype, buffer=block.buf)
+            array[:] = 0
+            setattr(self, field, array)
+        self._blocks[_STRIP_ROWS] = shared_memory.SharedMemory(create=True, size=self.workers * 4 * 8)
+        self.strip_rows = np.ndarray((self.workers, 4), dtype=np.int64,
+                                     buffer=self._blocks[_STRIP_ROWS].buf)
+        self.strip_rows[:] = 0
+        self._blocks["control"] = shared_memory.SharedMemory(create=True, size=8 * 8)
+        self.control = np.ndarray(8, dtype=np.float64, buffer=self._blocks["control"].buf)
+        self.control[:] = 0
+        self._blocks[_BODY_SLOTS] = shared_memory.SharedMemory(create=True, size=capacity * 8)
+        self.slots = np.ndarray(capacity, dtype=np.int64, buffer=self._blocks[_BODY_SLOTS].buf)
+        self.slots[:] = 0
+        self.capacity = capacity
+
+    def slot(self, index: int) -> int:
+        return int(self.slots[index])
+
+    def ordered(self, field: str) -> np.ndarray:
+        """`field` of every body in index order (a copy, see store())"""
+        return getattr(self, field)[self.slots[:self.count]]
+
+    def store(self, field: str, values: np.ndarray):
+        getattr(self, field)[self.slots[:self.count]] = values
+
+    def add_body(self, position: Vector2D, velocity: Vector2D, mass: float = 1.0) -> ArrayPhysicsBody:
+        body = super().add_body(position, velocity, mass)
+        row = body.index
+        self.ids[row] = self.slots[row] = row
+        # The new row joins the last strip; walk it down to its own, each
+        # strip on the way passing its first row to its end
+        self.strip_rows[-1, _STRIP_END] += 1
+        strip = int(_strip_of(np.array([position.x]), self.width, self.workers)[0])
+        for above in range(self.workers - 1, strip, -1):
+            first = int(self.strip_rows[above, _STRIP_FIRST])
+            if first != row:
+                _swap_rows(vars(self), np.array([first]), np.array([row]))
+            self.strip_rows[above, _STRIP_FIRST] += 1
+            self.strip_rows[above - 1, _STRIP_END] += 1
+            row = first
+        return body
+
+    def add_bodies(self, positions: np.ndarray, velocities: np.ndarray, sizes: np.ndarray,
+                   masses: float = 1.0, bounce_factors: Optional[np.ndarray] = None) -> range:
+        indices = super().add_bodies(positions, velocities, sizes, masses, bounce_factors)
+        self.ids[indices.start:indices.stop] = np.arange(indices.start, indices.stop)
+        self._sort()
+        return indices
+
+    def clear(self):
+        super().clear()
+        self.strip_rows[:] = 0
+
+    def wake(self, rows: np.ndarray):
+        super().wake(self.slots[rows])
+
+    def _sort(self):
+        """Reorder every row by strip and rebuild the strip ranges and slots"""
+        n = self.count
+        strips = _strip_of(self.positions[:n, 0], self.width, self.workers)
+        order = np.argsort(strips, kind="stable")
+        for field in _SHARED_FIELDS:
+            array = getattr(self, field)
+            array[:n] = array[:n][order]
+        self.slots[self.ids[:n]] = np.arange(n)
+        ends = np.cumsum(np.bincount(strips, minlength=self.workers))
+        self.strip_rows[:, _STRIP_FIRST] = ends - np.bincount(strips, minlength=self.workers)
+        self.strip_rows[:, _STRIP_END] = ends
+        self.strip_rows[:, _STRIP_LEFT:] = 0
+
+    def _migrate(self):
+        """Hand the bodies each worker left at the ends of its rows to the neighbours"""
+        strip_rows = self.strip_rows
+        for strip in range(self.workers - 1):
+            right, left = int(strip_rows[strip, _STRIP_RIGHT]), int(strip_rows[strip + 1, _STRIP_LEFT])
+            if not right and not left:
+                continue
+            # [right leavers of strip | left leavers of strip + 1] around the
+            # boundary trade places, which moves the boundary with them
+            edge = int(strip_rows[strip, _STRIP_END])
+            rows = slice(edge - right, edge + left)
+            if right and left:
+                for field in _SHARED_FIELDS:
+                    array = getattr(self, field)
+                    array[rows] = np.roll(array[rows], -right, axis=0)
+                self.slots[self.ids[rows]] = np.arange(rows.start, rows.stop)
+            strip_rows[strip, _STRIP_END] = strip_rows[strip + 1, _STRIP_FIRST] = edge - right + left
+        strip_rows[:, _STRIP_LEFT:] = 0
+
+    def step(self, dt: float, width: int, height: int) -> np.ndarray:
+        """Step every strip in parallel; returns the wall-bounce mask"""
+        self.control[_CONTROL_DT] = dt
+        self.control[_CONTROL_WIDTH] = width
+        self.control[_CONTROL_HEIGHT] = height
+        self.control[_CONTROL_GRAVITY] = GameConfig.GRAVITY
+        self.control[_CONTROL_DAMPING] = step_damping(dt)
+        self.control[_CONTROL_CONTINUOUS] = GameConfig.CONTINUOUS_COLLISION
+        self._start.wait()
+        self._done.wait()
+        self._migrate()
+        # Workers skip sleeping rows, which may still hold an old bounce flag
+        rows = self.slots[:self.count]
+        return self.bounced[rows] & ~self.asleep[rows]
+
+    def close(self):
+        """Stop the workers and free the shared memory"""
+        if not self._blocks:
+            return
+        if self._processes:
+            self.control[_CONTROL_STOP] = 1
+            self._start.wait()
+            for process in self._processes:
+                process.join()
+            self._processes = []
+        for field in _SHARED_FIELDS:
+            setattr(self, field, None)
+        self.slots = self.strip_rows = self.control = None
+        for block in self._blocks.values():
+            block.close()
+            block.unlink()
+        self._blocks = {}
+
+# Neighbour cell offsets scanned from each cell; the other half of the 3x3
+# neighbourhood is covered when the neighbour itself is scanned
+_HALF_NEIGHBOURHOOD = ((1, -1), (1, 0), (1, 1), (0, 1))
+
+def _expand_ranges(owners: np.ndarray, starts: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Pair each owners[k] with every index in [starts[k], starts[k] + counts[k])"""
+    total = int(counts.sum())
+    if total == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    firsts = np.repeat(owners, counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return firsts, np.repeat(starts, counts) + offsets
+
+class SpatialHashGrid:
+    """Uniform spatial hash for the object-object collision broad phase.
+
+    The cell size is the largest object size, so any two overlapping objects
+    sit in the same or adjacent cells. The grid is rebuilt from scratch each
+    step with a sort, which is cheaper than incremental updates when most
+    objects move every frame.
+    """
+    def __init__(self):
+        self.cell_size = 1.0
+        self.order = np.zeros(0, dtype=np.int64)
+        self.cell_keys = np.zeros(0, dtype=np.int64)
+        self.cell_starts = np.zeros(0, dtype=np.int64)
+        self.cell_counts = np.zeros(0, dtype=np.int64)
+        self.cell_coords = np.zeros((0, 2), dtype=np.int64)
+
+    def rebuild(self, positions: np.ndarray, sizes: np.ndarray):
+        """Bucket objects by cell (sorted by cell key)"""
+        self.cell_size = max(float(sizes.max()), 1.0) if len(sizes) else 1.0
+        coords = np.floor(positions / self.cell_size).astype(np.int64)
+        keys = self._keys(coords)
+        self.order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[self.order]
+        self.cell_keys, self.cell_starts, self.cell_counts = np.unique(
+            sorted_keys, return_index=True, return_counts=True)
+        self.cell_coords = coords[self.order][self.cell_starts]
+
+    @staticmethod
+    def _keys(coords: np.ndarray) -> np.ndarray:
+        # Cell coordinates are bounded by the screen, so 2**20 cells per axis is plenty
+        return (coords[:, 0] + (1 << 20)) * (1 << 21) + (coords[:, 1] + (1 << 20))
+
+    def candidate_pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return index arrays (i, j) of every pair sharing or neighbouring a cell"""
+        slot = np.arange(len(self.order))
+        cell_of_slot = np.repeat(np.arange(len(self.cell_keys)), self.cell_counts)
+        cell_end = (self.cell_starts + self.cell_counts)[cell_of_slot]
+
+        # Pairs inside one cell: each slot pairs with the slots after it
+        firsts, seconds = [], []
+        a, b = _expand_ranges(slot, slot + 1, cell_end - slot - 1)
+        firsts.append(a)
+        seconds.append(b)
+
+        # Pairs with the forward half of the neighbouring cells
+        for dx, dy in _HALF_NEIGHBOURHOOD:
+            neighbour_keys = self._keys(self.cell_coords + (dx, dy))
+            found = np.searchsorted(self.cell_keys, neighbour_keys)
+            found = np.minimum(found, len(self.cell_keys) - 1)
+            exists = self.cell_keys[found] == neighbour_keys
+            starts = np.where(exists, self.cell_starts[found], 0)
+            counts = np.where(exists, self.cell_counts[found], 0)
+            a, b = _expand_ranges(slot, starts[cell_of_slot], counts[cell_of_slot])
+            firsts.append(a)
+            seconds.append(b)
+
+        return self.order[np.concatenate(firsts)], self.order[np.concatenate(seconds)]
+
+# Bodies x bodies checked when a few swept bodies outgrow their broad phase
+# discs, before rebuilding the whole grid is cheaper
+_SWEEP_REGROW_LIMIT = 1 << 20
+
+def _contact_counts(i: np.ndarray, j: np.ndarray, count: int) -> np.ndarray:
+    """Pairs each of `count` bodies is in, at least 1 so it can be divided by"""
+    return np.maximum(np.bincount(i, minlength=count) + np.bincount(j, minlength=count), 1)
+
+class ObjectCollisionSystem:
+    """Object-object collisions: spatial hash broad phase, circle narrow phase"""
+    def __init__(self):
+        self.grid = SpatialHashGrid()
+        self.candidate_pairs = 0
+        self.swept_hits = 0  # pairs hit in the sweep and in the overlap pass, last step
+        self.overlap_hits = 0
+        self.woken = np.zeros(0, dtype=np.int64)
+
+    def step(self, positions: np.ndarray, velocities: np.ndarray, sizes: np.ndarray,
+             masses: np.ndarray, bounce_factors: np.ndarray,
+             previous_positions: Optional[np.ndarray] = None, dt: float = 0.0,
+             asleep: Optional[np.ndarray] = None,
+             wake_speed: float = 0.0,
+             bounds: Optional[Tuple[float, float]] = None,
+             launch_velocities: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Resolve overlaps in place; return index arrays of the pairs that collided
+
+        With `previous_positions` (where this step's moves started) and dt,
+        pairs whose paths met during the step are first resolved at their
+        time of impact, see sweep(); `launch_velocities` are the velocities
+        the bodies started with, before any wall bounce. Only bodies in a
+        pair that could pass through each other in one step are swept, see
+        tunnelling(); the overlap pass catches every other contact. Bodies flagged in
+        `asleep` are immovable and pairs of two of them are skipped. Only
+        pairs closing faster than `wake_speed` count as collided, and
+        sleepers among them are left in `woken` for the caller to wake. With
+        `bounds` (width, height), the sweep bounces off the walls and
+        corrected positions are kept inside them.
+        """
+        self.woken = np.zeros(0, dtype=np.int64)
+        self.swept_hits = self.overlap_hits = 0
+        if len(positions) < 2:
+            self.candidate_pairs = 0
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+
+        inverse_masses = 1.0 / masses
+        if asleep is not None:
+            inverse_masses[asleep] = 0.0
+
+        swept_i = swept_j = np.zeros(0, dtype=np.int64)
+        swept_pairs = 0
+        if previous_positions is not None:
+            if launch_velocities is None:
+                launch_velocities = velocities
+            pair_i, pair_j = self.tunnelling(previous_positions, launch_velocities, sizes,
+                                             inverse_masses, dt)
+            swept_pairs = self.candidate_pairs
+            if len(pair_i):
+                fast, pairs = np.unique(np.concatenate([pair_i, pair_j]), return_inverse=True)
+                moved, turned = positions[fast], velocities[fast]
+                swept_i, swept_j = self.sweep(previous_positions[fast], moved, turned,
+                                              launch_velocities[fast], sizes[fast],
+                                              inverse_masses[fast], bounce_factors[fast], dt, bounds,
+                                              np.split(pairs, 2))
+                positions[fast], velocities[fast] = moved, turned
+                swept_i, swept_j = fast[swept_i], fast[swept_j]
+                swept_pairs += self.candidate_pairs
+
+        self.grid.rebuild(positions, sizes)
+        i, j = self.grid.candidate_pairs()
+        if asleep is not None:
+            awake = ~(asleep[i] & asleep[j])
+            i, j = i[awake], j[awake]
+        self.candidate_pairs = len(i) + swept_pairs
+
+        # Narrow phase: treat every shape as a circle of diameter `size`
+        delta = positions[j] - positions[i]
+        distance = np.hypot(delta[:, 0], delta[:, 1])
+        reach = (sizes[i] + sizes[j]) / 2
+        touching = distance < reach
+        i, j, delta, distance, reach = (i[touching], j[touching], delta[touching],
+                                        distance[touching], reach[touching])
+
+        normal = np.zeros_like(delta)
+        normal[:, 0] = 1.0
+        apart = distance > 0
+        normal[apart] = delta[apart] / distance[apart, None]
+
+        inv_i = inverse_masses[i]
+        inv_j = inverse_masses[j]
+        share_i = inv_i / (inv_i + inv_j)
+
+        # Push overlapping objects apart in proportion to inverse mass. A body
+        # with several contacts gets the mean of their corrections, not the sum,
+        # or a body in a pile is shoved out by every neighbour at once
+        contacts = _contact_counts(i, j, len(positions))
+        correction = normal * (reach - distance)[:, None]
+        np.add.at(positions, i, -correction * (share_i / contacts[i])[:, None])
+        np.add.at(positions, j, correction * ((1 - share_i) / contacts[j])[:, None])
+        if bounds is not None:
+            half = sizes / 2
+            np.clip(positions[:, 0], half, bounds[0] - half, out=positions[:, 0])
+            np.clip(positions[:, 1], half, bounds[1] - half, out=positions[:, 1])
+
+        # Elastic impulse for approaching pairs, scaled by the lower bounce factor.
+        # Like the correction, it is divided by each body's count of approaching
+        # contacts; summed in full, a body hit from both sides gains energy
+        closing = np.einsum("ij,ij->i", velocities[j] - velocities[i], normal)
+        approaching = closing < 0
+        restitution = np.minimum(bounce_factors[i], bounce_factors[j])
+        impulse = np.where(approaching, -(1 + restitution) * closing / (inv_i + inv_j), 0.0)
+        impulses = _contact_counts(i[approaching], j[approaching], len(positions))
+        np.add.at(velocities, i, -normal * (impulse * inv_i / impulses[i])[:, None])
+        np.add.at(velocities, j, normal * (impulse * inv_j / impulses[j])[:, None])
+
+        # Resting contacts approach at a few steps of gravity; only faster
+        # impacts count as collisions and wake sleepers
+        hard = closing < -wake_speed
+        self.swept_hits = len(swept_i)
+        self.overlap_hits = int(hard.sum())
+        if asleep is not None:
+            touched = np.unique(np.concatenate([swept_i, swept_j, i[hard], j[hard]]))
+            self.woken = touched[asleep[touched]]
+        return np.concatenate([swept_i, i[hard]]), np.concatenate([swept_j, j[hard]])
+
+    def tunnelling(self, previous: np.ndarray, launch: np.ndarray, sizes: np.ndarray,
+                   inverse_masses: np.ndarray, dt: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Index arrays of the pairs that could pass through each other this step.
+
+        That takes the pair's relative displacement over the step, |launch_j -
+        launch_i| * dt, to be more than the sum of their radii; slower pairs
+        that meet still overlap at the end of the step, where the overlap
+        pass finds them. The discs the two cover on the way must overlap too.
+        """
+        travel = np.hypot(launch[:, 0], launch[:, 1]) * dt
+        # The relative displacement is at most travel_i + travel_j, so one of
+        # the pair must travel further than its own radius; only pairs with
+        # one of these movers are checked
+        movers = np.flatnonzero(travel > sizes / 2)
+        if len(movers) * len(sizes) > _SWEEP_REGROW_LIMIT:
+            self.grid.rebuild(previous, sizes + 2 * travel)
+            i, j = self.grid.candidate_pairs()
+        else:
+            is_mover = np.zeros(len(sizes), dtype=bool)
+            is_mover[movers] = True
+            delta = previous[None, :, :] - previous[movers, None, :]
+            limit = (sizes[movers, None] + sizes[None, :]) / 2 + travel[movers, None] + travel[None, :]
+            near = np.hypot(delta[..., 0], delta[..., 1]) < limit
+            # Pairs of two movers would be found from both ends (and itself); keep j > i
+            near &= ~is_mover | (np.arange(len(sizes)) > movers[:, None])
+            rows, j = np.nonzero(near)
+            i = movers[rows]
+        self.candidate_pairs = len(i)
+        reach = (sizes[i] + sizes[j]) / 2
+        apart = previous[j] - previous[i]
+        relative = (launch[j] - launch[i]) * dt
+        passing = ((np.hypot(relative[:, 0], relative[:, 1]) > reach)
+                   & (np.hypot(apart[:, 0], apart[:, 1]) < reach + travel[i] + travel[j])
+                   & ((inverse_masses[i] > 0) | (inverse_masses[j] > 0)))
+        return i[passing], j[passing]
+
+    def sweep(self, previous: np.ndarray, positions: np.ndarray, velocities: np.ndarray,
+              launch: np.ndarray, sizes: np.ndarray, inverse_masses: np.ndarray,
+              bounce_factors: np.ndarray, dt: float,
+              bounds: Optional[Tuple[float, float]] = None,
+              pairs: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Replay this step's moves from `previous`, resolving impacts at their time.
+
+        Every body leaves its previous position with its `launch` velocity
+        and keeps its own clock. Each pass finds every body's next event on
+        its current straight path: a wall within `bounds`, or another body
+        whose path it meets while both are on their paths. Bodies whose
+        earliest event is a wall bounce off it; pairs that are each other's
+        earliest event get the same impulse as a discrete contact. Both then
+        continue from the impact point with their new velocities, and passes
+        repeat until no impacts remain. After MAX_OBJECT_HITS object impacts
+        (or MAX_WALL_HITS wall impacts) in one step a body stops looking for
+        more, leaving piles that would never settle to the overlap pass.
+        Bodies with an inverse mass of 0 don't move. Given `pairs`, only
+        those are checked, so a body knocked onto a new path leaves its new
+        contacts to the overlap pass; otherwise every pair whose reachable
+        discs overlap is. Edits positions and velocities in place; returns
+        the object pairs hit.
+        """
+        n = len(positions)
+        moving = inverse_masses > 0
+        low = sizes[:, None] / 2
+        high = (np.array(bounds, dtype=float) if bounds is not None else np.inf) - low
+        starts = np.where(moving[:, None], np.clip(previous, low, high), positions)
+        velocities[moving] = launch[moving]
+        clock = np.zeros(n)
+        object_hits = np.zeros(n, dtype=np.int64)
+        wall_hits = np.zeros(n, dtype=np.int64)
+        hits_i, hits_j = [], []
+        candidates = 0
+        rebuild = True
+        while True:
+            if rebuild:
+                # A body can't get further from where it is than its speed times
+                # the time left, walls or not, so pairs of those discs stay the
+                # candidates until an impact speeds a body out of its disc
+                centers = starts.copy()
+                travel = np.hypot(velocities[:, 0], velocities[:, 1]) * (dt - clock)
+                if pairs is not None:
+                    pair_i, pair_j = pairs
+                else:
+                    self.grid.rebuild(centers, sizes + 2 * travel)
+                    pair_i, pair_j = self.grid.candidate_pairs()
+                candidates += len(pair_i)
+                impacts = np.full(len(pair_i), np.inf)
+                stale = np.ones(len(pair_i), dtype=bool)
+                rebuild = False
+
+            wall_time, wall_axes = self._next_wall(starts, velocities, clock, low, high,
+                                                   wall_hits < GameConfig.MAX_WALL_HITS, dt)
+            impacts[stale] = self._impact_times(pair_i[stale], pair_j[stale], starts, velocities,
+                                                clock, np.minimum(wall_time, dt), sizes)
+            allowed = object_hits < GameConfig.MAX_OBJECT_HITS
+            pending = np.flatnonzero(np.isfinite(impacts) & allowed[pair_i] & allowed[pair_j])
+            i, j, impact = pair_i[pending], pair_j[pending], impacts[pending]
+
+            # Only each body's earliest event is certain; later ones are found again
+            first = wall_time.copy()
+            np.minimum.at(first, i, impact)
+            np.minimum.at(first, j, impact)
+            earliest = ((impact == first[i]) & (impact == first[j])
+                        & (impact < wall_time[i]) & (impact < wall_time[j]))
+            i, j, impact = i[earliest], j[earliest], impact[earliest]
+            # A body tied between impacts (pairs overlapping at once, say) takes
+            # the first; the others are found again on its new path
+            rank = np.arange(len(i))
+            claim = np.full(n, len(i))
+            np.minimum.at(claim, i, rank)
+            np.minimum.at(claim, j, rank)
+            single = (claim[i] == rank) & (claim[j] == rank)
+            i, j, impact = i[single], j[single], impact[single]
+            walls = np.flatnonzero(np.isfinite(wall_time) & (wall_time == first))
+            if not len(i) and not len(walls):
+                break
+
+            # Walls: move to the wall and reflect the axes that reached it
+            hit = wall_time[walls]
+            starts[walls] += velocities[walls] * (hit - clock[walls])[:, None]
+            axes = wall_axes[walls] == hit[:, None]
+            reached = np.where(velocities[walls] < 0, low[walls], high[walls])
+            starts[walls] = np.where(axes, reached, starts[walls])
+            velocities[walls] *= np.where(axes, -bounce_factors[walls, None], 1.0)
+            clock[walls] = hit
+            wall_hits[walls] += 1
+
+            if len(i):
+                self._resolve_impacts(i, j, impact, starts, velocities, clock, sizes,
+                                      inverse_masses, bounce_factors)
+                object_hits[i] += 1
+                object_hits[j] += 1
+                hits_i.append(i)
+                hits_j.append(j)
+
+            # Only pairs with a body that changed course need their impact found again
+            changed = np.zeros(n, dtype=bool)
+            changed[walls] = True
+            changed[i] = True
+            changed[j] = True
+            if pairs is None:
+                moved = np.flatnonzero(changed)
+                reach = (np.hypot(*(starts[moved] - centers[moved]).T)
+                         + np.hypot(velocities[moved, 0], velocities[moved, 1]) * (dt - clock[moved]))
+                escaped = reach > travel[moved]
+                if len(moved[escaped]) * n > _SWEEP_REGROW_LIMIT:
+                    rebuild = True
+                    continue
+                if escaped.any():
+                    pair_i, pair_j, impacts = self._regrow(moved[escaped], 2 * reach[escaped],
+                                                           centers, travel, sizes, pair_i, pair_j,
+                                                           impacts)
+                    candidates += len(pair_i)
+            stale = changed[pair_i] | changed[pair_j]
+
+        self.candidate_pairs = candidates
+        positions[moving] = np.clip(starts + velocities * (dt - clock)[:, None], low, high)[moving]
+        if not hits_i:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        return np.concatenate(hits_i), np.concatenate(hits_j)
+
+    @staticmethod
+    def _regrow(grown: np.ndarray, radius: np.ndarray, centers: np.ndarray, travel: np.ndarray,
+                sizes: np.ndarray, pair_i: np.ndarray, pair_j: np.ndarray,
+                impacts: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Widen the discs of the `grown` bodies to `radius` and redo their candidate pairs"""
+        travel[grown] = radius
+        is_grown = np.zeros(len(centers), dtype=bool)
+        is_grown[grown] = True
+        keep = ~(is_grown[pair_i] | is_grown[pair_j])
+        delta = centers[None, :, :] - centers[grown, None, :]
+        limit = (sizes[grown, None] + sizes[None, :]) / 2 + travel[grown, None] + travel[None, :]
+        near = np.hypot(delta[..., 0], delta[..., 1]) < limit
+        # Pairs of two grown bodies would be found from both ends (and itself); keep j > i
+        near &= ~is_grown | (np.arange(len(centers)) > grown[:, None])
+        rows, others = np.nonzero(near)
+        return (np.concatenate([pair_i[keep], grown[rows]]),
+                np.concatenate([pair_j[keep], others]),
+                np.concatenate([impacts[keep], np.full(len(rows), np.inf)]))
+
+    @staticmethod
+    def _next_wall(starts: np.ndarray, velocities: np.ndarray, clock: np.ndarray,
+                   low: np.ndarray, high: np.ndarray, allowed: np.ndarray,
+                   dt: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Time each body next reaches a wall (inf if not this step), and that time per axis"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            gap = np.where(velocities < 0, low - starts, high - starts)
+            axis_time = np.where(velocities != 0, clock[:, None] + np.maximum(gap / velocities, 0.0),
+                                 np.inf)
+        axis_time[(axis_time > dt) | ~allowed[:, None]] = np.inf
+        return axis_time.min(axis=1), axis_time
+
+    @staticmethod
+    def _impact_times(i: np.ndarray, j: np.ndarray, starts: np.ndarray, velocities: np.ndarray,
+                      clock: np.ndarray, ends: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+        """When the paths of pairs i, j (from starts at clock, until ends) meet; inf if not"""
+        # Earliest time in the window both bodies are on their paths where
+        # |start + move * u| == reach, u measured from the window start
+        begin = np.maximum(clock[i], clock[j])
+        window = np.minimum(ends[i], ends[j]) - begin
+        start = (starts[j] + velocities[j] * (begin - clock[j])[:, None]
+                 - starts[i] - velocities[i] * (begin - clock[i])[:, None])
+        move = velocities[j] - velocities[i]
+        reach = (sizes[i] + sizes[j]) / 2
+        a = np.einsum("ij,ij->i", move, move)
+        b = 2 * np.einsum("ij,ij->i", start, move)
+        c = np.einsum("ij,ij->i", start, start) - reach ** 2
+        discriminant = b * b - 4 * a * c
+        # Pairs still overlapping at the window start hit at once if they are
+        # closing, or they would pass through each other before the overlap pass
+        meets = (window > 0) & (b < 0) & ((c <= 0) | (discriminant >= 0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            u = np.where(c > 0, (-b - np.sqrt(np.maximum(discriminant, 0.0))) / (2 * a), 0.0)
+        return np.where(meets & (u <= window), begin + u, np.inf)
+
+    @staticmethod
+    def _resolve_impacts(i: np.ndarray, j: np.ndarray, impact: np.ndarray, starts: np.ndarray,
+                         velocities: np.ndarray, clock: np.ndarray, sizes: np.ndarray,
+                         inverse_masses: np.ndarray, bounce_factors: np.ndarray):
+        """Move pairs to their contact points at `impact` and bounce them apart"""
+        contact_i = starts[i] + velocities[i] * (impact - clock[i])[:, None]
+        contact_j = starts[j] + velocities[j] * (impact - clock[j])[:, None]
+        delta = contact_j - contact_i
+        normal = delta / np.hypot(delta[:, 0], delta[:, 1])[:, None]
+
+        inv_i = inverse_masses[i]
+        inv_j = inverse_masses[j]
+        closing = np.einsum("ij,ij->i", velocities[j] - velocities[i], normal)
+        restitution = np.minimum(bounce_factors[i], bounce_factors[j])
+        impulse = np.maximum(-(1 + restitution) * closing / (inv_i + inv_j), 0.0)
+        velocities[i] -= normal * (impulse * inv_i)[:, None]
+        velocities[j] += normal * (impulse * inv_j)[:, None]
+
+        starts[i] = contact_i
+        starts[j] = contact_j
+        clock[i] = impact
+        clock[j] = impact
+
+class ParticlePool:
+    """Fixed-capacity particle system stored as arrays instead of per-particle dicts.
+
+    The first `limit` slots form a ring buffer. Live particles run in spawn
+    order from the slot at `head`, so a full pool recycles its oldest
+    particles by writing over them, and dead slots are reclaimed by
+    compaction back to the front.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._limit = capacity
+        self.head = 0
+        self.count = 0
+        self.positions = np.zeros((capacity, 2))
+        self.previous_positions = np.zeros((capacity, 2))
+        self.velocities = np.zeros((capacity, 2))
+        self.life = np.zeros(capacity)
+        self.sizes = np.zeros(capacity, dtype=np.int64)
+        self.colors = np.zeros((capacity, 3), dtype=np.uint8)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def limit(self) -> int:
+        """Live particles allowed, the length of the ring; lowered by the quality governor"""
+        return self._limit
+
+    @limit.setter
+    def limit(self, limit: int):
+        # Unroll the ring to the front, keeping the newest particles that fit
+        kept = min(self.count, limit)
+        order = self._slots(self.head + self.count - kept, kept)
+        for field in self._fields():
+            field[:kept] = field[order]
+        self.head, self.count, self._limit = 0, kept, limit
+
+    def _fields(self):
+        return (self.positions, self.previous_positions, self.velocities,
+                self.life, self.sizes, self.colors)
+
+    def _slots(self, start: int, count: int):
+        """The `count` ring slots from `start` on, a slice unless they wrap"""
+        start %= self._limit
+        if start + count <= self._limit:
+            return slice(start, start + count)
+        return (start + np.arange(count)) % self._limit
+
+    def emit(self, position: Vector2D, color: Tuple[int, int, int], count: Optional[int] = None):
+        """Spawn a burst of particles, overwriting the oldest ones past the limit"""
+        if count is None:
+            count = random.randint(3, 8)
+        count = min(count, self.limit)
+        overflow = self.count + count - self.limit
+        if overflow > 0:
+            self.head = (self.head + overflow) % self.limit
+            self.count -= overflow
+
+        burst = self._slots(self.head + self.count, count)
+        self.positions[burst] = (position.x, position.y)
+        self.previous_positions[burst] = self.positions[burst]
+        self.velocities[burst] = np.random.uniform(-3, 3, (count, 2))
+        self.life[burst] = np.random.uniform(0.5, 1.5, count)
+        self.sizes[burst] = np.random.randint(2, 6, count)
+        self.colors[burst] = color
+        self.count += count
+
+    def update(self, dt: float):
+        """Update particle positions and lifetimes, then compact out dead ones"""
+        n = self.count
+        # A wrapped ring is stepped whole, free slots between its ends included
+        live = self._slots(self.head, n)
+        span = live if isinstance(live, slice) else slice(0, self.limit)
+        self.previous_positions[span] = self.positions[span]
+        self.positions[span] += self.velocities[span] * dt
+        self.velocities[span] *= 0.95
+        self.life[span] -= dt
+        self.sizes[span] = np.maximum(1, (self.sizes[span] * 0.98).astype(np.int64))
+
+        alive = np.flatnonzero(self.life[live] > 0)
+        if len(alive) < n:
+            alive = (self.head + alive) % self.limit
+            for field in self._fields():
+                field[:len(alive)] = field[alive]
+            self.head = 0
+            self.count = len(alive)
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def copy(self, into: Optional["ParticlePool"] = None) -> "ParticlePool":
+        """Independent pool holding just the live particles, oldest first,
+        reusing `into` when it is big enough"""
+        clone = into if into is not None and into.capacity >= self.count else ParticlePool(max(self.count, 1))
+        live = self._slots(self.head, self.count)
+        for source, target in zip(self._fields(), clone._fields()):
+            target[:self.count] = source[live]
+        clone._limit = clone.capacity
+        clone.head = 0
+        clone.count = self.count
+        return clone
+
+    def draw(self, screen, alpha: float = 1.0) -> List[pygame.Rect]:
+        """Render particles as filled circles, interpolated `alpha` of the way
+        from the previous physics step to the current one. Returns the areas drawn."""
+        live = self._slots(self.head, self.count)
+        previous = self.previous_positions[live]
+        positions = previous + (self.positions[live] - previous) * alpha
+        return [pygame.draw.circle(screen, color, pos, size)
+                for pos, color, size in zip(positions.astype(np.int64).tolist(),
+                                            self.colors[live].tolist(), self.sizes[live].tolist())]
+
+def hsv_to_rgb(hue: float, saturation: float, value: float) -> Tuple[int, int, int]:
+    """Convert HSV (hue in degrees) to an 8-bit RGB tuple"""
+    c = value * saturation
+    x = c * (1 - abs((hue / 60) % 2 - 1))
+    m = value - c
     
-    def draw(self, screen):
-        """Render particles with fading effect"""
-        for particle in self.particles:
-            alpha = max(0, min(255, int(particle['life'] * 255)))
-            color = (*particle['color'], alpha)
-            try:
-                pygame.draw.circle(screen, particle['color'], 
-                                 (int(particle['pos'].x), int(particle['pos'].y)), 
-                                 particle['size'])
-            except:
-                pass
+    if hue < 60:
+        r, g, b = c, x, 0
+    elif hue < 120:
+        r, g, b = x, c, 0
+    elif hue < 180:
+        r, g, b = 0, c, x
+    elif hue < 240:
+        r, g, b = 0, x, c
+    elif hue < 300:
+        r, g, b = x, 0, c
+    else:
+        r, g, b = c, 0, x
+        
+    return (int((r + m) * 255), int((g + m) * 255), int((b + m) * 255))
+
+def _build_palette(size: int) -> List[Tuple[int, int, int]]:
+    """Vibrant colors sampled once from a fixed seed, so sprites can be reused"""
+    rng = random.Random(0)
+    return [hsv_to_rgb(rng.uniform(0, 360), rng.uniform(0.6, 1.0), rng.uniform(0.7, 1.0))
+            for _ in range(size)]
+
+COLOR_PALETTE = _build_palette(GameConfig.COLOR_PALETTE_SIZE)
+
+# Unit hexagon corners, so drawing one needs no trigonometry
+_HEXAGON_CORNERS = [(math.cos(i * math.pi / 3), math.sin(i * math.pi / 3)) for i in range(6)]
+
+def draw_shape(surface: pygame.Surface, obj_type: ObjectType, pos: Tuple[int, int],
+               size: float, color: Tuple[int, int, int], outline: bool = True) -> pygame.Rect:
+    """Draw one filled object shape with its white outline, returns the area drawn"""
+    half = size / 2
+    if obj_type == ObjectType.SQUARE:
+        rect = pygame.Rect(pos[0] - half, pos[1] - half, size, size)
+        bounds = pygame.draw.rect(surface, color, rect)
+        if outline:
+            pygame.draw.rect(surface, (255, 255, 255), rect, 2)
+
+    elif obj_type == ObjectType.CIRCLE:
+        bounds = pygame.draw.circle(surface, color, pos, int(half))
+        if outline:
+            pygame.draw.circle(surface, (255, 255, 255), pos, int(half), 2)
+
+    else:
+        if obj_type == ObjectType.TRIANGLE:
+            points = [
+                (pos[0], pos[1] - half),
+                (pos[0] - half, pos[1] + half),
+                (pos[0] + half, pos[1] + half)
+            ]
+        else:
+            points = [(pos[0] + half * cx, pos[1] + half * cy) for cx, cy in _HEXAGON_CORNERS]
+        bounds = pygame.draw.polygon(surface, color, points)
+        if outline:
+            # A 2px polygon outline straddles the edge, so it reaches 1px further
+            bounds = pygame.draw.polygon(surface, (255, 255, 255), points, 2)
+    return bounds
+
+class SpriteCache:
+    """Pre-rendered object sprites keyed by (ObjectType, quantized size, color).
+
+    Each sprite holds the filled shape and its outline, so drawing an object
+    becomes one blit. Least recently used sprites are evicted once the pixel
+    memory passes budget_bytes.
+    """
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self.bytes_used = 0
+        self.sprites: "OrderedDict[tuple, pygame.Surface]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, obj_type: ObjectType, size: float, color: Tuple[int, int, int],
+            outline: bool = True) -> pygame.Surface:
+        key = (obj_type, int(round(size)), color, outline)
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.hits += 1
+            self.sprites.move_to_end(key)
+            return sprite
+
+        self.misses += 1
+        sprite = self._render(*key)
+        self.sprites[key] = sprite
+        self.bytes_used += self._sprite_bytes(sprite)
+        self._evict()
+        return sprite
+
+    def trail_stamp(self, radius: int, color: Tuple[int, int, int], fade: int) -> pygame.Surface:
+        """Translucent trail circle, cached alongside the object sprites"""
+        key = ("trail", radius, color, fade)
+        stamp = self.sprites.get(key)
+        if stamp is not None:
+            self.hits += 1
+            self.sprites.move_to_end(key)
+            return stamp
+
+        self.misses += 1
+        stamp = pygame.Surface((radius * 2 + 1, radius * 2 + 1), pygame.SRCALPHA)
+        pygame.draw.circle(stamp, (*color, fade), (radius, radius), radius)
+        self.sprites[key] = stamp
+        self.bytes_used += self._sprite_bytes(stamp)
+        self._evict()
+        return stamp
+
+    def _evict(self):
+        while self.bytes_used > self.budget_bytes and len(self.sprites) > 1:
+            _, evicted = self.sprites.popitem(last=False)
+            self.bytes_used -= self._sprite_bytes(evicted)
+            self.evictions += 1
+
+    @staticmethod
+    def _sprite_bytes(sprite: pygame.Surface) -> int:
+        return sprite.get_width() * sprite.get_height() * sprite.get_bytesize()
+
+    @staticmethod
+    def _render(obj_type: ObjectType, size: int, color: Tuple[int, int, int],
+                outline: bool) -> pygame.Surface:
+        # Odd side with a margin for the outline, so the shape centers on a pixel
+        side = size + 4 + (size + 1) % 2
+        sprite = pygame.Surface((side, side), pygame.SRCALPHA)
+        draw_shape(sprite, obj_type, (side // 2, side // 2), size, color, outline)
+        return sprite
+
+class TrailBuffer:
+    """Trail history for many objects in one (objects, length, 2) ring buffer.
+
+    Each row has its own write head, so recording is a constant-time write
+    instead of list.append plus list.pop(0), and all rows can be recorded or
+    drawn with a handful of vectorized operations.
+    """
+    def __init__(self, length: int, capacity: int = 64):
+        self.length = length
+        self.count = 0
+        self.capacity = 0
+        self.positions = np.zeros((0, length, 2))
+        self.heads = np.zeros(0, dtype=np.int64)
+        self.filled = np.zeros(0, dtype=np.int64)
+        self._grow(capacity)
+
+    def _grow(self, capacity: int):
+        capacity = max(capacity, 1)
+        for field in ("positions", "heads", "filled"):
+            old = getattr(self, field)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, field, new)
+        self.capacity = capacity
+
+    def add_row(self) -> int:
+        """Reserve an empty trail and return its row"""
+        if self.count == self.capacity:
+            self._grow(self.capacity * 2)
+        row = self.count
+        self.heads[row] = 0
+        self.filled[row] = 0
+        self.count += 1
+        return row
+
+    def add_rows(self, count: int) -> range:
+        """Reserve `count` empty trails and return their rows"""
+        if self.count + count > self.capacity:
+            self._grow(max(self.capacity * 2, self.count + count))
+        rows = range(self.count, self.count + count)
+        self.heads[rows.start:rows.stop] = 0
+        self.filled[rows.start:rows.stop] = 0
+        self.count += count
+        return rows
+
+    def clear(self):
+        self.count = 0
+
+    def copy(self, into: Optional["TrailBuffer"] = None) -> "TrailBuffer":
+        """Independent buffer holding just the rows in use, reusing `into`
+        when it has the same length"""
+        n = self.count
+        if into is not None and into.length == self.length:
+            clone = into
+            clone.count = 0
+            if clone.capacity < n:
+                clone._grow(max(clone.capacity * 2, n))
+        else:
+            clone = TrailBuffer(self.length, n)
+        clone.positions[:n] = self.positions[:n]
+        clone.heads[:n] = self.heads[:n]
+        clone.filled[:n] = self.filled[:n]
+        clone.count = n
+        return clone
+
+    def record(self, positions: np.ndarray, rows: Optional[np.ndarray] = None):
+        """Append one position to every row at once, positions is (count, 2).
+
+        With `rows`, only those rows are appended to, positions is then
+        (len(rows), 2); the others keep their trail as it is.
+        """
+        if rows is None:
+            rows = np.arange(self.count)
+        heads = self.heads[rows]
+        self.positions[rows, heads] = positions
+        self.heads[rows] = (heads + 1) % self.length
+        self.filled[rows] = np.minimum(self.filled[rows] + 1, self.length)
+
+    def record_row(self, row: int, x: float, y: float):
+        """Append one position to a single row"""
+        self.positions[row, self.heads[row]] = (x, y)
+        self.heads[row] = (self.heads[row] + 1) % self.length
+        self.filled[row] = min(self.filled[row] + 1, self.length)
+
+    def row_positions(self, row: int) -> List[Tuple[float, float]]:
+        """One trail as a list, oldest position first"""
+        filled = int(self.filled[row])
+        columns = (self.heads[row] - filled + np.arange(filled)) % self.length
+        return [tuple(point) for point in self.positions[row, columns].tolist()]
+
+    def blit_sequence(self, sizes: np.ndarray, colors: List[Tuple[int, int, int]],
+                      sprites: SpriteCache, length: Optional[int] = None) -> list:
+        """(stamp, top-left) pairs for every trail, ready for one Surface.blits call.
+
+        Like the old per-object loop, the newest position (under the object
+        itself) is skipped and circles grow from the oldest position to the
+        newest. Only the newest `length` positions are drawn when given.
+        """
+        n = self.count
+        if n == 0:
+            return []
+        length = self.length if length is None else min(length, self.length)
+        filled = np.minimum(self.filled[:n], length)[:, None]
+        ages = np.arange(length)[None, :]
+        columns = (self.heads[:n, None] - filled + ages) % self.length
+        points = self.positions[np.arange(n)[:, None], columns].astype(np.int64)
+
+        # Same radius as before: size/4 scaled by how far along the trail we are
+        share = ages / np.maximum(filled, 1)
+        radii = (sizes[:n, None] / 4 * share).astype(np.int64)
+        fades = (255 * share).astype(np.int64)
+        rows, steps = np.nonzero((ages < filled - 1) & (radii > 0))
+
+        sequence = []
+        for row, x, y, radius, fade in zip(rows.tolist(), points[rows, steps, 0].tolist(),
+                                           points[rows, steps, 1].tolist(),
+                                           radii[rows, steps].tolist(), fades[rows, steps].tolist()):
+            sequence.append((sprites.trail_stamp(radius, colors[row], fade), (x - radius, y - radius)))
+        return sequence
 
 class GameObject:
     """Enhanced base class for all game objects using composition"""
-    def __init__(self, obj_type: ObjectType, position: Vector2D):
+    def __init__(self, obj_type: ObjectType, position: Vector2D,
+                 world: Optional[PhysicsWorld] = None, trails: Optional[TrailBuffer] = None):
+        velocity = Vector2D(random.uniform(-6, 6), random.uniform(-6, 6))
+        if world is None:
+            physics = PhysicsBody(position, velocity)
+        else:
+            physics = world.add_body(position, velocity)
+        physics.size = random.uniform(15, 45)
+        trails = trails if trails is not None else TrailBuffer(GameConfig.TRAIL_LENGTH, 1)
+        self._attach(obj_type, physics, self._generate_color(), trails, trails.add_row())
+
+    @classmethod
+    def from_body(cls, obj_type: ObjectType, physics: PhysicsBody, color: Tuple[int, int, int],
+                  trails: TrailBuffer, trail_row: int) -> "GameObject":
+        """Wrap a body, color and trail row that were allocated in bulk (no random draws)"""
+        obj = cls.__new__(cls)
+        obj._attach(obj_type, physics, color, trails, trail_row)
+        return obj
+
+    def _attach(self, obj_type: ObjectType, physics: PhysicsBody, color: Tuple[int, int, int],
+                trails: TrailBuffer, trail_row: int):
         self.obj_type = obj_type
-        self.physics = PhysicsBody(position, Vector2D(
-            random.uniform(-6, 6), random.uniform(-6, 6)
-        ))
-        self.size = random.uniform(15, 45)
-        self.color = self._generate_color()
-        self.trail_positions = []
+        self.physics = physics
+        self.color = color
+        self.trails = trails
+        self.trail_row = trail_row
         self.collision_count = 0
         self.creation_time = pygame.time.get_ticks()
+
+    @property
+    def trail_positions(self) -> List[Tuple[float, float]]:
+        """Recent positions, oldest first"""
+        return self.trails.row_positions(self.trail_row)
+
+    @property
+    def size(self) -> float:
+        """Object extent, stored on the physics body so PhysicsWorld can vectorize it"""
+        return self.physics.size
+
+    @size.setter
+    def size(self, value: float):
+        self.physics.size = value
         
     def _generate_color(self) -> Tuple[int, int, int]:
-        """Generate vibrant colors using HSV conversion"""
-        hue = random.uniform(0, 360)
-        saturation = random.uniform(0.6, 1.0)
-        value = random.uniform(0.7, 1.0)
-        
-        # Convert HSV to RGB
-        c = value * saturation
-        x = c * (1 - abs((hue / 60) % 2 - 1))
-        m = value - c
-        
-        if hue < 60:
-            r, g, b = c, x, 0
-        elif hue < 120:
-            r, g, b = x, c, 0
-        elif hue < 180:
-            r, g, b = 0, c, x
-        elif hue < 240:
-            r, g, b = 0, x, c
-        elif hue < 300:
-            r, g, b = x, 0, c
-        else:
-            r, g, b = c, 0, x
-            
-        return (int((r + m) * 255), int((g + m) * 255), int((b + m) * 255))
+        """Pick a vibrant color from the precomputed HSV palette"""
+        return random.choice(COLOR_PALETTE)
     
     def check_boundaries(self, width: int, height: int) -> bool:
         """Enhanced boundary collision with realistic physics"""
         collided = False
+        physics = self.physics
+        position, velocity = physics.position, physics.velocity
+        half = self.size/2
+        x, y = position.x, position.y
         
         # Left/Right boundaries
-        if self.physics.position.x - self.size/2 <= 0:
-            self.physics.position.x = self.size/2
-            self.physics.velocity.x = abs(self.physics.velocity.x) * self.physics.bounce_factor
+        if x - half <= 0:
+            position.x = half
+            velocity.x = abs(velocity.x) * physics.bounce_factor
             collided = True
-        elif self.physics.position.x + self.size/2 >= width:
-            self.physics.position.x = width - self.size/2
-            self.physics.velocity.x = -abs(self.physics.velocity.x) * self.physics.bounce_factor
+        elif x + half >= width:
+            position.x = width - half
+            velocity.x = -abs(velocity.x) * physics.bounce_factor
             collided = True
             
         # Top/Bottom boundaries  
-        if self.physics.position.y - self.size/2 <= 0:
-            self.physics.position.y = self.size/2
-            self.physics.velocity.y = abs(self.physics.velocity.y) * self.physics.bounce_factor
+        if y - half <= 0:
+            position.y = half
+            velocity.y = abs(velocity.y) * physics.bounce_factor
             collided = True
-        elif self.physics.position.y + self.size/2 >= height:
-            self.physics.position.y = height - self.size/2
-            self.physics.velocity.y = -abs(self.physics.velocity.y) * self.physics.bounce_factor
+        elif y + half >= height:
+            position.y = height - half
+            velocity.y = -abs(velocity.y) * physics.bounce_factor
             collided = True
             
         if collided:
-            self.collision_count += 1
-            self.color = self._generate_color()
+            self.register_bounce()
             
         return collided
+
+    def sweep_boundaries(self, width: int, height: int, dt: float) -> bool:
+        """check_boundaries by time of impact: redo this step's move from the
+        previous position, bouncing off each wall at the moment it is reached"""
+        physics = self.physics
+        physics.launch_velocity = Vector2D(physics.velocity.x, physics.velocity.y)
+        half = self.size / 2
+        collided = False
+        for axis, limit in (("x", width), ("y", height)):
+            position, velocity, hit = sweep_wall_axis(
+                getattr(physics.previous_position, axis), getattr(physics.velocity, axis),
+                half, physics.bounce_factor, limit, dt)
+            setattr(physics.position, axis, position)
+            setattr(physics.velocity, axis, velocity)
+            collided |= hit
+
+        if collided:
+            self.register_bounce()
+
+        return collided
+
+    def register_bounce(self):
+        """Record a wall bounce (count and recolor)"""
+        self.collision_count += 1
+        self.color = self._generate_color()
     
-    def update(self, dt: float, width: int, height: int, particle_effects: List[ParticleEffect]):
+    def update(self, dt: float, width: int, height: int, particles: ParticlePool):
         """Update object with enhanced physics and effects"""
         # Apply gravity
         self.physics.apply_force(Vector2D(0, GameConfig.GRAVITY * self.physics.mass))
@@ -188,86 +1678,180 @@ class GameObject:
         self.physics.update(dt)
         
         # Check collisions and create effects
-        if self.check_boundaries(width, height):
-            effect = ParticleEffect(self.physics.position, self.color)
-            particle_effects.append(effect)
+        if GameConfig.CONTINUOUS_COLLISION:
+            collided = self.sweep_boundaries(width, height, dt)
+        else:
+            collided = self.check_boundaries(width, height)
+        self.update_effects(collided, particles)
         
         # Update trail
-        self.trail_positions.append((self.physics.position.x, self.physics.position.y))
-        if len(self.trail_positions) > 8:
-            self.trail_positions.pop(0)
-    
-    def draw(self, screen):
-        """Enhanced rendering with trails and effects"""
-        # Draw trail
-        if len(self.trail_positions) > 1:
-            for i, pos in enumerate(self.trail_positions[:-1]):
-                alpha = int(255 * (i / len(self.trail_positions)) * 0.3)
-                trail_color = (*self.color, alpha)
-                try:
-                    pygame.draw.circle(screen, self.color, 
-                                     (int(pos[0]), int(pos[1])), 
-                                     int(self.size/4 * (i / len(self.trail_positions))))
-                except:
-                    pass
-        
-        # Draw main object
-        pos = (int(self.physics.position.x), int(self.physics.position.y))
-        
-        if self.obj_type == ObjectType.SQUARE:
-            rect = pygame.Rect(pos[0] - self.size/2, pos[1] - self.size/2, 
-                             self.size, self.size)
-            pygame.draw.rect(screen, self.color, rect)
-            pygame.draw.rect(screen, (255, 255, 255), rect, 2)
-            
-        elif self.obj_type == ObjectType.CIRCLE:
-            pygame.draw.circle(screen, self.color, pos, int(self.size/2))
-            pygame.draw.circle(screen, (255, 255, 255), pos, int(self.size/2), 2)
-            
-        elif self.obj_type == ObjectType.TRIANGLE:
-            points = [
-                (pos[0], pos[1] - self.size/2),
-                (pos[0] - self.size/2, pos[1] + self.size/2),
-                (pos[0] + self.size/2, pos[1] + self.size/2)
-            ]
-            pygame.draw.polygon(screen, self.color, points)
-            pygame.draw.polygon(screen, (255, 255, 255), points, 2)
-            
-        elif self.obj_type == ObjectType.HEXAGON:
-            points = []
-            for i in range(6):
-                angle = i * math.pi / 3
-                x = pos[0] + (self.size/2) * math.cos(angle)
-                y = pos[1] + (self.size/2) * math.sin(angle)
-                points.append((x, y))
-            pygame.draw.polygon(screen, self.color, points)
-            pygame.draw.polygon(screen, (255, 255, 255), points, 2)
+        self.trails.record_row(self.trail_row, self.physics.position.x, self.physics.position.y)
+        return collided
+
+    def update_effects(self, collided: bool, particles: ParticlePool):
+        """Spawn bounce particles after a physics step"""
+        if collided:
+            particles.emit(self.physics.position, self.color)
 
 class GameStats:
-    """Data structure to track game statistics"""
-    def __init__(self):
+    """Game statistics maintained from spawn, clear and collision events.
+
+    Counters never walk the object list. Aggregates that need per-object
+    state (speed histogram, time to rest) are refreshed only every
+    STATS_SAMPLE_INTERVAL, from one vectorized pass over the speeds, and
+    each refresh is also streamed to `sink` when one is attached.
+    """
+    def __init__(self, sink: Optional[TelemetrySink] = None):
         self.objects_created = 0
         self.total_collisions = 0
         self.game_time = 0
+        self.candidate_pairs = 0
+        self.sleeping = 0
         self.object_type_counts = {obj_type: 0 for obj_type in ObjectType}
-    
-    def update(self, objects: List[GameObject], dt: float):
-        self.game_time += dt
-        self.total_collisions = sum(obj.collision_count for obj in objects)
-        
-        # Reset counts and recalculate
+        self.sink = sink
+
+        self.collisions_per_second = 0.0
+        self.speed_histogram = np.zeros(GameConfig.SPEED_HISTOGRAM_BINS, dtype=np.int64)
+        self.resting = 0
+        self.rested_count = 0
+        self.mean_time_to_rest = 0.0
+        # Per live object, in spawn order (the same order as SimulationCore.objects)
+        self._spawn_times: List[float] = []
+        self._at_rest = np.zeros(0, dtype=bool)
+        self._collision_events = 0
+        self._last_sample_time = 0.0
+        self._last_sample_events = 0
+
+    @staticmethod
+    def telemetry_dtype() -> np.dtype:
+        """Record layout of binary telemetry files (np.fromfile(path, dtype=...))"""
+        return np.dtype([
+            ("time", "<f8"),
+            ("objects", "<u4"),
+            ("total_collisions", "<u8"),
+            ("collisions_per_second", "<f8"),
+            ("speed_histogram", "<u4", (GameConfig.SPEED_HISTOGRAM_BINS,)),
+            ("resting", "<u4"),
+            ("sleeping", "<u4"),
+            ("mean_time_to_rest", "<f8"),
+        ])
+
+    def copy(self) -> "GameStats":
+        """Detached copy for display (no telemetry sink)"""
+        clone = copy.copy(self)
+        clone.object_type_counts = dict(self.object_type_counts)
+        clone.sink = None
+        return clone
+
+    def on_spawn(self, obj_type: ObjectType):
+        self.objects_created += 1
+        self.object_type_counts[obj_type] += 1
+        self._spawn_times.append(self.game_time)
+        self._at_rest = np.append(self._at_rest, False)
+
+    def on_spawn_batch(self, obj_types: List[ObjectType]):
+        """Like on_spawn for each of `obj_types`, with one resize of the per-object state"""
+        self.objects_created += len(obj_types)
+        for obj_type in obj_types:
+            self.object_type_counts[obj_type] += 1
+        self._spawn_times.extend([self.game_time] * len(obj_types))
+        self._at_rest = np.concatenate([self._at_rest, np.zeros(len(obj_types), dtype=bool)])
+
+    def on_clear(self):
+        """All objects removed: per-object counters start over"""
+        self.total_collisions = 0
+        self.sleeping = 0
         for obj_type in ObjectType:
             self.object_type_counts[obj_type] = 0
-        
-        for obj in objects:
-            self.object_type_counts[obj.obj_type] += 1
+        self._spawn_times.clear()
+        self._at_rest = np.zeros(0, dtype=bool)
+
+    def on_collisions(self, count: int):
+        """`count` collisions were registered (one per object involved)"""
+        self.total_collisions += count
+        self._collision_events += count
+
+    def update(self, dt: float) -> bool:
+        """Advance the clock; True when a sample() is due"""
+        self.game_time += dt
+        return self.game_time - self._last_sample_time >= GameConfig.STATS_SAMPLE_INTERVAL
+
+    def sample(self, speeds: np.ndarray):
+        """Refresh the rate, histogram and rest aggregates and emit telemetry"""
+        elapsed = self.game_time - self._last_sample_time
+        if elapsed > 0:
+            self.collisions_per_second = (self._collision_events - self._last_sample_events) / elapsed
+        self._last_sample_time = self.game_time
+        self._last_sample_events = self._collision_events
+
+        # Clip before the cast: NaN, inf and huge speeds would become int64
+        # garbage (negative bins), so non-finite speeds are left out and the
+        # rest clamped to the top bin
+        finite = speeds[np.isfinite(speeds)]
+        bins = np.minimum(finite * (GameConfig.SPEED_HISTOGRAM_BINS / GameConfig.SPEED_HISTOGRAM_MAX),
+                          GameConfig.SPEED_HISTOGRAM_BINS - 1).astype(np.int64)
+        self.speed_histogram = np.bincount(bins, minlength=GameConfig.SPEED_HISTOGRAM_BINS)
+
+        # Time to rest: first sample an object is seen below REST_SPEED
+        resting = speeds < GameConfig.REST_SPEED
+        newly_rested = np.flatnonzero(resting & ~self._at_rest)
+        if len(newly_rested):
+            durations = self.game_time - np.asarray(self._spawn_times)[newly_rested]
+            total = self.mean_time_to_rest * self.rested_count + durations.sum()
+            self.rested_count += len(newly_rested)
+            self.mean_time_to_rest = total / self.rested_count
+            self._at_rest[newly_rested] = True
+        self.resting = int(resting.sum())
+
+        if self.sink is not None:
+            self.sink.write({
+                "time": self.game_time,
+                "objects": len(speeds),
+                "total_collisions": self.total_collisions,
+                "collisions_per_second": self.collisions_per_second,
+                "speed_histogram": self.speed_histogram.tolist(),
+                "resting": self.resting,
+                "sleeping": self.sleeping,
+                "mean_time_to_rest": self.mean_time_to_rest,
+            })
+
+class TextCache:
+    """LRU cache of rendered text surfaces keyed on (font size, text, color).
+
+    Fonts are created once per size, and a string is only re-rendered when
+    its text or color actually changes.
+    """
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self.fonts: Dict[int, pygame.font.Font] = {}
+        self.surfaces: "OrderedDict[Tuple[int, str, Tuple[int, int, int]], pygame.Surface]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def font(self, size: int) -> pygame.font.Font:
+        if size not in self.fonts:
+            self.fonts[size] = pygame.font.Font(None, size)
+        return self.fonts[size]
+
+    def render(self, size: int, text: str, color: Tuple[int, int, int]) -> pygame.Surface:
+        key = (size, text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = self.font(size).render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
 
 class Menu:
     """Enhanced menu system with better organization"""
-    def __init__(self, screen_width: int, screen_height: int):
-        self.font_large = pygame.font.Font(None, 48)
-        self.font_medium = pygame.font.Font(None, 36)
-        self.font_small = pygame.font.Font(None, 24)
+    def __init__(self, screen_width: int, screen_height: int, text_cache: Optional[TextCache] = None):
+        self.text_cache = text_cache if text_cache is not None else TextCache()
         self.width = screen_width
         self.height = screen_height
         
@@ -279,28 +1863,29 @@ class Menu:
             ("C - Clear All", None),
             ("ESC - Exit", None)
         ]
-    
-    def draw(self, screen, stats: GameStats, object_count: int):
-        """Draw enhanced menu with statistics"""
-        # Semi-transparent overlay
-        overlay = pygame.Surface((self.width, self.height))
-        overlay.set_alpha(200)
-        overlay.fill(GameConfig.COLORS['menu_bg'])
-        screen.blit(overlay, (0, 0))
-        
+        self.static_layer = self._compose_static_layer()
+
+    def _compose_static_layer(self) -> pygame.Surface:
+        """Pre-compose the semi-transparent overlay, title and options once"""
+        layer = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+        layer.fill((*GameConfig.COLORS['menu_bg'], 200))
+
         # Title
-        title = self.font_large.render("ADVANCED BOUNCING SIMULATION", True, 
-                                     GameConfig.COLORS['accent'])
-        title_rect = title.get_rect(center=(self.width//2, 80))
-        screen.blit(title, title_rect)
-        
+        title = self.text_cache.font(48).render("ADVANCED BOUNCING SIMULATION", True,
+                                                GameConfig.COLORS['accent'])
+        layer.blit(title, title.get_rect(center=(self.width//2, 80)))
+
         # Menu options
         y_start = 150
         for i, (text, _) in enumerate(self.menu_options):
             color = GameConfig.COLORS['accent'] if i < 4 else GameConfig.COLORS['text']
-            option_text = self.font_medium.render(text, True, color)
-            option_rect = option_text.get_rect(center=(self.width//2, y_start + i * 40))
-            screen.blit(option_text, option_rect)
+            option_text = self.text_cache.font(36).render(text, True, color)
+            layer.blit(option_text, option_text.get_rect(center=(self.width//2, y_start + i * 40)))
+        return layer
+    
+    def draw(self, screen, stats: GameStats, object_count: int):
+        """Draw enhanced menu with statistics"""
+        screen.blit(self.static_layer, (0, 0))
         
         # Statistics panel
         stats_y = 400
@@ -312,46 +1897,488 @@ class Menu:
         ]
         
         for i, text in enumerate(stats_texts):
-            stats_surface = self.font_small.render(text, True, GameConfig.COLORS['text'])
+            stats_surface = self.text_cache.render(24, text, GameConfig.COLORS['text'])
             stats_rect = stats_surface.get_rect(center=(self.width//2, stats_y + i * 25))
             screen.blit(stats_surface, stats_rect)
 
-class BouncingSimulation:
-    """Main game class using composition and advanced techniques"""
+def merge_rects(rects: List[pygame.Rect]) -> List[pygame.Rect]:
+    """Greedily union overlapping rectangles so each area is pushed once"""
+    merged: List[pygame.Rect] = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        hit = rect.collidelist(merged)
+        while hit != -1:
+            rect.union_ip(merged.pop(hit))
+            hit = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+class DirtyRectRenderer:
+    """Restores and presents only the screen areas touched in the last two frames.
+
+    Everything is still drawn every frame; what gets skipped is clearing the
+    whole screen and pushing the whole screen to the display. When the dirty
+    area passes max_coverage of the screen a plain flip is cheaper, so we
+    fall back to that.
+    """
+    def __init__(self, screen: pygame.Surface, background: pygame.Surface,
+                 max_coverage: float = GameConfig.DIRTY_RECT_MAX_COVERAGE):
+        self.screen = screen
+        self.background = background
+        self.max_coverage = max_coverage
+        self.previous_rects: List[pygame.Rect] = []
+        self.full_redraw = True
+        self.full_flips = 0
+        self.partial_updates = 0
+
+    def invalidate(self):
+        """The next frame must clear and present the whole screen"""
+        self.full_redraw = True
+        self.previous_rects = []
+
+    def restore(self):
+        """Paint the background back over last frame's drawing"""
+        if self.full_redraw:
+            self.screen.blit(self.background, (0, 0))
+        else:
+            for rect in self.previous_rects:
+                self.screen.blit(self.background, rect, rect)
+
+    def present(self, drawn: List[pygame.Rect]):
+        """Push this frame's drawn areas plus last frame's cleared areas"""
+        screen_rect = self.screen.get_rect()
+        dirty = merge_rects([rect.clip(screen_rect) for rect in self.previous_rects + drawn])
+        coverage = sum(rect.width * rect.height for rect in dirty) / (screen_rect.width * screen_rect.height)
+
+        if self.full_redraw or coverage > self.max_coverage:
+            pygame.display.flip()
+            self.full_flips += 1
+        else:
+            pygame.display.update(dirty)
+            self.partial_updates += 1
+
+        self.previous_rects = drawn
+        self.full_redraw = False
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array = array.copy()
+    array.flags.writeable = False
+    return array
+
+class SnapshotBuffer:
+    """Storage SimulationCore.snapshot fills in place for a SimulationThread,
+    so publishing a snapshot copies into arrays that already exist"""
     def __init__(self):
-        self.screen = pygame.display.set_mode((GameConfig.WIDTH, GameConfig.HEIGHT))
-        pygame.display.set_caption("Advanced Bouncing Ball Simulation")
-        self.clock = pygame.time.Clock()
-        
+        self.positions = np.zeros((0, 2))
+        self.previous_positions = np.zeros((0, 2))
+        self.sizes = np.zeros(0)
+        self.particles = ParticlePool(GameConfig.MAX_PARTICLES)
+        self.trails = TrailBuffer(GameConfig.TRAIL_LENGTH)
+
+    def hold(self, name: str, source: np.ndarray) -> np.ndarray:
+        """Copy `source` into the array `name`, growing it if needed, and
+        return a read-only view of the copy"""
+        target = getattr(self, name)
+        n = len(source)
+        if len(target) < n or target.dtype != source.dtype:
+            target = np.zeros((max(n, 2 * len(target)),) + source.shape[1:], dtype=source.dtype)
+            setattr(self, name, target)
+        view = target[:n]
+        view[...] = source
+        view.flags.writeable = False
+        return view
+
+@dataclass(frozen=True)
+class SimulationSnapshot:
+    """Everything the renderer reads from one simulation step.
+
+    Snapshots a SimulationThread publishes own copies of all of it (arrays
+    are read-only), kept in one of its two SnapshotBuffers, so the renderer
+    can use one while the next is built in the other.
+    SimulationCore.snapshot(detach=False) returns views of the live state
+    instead, for single-threaded rendering.
+    """
+    step: int
+    types: List[ObjectType]
+    colors: List[Tuple[int, int, int]]
+    positions: np.ndarray
+    previous_positions: np.ndarray
+    sizes: np.ndarray
+    particles: ParticlePool
+    trails: TrailBuffer
+    stats: GameStats
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def sprite_blits(self, sprites: SpriteCache, alpha: float = 1.0, outlines: bool = True) -> list:
+        """(sprite, top-left) pairs for every object, interpolated `alpha` of
+        the way from the previous step, ready for one Surface.blits call"""
+        positions = self.previous_positions + (self.positions - self.previous_positions) * alpha
+        blits = []
+        for obj_type, size, color, (x, y) in zip(self.types, self.sizes.tolist(), self.colors,
+                                                 positions.tolist()):
+            sprite = sprites.get(obj_type, size, color, outlines)
+            blits.append((sprite, (int(x) - sprite.get_width() // 2, int(y) - sprite.get_height() // 2)))
+        return blits
+
+class SimulationCore:
+    """Display-free simulation state stepped explicitly with step(dt).
+
+    Holds objects, physics, particles and statistics but never touches a
+    display surface, fonts or the pygame event loop, so it can run on
+    render-less machines or inside other services.
+    """
+    def __init__(self, width: int = GameConfig.WIDTH, height: int = GameConfig.HEIGHT):
+        self.width = width
+        self.height = height
+
         # Game state using data structures
         self.objects: List[GameObject] = []
-        self.particle_effects: List[ParticleEffect] = []
-        self.stats = GameStats()
-        self.menu = Menu(GameConfig.WIDTH, GameConfig.HEIGHT)
+        self.world = self._create_world(width)
+        # Body state for every backend. The object backend steps one
+        # GameObject at a time but keeps its rows here too, so collisions
+        # and snapshots read arrays instead of rebuilding them every step
+        self.bodies = self.world if self.world is not None else PhysicsWorld()
+        self.collisions = ObjectCollisionSystem()
+        self.particles = ParticlePool(GameConfig.MAX_PARTICLES)
+        self.trails = TrailBuffer(GameConfig.TRAIL_LENGTH)
+        sink = (TelemetrySink(GameConfig.TELEMETRY_PATH, GameStats.telemetry_dtype())
+                if GameConfig.TELEMETRY_PATH else None)
+        self.stats = GameStats(sink)
+        self.steps = 0
+        self._settings = self._physics_settings()
+        # Front ends swap in their own profiler to see the per-phase split
+        self.profiler = FrameProfiler(enabled=False)
+
+    @staticmethod
+    def _create_world(width: int) -> Optional[PhysicsWorld]:
+        """Array physics backend selected by GameConfig.PHYSICS_BACKEND (None for objects)"""
+        if GameConfig.PHYSICS_BACKEND == "numpy":
+            return PhysicsWorld()
+        if GameConfig.PHYSICS_BACKEND == "parallel":
+            return ParallelPhysicsWorld(GameConfig.PHYSICS_WORKERS, GameConfig.MAX_OBJECTS, width)
+        return None
+
+    @staticmethod
+    def _physics_settings() -> tuple:
+        """The GameConfig values sleeping bodies settled under; any change wakes them"""
+        return (GameConfig.GRAVITY, GameConfig.PHYSICS_DAMPING, GameConfig.OBJECT_COLLISIONS,
+                GameConfig.CONTINUOUS_COLLISION, GameConfig.SLEEP_BODIES, GameConfig.SLEEP_SPEED,
+                GameConfig.SLEEP_GRAVITY_STEPS, GameConfig.SLEEP_STEPS)
+
+    def close(self):
+        """Release backend resources such as worker processes and the telemetry sink"""
+        self.bodies.close()
+        if self.stats.sink is not None:
+            self.stats.sink.close()
+            self.stats.sink = None
+
+    def spawn_object(self, obj_type: ObjectType, position: Optional[Vector2D] = None) -> bool:
+        """Factory method to create objects with validation"""
+        if len(self.objects) >= GameConfig.MAX_OBJECTS:
+            return False
+
+        if position is None:
+            position = Vector2D(
+                random.uniform(50, self.width - 50),
+                random.uniform(50, self.height - 50)
+            )
+
+        new_object = GameObject(obj_type, position, self.bodies, self.trails)
+        self.objects.append(new_object)
+        self.stats.on_spawn(obj_type)
+        self.wake_near(position, new_object.size / 2 + GameConfig.WAKE_RADIUS)
+        return True
+
+    def spawn_batch(self, count: int, types: Optional[Dict[ObjectType, float]] = None,
+                    pattern: str = "uniform", seed: Optional[SeedLike] = None) -> int:
+        """Spawn up to `count` objects in one pass and return how many fit under MAX_OBJECTS.
+
+        `types` weights the object type mix (all types equally by default)
+        and `pattern` is one of SPAWN_PATTERNS. Every random value comes
+        from one generator seeded with `seed`, so a batch is reproducible on
+        its own; without a seed it draws one from the global numpy RNG.
+        """
+        count = min(count, GameConfig.MAX_OBJECTS - len(self.objects))
+        if count <= 0:
+            return 0
+        if seed is None:
+            seed = np.random.randint(2**31)
+        rng = np.random.default_rng(seed)
+        kinds = list(types) if types else OBJECT_TYPES
+        weights = np.array([types[kind] for kind in kinds] if types else [1.0] * len(kinds))
+        kind_index = rng.choice(len(kinds), count, p=weights / weights.sum())
+        positions = spawn_positions(pattern, count, self.width, self.height, rng)
+        velocities = rng.uniform(-6, 6, (count, 2))
+        sizes = rng.uniform(15, 45, count)
+        bounce_factors = rng.uniform(*GameConfig.BOUNCE_FACTOR_RANGE, count)
+        color_index = rng.integers(len(COLOR_PALETTE), size=count)
+
+        rows = self.bodies.add_bodies(positions, velocities, sizes, bounce_factors=bounce_factors)
+        bodies = [ArrayPhysicsBody(self.bodies, row) for row in rows]
+        obj_types = [kinds[i] for i in kind_index.tolist()]
+        trail_rows = self.trails.add_rows(count)
+        self.objects.extend(
+            GameObject.from_body(obj_type, body, COLOR_PALETTE[color], self.trails, row)
+            for obj_type, body, color, row in zip(obj_types, bodies, color_index.tolist(), trail_rows))
+        self.stats.on_spawn_batch(obj_types)
+        # A batch can land anywhere, so let every settled body react to it
+        self.wake_bodies()
+        return count
+
+    def positions(self) -> np.ndarray:
+        """Current position of every object, in spawn order"""
+        return self.bodies.ordered("positions")
+
+    def wake_bodies(self, rows: Optional[np.ndarray] = None):
+        """Wake the objects at `rows` (spawn order indices), or all of them"""
+        self.bodies.wake(slice(0, self.bodies.count) if rows is None else rows)
+
+    def wake_near(self, position: Vector2D, radius: float):
+        """Wake every object whose center is within `radius` of `position`"""
+        offsets = self.positions() - (position.x, position.y)
+        self.wake_bodies(np.flatnonzero(np.hypot(offsets[:, 0], offsets[:, 1]) < radius))
+
+    def clear_objects(self):
+        """Clear all objects and reset statistics"""
+        self.objects.clear()
+        self.particles.clear()
+        self.trails.clear()
+        self.bodies.clear()
+        self.stats.on_clear()
+
+    def step(self, dt: float):
+        """Advance every object, particle and statistic by dt seconds"""
+        profiler = self.profiler
+        settings = self._physics_settings()
+        if settings != self._settings:
+            self._settings = settings
+            self.wake_bodies()
+            self.stats.sleeping = 0
+
+        # Update objects
+        with profiler.phase("update.objects"):
+            if self.world is not None:
+                bounced = np.flatnonzero(self.world.step(dt, self.width, self.height)).tolist()
+                for i in bounced:
+                    obj = self.objects[i]
+                    obj.register_bounce()
+                    obj.update_effects(True, self.particles)
+                # Sleeping bodies don't move, so like the object backend they
+                # leave their trail alone instead of collapsing it onto one point
+                asleep, positions = self.world.ordered("asleep"), self.world.ordered("positions")
+                if asleep.any():
+                    awake = np.flatnonzero(~asleep)
+                    self.trails.record(positions[awake], awake)
+                else:
+                    self.trails.record(positions)
+                self.stats.on_collisions(len(bounced))
+            else:
+                bounces = 0
+                for obj in self.objects:
+                    if not obj.physics.asleep:
+                        bounces += obj.update(dt, self.width, self.height, self.particles)
+                self.stats.on_collisions(bounces)
+
+        if GameConfig.OBJECT_COLLISIONS:
+            with profiler.phase("update.collisions"):
+                self.collide_objects(dt)
+
+        if GameConfig.SLEEP_BODIES:
+            with profiler.phase("update.sleep"):
+                self.update_sleep(dt)
+
+        # Update particle effects
+        with profiler.phase("update.particles"):
+            self.particles.update(dt)
+
+        # Update statistics
+        with profiler.phase("update.stats"):
+            if self.stats.update(dt):
+                self.stats.sample(self.speeds())
+        self.steps += 1
+
+    @staticmethod
+    def sleep_threshold(dt: float) -> float:
+        """Speed below which a body counts as settled, and above which an impact wakes one"""
+        # A body resting on the floor or a pile gains GRAVITY * dt of speed each
+        # step before the contact takes it away again, so allow a few steps of it
+        return GameConfig.SLEEP_SPEED + GameConfig.SLEEP_GRAVITY_STEPS * GameConfig.GRAVITY * dt
+
+    def update_sleep(self, dt: float):
+        """Put bodies that have stayed slow for SLEEP_STEPS steps to sleep"""
+        self.stats.sleeping = self.bodies.update_sleep(self.sleep_threshold(dt), GameConfig.SLEEP_STEPS)
+
+    def speeds(self) -> np.ndarray:
+        """Current speed of every object, in spawn order"""
+        velocities = self.bodies.ordered("velocities")
+        return np.hypot(velocities[:, 0], velocities[:, 1])
+
+    def collide_objects(self, dt: float):
+        """Resolve object-object collisions and feed counters and particles"""
+        world = self.bodies
+        positions, velocities = world.ordered("positions"), world.ordered("velocities")
+        previous = world.ordered("previous_positions") if GameConfig.CONTINUOUS_COLLISION else None
+        asleep = world.ordered("asleep") if GameConfig.SLEEP_BODIES else None
+        hits_i, hits_j = self.collisions.step(
+            positions, velocities, world.ordered("sizes"),
+            world.ordered("masses"), world.ordered("bounce_factors"), previous, dt,
+            asleep, self.sleep_threshold(dt), (self.width, self.height),
+            world.ordered("launch_velocities"))
+        self.stats.candidate_pairs = self.collisions.candidate_pairs
+        world.store("positions", positions)
+        world.store("velocities", velocities)
+        self.wake_bodies(self.collisions.woken)
+
+        self.stats.on_collisions(2 * len(hits_i))
+        # A burst is at least 3 particles, so in a crowded step the early ones
+        # would be recycled by the later ones before they are ever drawn
+        first_burst = len(hits_i) - math.ceil(self.particles.limit / 3)
+        for hit, (i, j) in enumerate(zip(hits_i.tolist(), hits_j.tolist())):
+            first, second = self.objects[i], self.objects[j]
+            first.register_bounce()
+            second.register_bounce()
+            if hit >= first_burst:
+                contact = (first.physics.position + second.physics.position) * 0.5
+                self.particles.emit(contact, first.color)
+
+    def snapshot(self, detach: bool = True, buffer: Optional[SnapshotBuffer] = None) -> SimulationSnapshot:
+        """Render state of the current step; detach=False skips the copies,
+        and with `buffer` they are made into its arrays instead of new ones"""
+        positions = self.bodies.ordered("positions")
+        previous = self.bodies.ordered("previous_positions")
+        sizes = self.bodies.ordered("sizes")
+        particles, trails, stats = self.particles, self.trails, self.stats
+        if buffer is not None:
+            positions = buffer.hold("positions", positions)
+            previous = buffer.hold("previous_positions", previous)
+            sizes = buffer.hold("sizes", sizes)
+            particles, trails, stats = (particles.copy(buffer.particles), trails.copy(buffer.trails),
+                                        stats.copy())
+        elif detach:
+            positions, previous, sizes = _read_only(positions), _read_only(previous), _read_only(sizes)
+            particles, trails, stats = particles.copy(), trails.copy(), stats.copy()
+        return SimulationSnapshot(
+            step=self.steps,
+            types=[obj.obj_type for obj in self.objects],
+            colors=[obj.color for obj in self.objects],
+            positions=positions, previous_positions=previous, sizes=sizes,
+            particles=particles, trails=trails, stats=stats)
+
+    # Body row written by record_rows(): x, y, vx, vy, size, type index, r, g, b
+    RECORD_LAYOUT = "shapes2d"
+    RECORD_FIELDS = 9
+
+    def record_rows(self) -> np.ndarray:
+        """Current bodies as float32 rows for a Recorder"""
+        state = self.get_state()
+        rows = np.empty((len(self.objects), self.RECORD_FIELDS), dtype=np.float32)
+        rows[:, 0:2] = state["positions"]
+        rows[:, 2:4] = state["velocities"]
+        rows[:, 4] = state["sizes"]
+        rows[:, 5] = state["types"]
+        rows[:, 6:9] = state["colors"]
+        return rows
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        """Per-object state as arrays (copies, safe to keep between steps)"""
+        world = self.bodies
+        n = world.count
+        return {
+            "positions": world.ordered("positions").copy(),
+            "velocities": world.ordered("velocities").copy(),
+            "sizes": world.ordered("sizes").copy(),
+            "types": np.array([OBJECT_TYPES.index(obj.obj_type) for obj in self.objects],
+                              dtype=np.int64),
+            "colors": np.array([obj.color for obj in self.objects],
+                               dtype=np.uint8).reshape(n, 3),
+            "collision_counts": np.array([obj.collision_count for obj in self.objects],
+                                         dtype=np.int64),
+        }
+
+def compose_background() -> pygame.Surface:
+    """Background fill and border, drawn once and blitted every frame"""
+    background = pygame.Surface((GameConfig.WIDTH, GameConfig.HEIGHT))
+    background.fill(GameConfig.COLORS['background'])
+    pygame.draw.rect(background, GameConfig.COLORS['border'],
+                     (0, 0, GameConfig.WIDTH, GameConfig.HEIGHT), 3)
+    return background
+
+class BouncingSimulation:
+    """Interactive pygame front end, one client of a SimulationCore
+
+    Pass `screen` to draw into an ordinary Surface instead of opening a
+    window; see run_offscreen(). With `threaded`, run() steps the core on
+    a SimulationThread: input only sends it commands and rendering only
+    reads its snapshots, so a slow flip never holds up physics.
+    """
+    def __init__(self, core: Optional[SimulationCore] = None, recorder: Optional[Recorder] = None,
+                 screen: Optional[pygame.Surface] = None, threaded: Optional[bool] = None):
+        self.offscreen = screen is not None
+        if self.offscreen:
+            # Drawing into a Surface only needs text; no display or audio
+            pygame.font.init()
+            self.screen = screen
+        else:
+            pygame.init()
+            self.screen = pygame.display.set_mode((GameConfig.WIDTH, GameConfig.HEIGHT))
+            pygame.display.set_caption("Advanced Bouncing Ball Simulation")
+        self.clock = pygame.time.Clock()
+        
+        self.core = core if core is not None else SimulationCore()
+        self.recorder = recorder
+        self.background = compose_background()
+        self.dirty_renderer = (DirtyRectRenderer(self.screen, self.background,
+                                                 GameConfig.DIRTY_RECT_MAX_COVERAGE)
+                               if GameConfig.DIRTY_RECTS and not self.offscreen else None)
+        self.text_cache = TextCache(GameConfig.TEXT_CACHE_SIZE)
+        self.sprites = SpriteCache(GameConfig.SPRITE_CACHE_BYTES)
+        self.menu = Menu(GameConfig.WIDTH, GameConfig.HEIGHT, self.text_cache)
+        self.profiler = FrameProfiler()
+        self.profiler_overlay = ProfilerOverlay(self.profiler, 1.0 / GameConfig.FPS)
+        self.governor = QualityGovernor(1.0 / GameConfig.FPS, len(GameConfig.QUALITY_LEVELS))
+        self.trail_steps, _, self.outlines = GameConfig.QUALITY_LEVELS[0]
+        self.sim_thread: Optional[SimulationThread] = None
+        if GameConfig.SIMULATION_THREAD if threaded is None else threaded:
+            # The core's own phases would run on the worker and interleave
+            # with the render thread's frames, so they stay unprofiled
+            self.sim_thread = SimulationThread(
+                lambda: self.step_core(1.0 / GameConfig.PHYSICS_HZ),
+                lambda buffer: self.core.snapshot(buffer=buffer),
+                1.0 / GameConfig.PHYSICS_HZ, SnapshotBuffer, GameConfig.MAX_SUBSTEPS)
+        else:
+            self.core.profiler = self.profiler
         
         self.running = True
         self.show_menu = True
         self.last_time = pygame.time.get_ticks()
+
+    @property
+    def objects(self) -> List[GameObject]:
+        return self.core.objects
+
+    @property
+    def particles(self) -> ParticlePool:
+        return self.core.particles
+
+    @property
+    def stats(self) -> GameStats:
+        return self.core.stats
     
     def spawn_object(self, obj_type: ObjectType):
         """Factory method to create objects with validation"""
-        if len(self.objects) >= GameConfig.MAX_OBJECTS:
-            return False
-            
-        position = Vector2D(
-            random.uniform(50, GameConfig.WIDTH - 50),
-            random.uniform(50, GameConfig.HEIGHT - 50)
-        )
-        
-        new_object = GameObject(obj_type, position)
-        self.objects.append(new_object)
-        self.stats.objects_created += 1
-        return True
+        if self.sim_thread is not None:
+            self.sim_thread.submit(lambda: self.core.spawn_object(obj_type))
+            return len(self.sim_thread.latest) < GameConfig.MAX_OBJECTS
+        return self.core.spawn_object(obj_type)
     
     def clear_objects(self):
         """Clear all objects and reset statistics"""
-        self.objects.clear()
-        self.particle_effects.clear()
+        if self.sim_thread is not None:
+            self.sim_thread.submit(self.core.clear_objects)
+        else:
+            self.core.clear_objects()
     
     def handle_events(self):
         """Enhanced event handling with better organization"""
@@ -365,6 +2392,9 @@ class BouncingSimulation:
                         self.running = False
                     else:
                         self.show_menu = True
+
+                elif event.key == pygame.K_p:
+                    self.profiler_overlay.toggle()
                         
                 elif self.show_menu:
                     # Menu navigation
@@ -393,102 +2423,559 @@ class BouncingSimulation:
     def update_simulation(self, dt: float):
         """Update all game objects and systems"""
         if not self.show_menu:
-            # Update objects
-            for obj in self.objects:
-                obj.update(dt, GameConfig.WIDTH, GameConfig.HEIGHT, self.particle_effects)
-            
-            # Update particle effects
-            self.particle_effects = [effect for effect in self.particle_effects if effect.particles]
-            for effect in self.particle_effects:
-                effect.update(dt)
-            
-            # Update statistics
-            self.stats.update(self.objects, dt)
+            self.step_core(dt)
+
+    def step_core(self, dt: float):
+        """One core step plus recording (on the simulation thread when threaded)"""
+        self.core.step(dt)
+        if self.recorder is not None:
+            self.recorder.record(self.core.steps, self.core.record_rows())
     
-    def render(self):
-        """Enhanced rendering with visual improvements"""
-        # Clear screen with gradient-like effect
-        self.screen.fill(GameConfig.COLORS['background'])
-        
-        # Draw border
-        pygame.draw.rect(self.screen, GameConfig.COLORS['border'], 
-                        (0, 0, GameConfig.WIDTH, GameConfig.HEIGHT), 3)
+    def render(self, alpha: float = 1.0, view: Optional[SimulationSnapshot] = None):
+        """Enhanced rendering with visual improvements
+
+        alpha is how far the current frame sits between the last two physics
+        steps, used to interpolate positions. `view` is the snapshot to draw,
+        by default the live state of the core.
+        """
+        if view is None:
+            view = self.core.snapshot(detach=False)
+        dirty = self.dirty_renderer is not None and not self.show_menu
+        if dirty:
+            self.dirty_renderer.restore()
+        else:
+            # Clear screen and draw the border in one blit
+            self.screen.blit(self.background, (0, 0))
         
+        profiler = self.profiler
+        drawn = []
         if not self.show_menu:
             # Draw particle effects first (background layer)
-            for effect in self.particle_effects:
-                effect.draw(self.screen)
+            with profiler.phase("render.particles"):
+                drawn.extend(view.particles.draw(self.screen, alpha))
             
-            # Draw all objects
-            for obj in self.objects:
-                obj.draw(self.screen)
+            # Draw all trails in one blits call, then every object body in another
+            with profiler.phase("render.objects"):
+                drawn.extend(self.screen.blits(view.trails.blit_sequence(
+                    view.sizes, view.colors, self.sprites, self.trail_steps)))
+                drawn.extend(self.screen.blits(view.sprite_blits(self.sprites, alpha, self.outlines)))
             
             # Draw HUD
-            self.draw_hud()
+            with profiler.phase("render.hud"):
+                drawn.extend(self.draw_hud(view))
         else:
             # Draw menu
-            self.menu.draw(self.screen, self.stats, len(self.objects))
+            self.menu.draw(self.screen, view.stats, len(view))
+
+        overlay_rect = self.profiler_overlay.draw(self.screen)
+        if overlay_rect is not None:
+            drawn.append(overlay_rect)
         
-        pygame.display.flip()
+        if self.offscreen:
+            return
+        with profiler.phase("render.flip"):
+            if dirty:
+                self.dirty_renderer.present(drawn)
+            else:
+                if self.dirty_renderer is not None:
+                    self.dirty_renderer.invalidate()
+                pygame.display.flip()
     
-    def draw_hud(self):
-        """Draw heads-up display with game information"""
-        font = pygame.font.Font(None, 28)
-        
+    def update_quality(self):
+        """Give the governor the last frame's busy time (the clock's, minus
+        the FPS sleep) and switch to the detail of a new quality level"""
+        if not GameConfig.QUALITY_GOVERNOR or not self.governor.update(self.clock.get_rawtime() / 1000.0):
+            return
+        self.trail_steps, particle_cap, self.outlines = GameConfig.QUALITY_LEVELS[self.governor.level]
+        particles = self.core.particles
+        limit = particles.capacity if particle_cap is None else min(particle_cap, particles.capacity)
+
+        def cap_particles():
+            particles.limit = limit
+        if self.sim_thread is not None:
+            self.sim_thread.submit(cap_particles)
+        else:
+            cap_particles()
+
+    def draw_hud(self, view: SimulationSnapshot) -> List[pygame.Rect]:
+        """Draw heads-up display with game information, returns the areas drawn"""
+        stats = view.stats
         hud_info = [
-            f"Objects: {len(self.objects)}/{GameConfig.MAX_OBJECTS}",
-            f"Collisions: {self.stats.total_collisions}",
-            f"Time: {self.stats.game_time:.1f}s",
-            "SPACE: Random | M: Menu"
+            f"Objects: {len(view)}/{GameConfig.MAX_OBJECTS}",
+            f"Collisions: {stats.total_collisions} ({stats.collisions_per_second:.0f}/s)",
+            f"Resting: {stats.resting}",
+            f"Sleeping: {stats.sleeping} | Awake: {len(view) - stats.sleeping}",
+            f"Time: {stats.game_time:.1f}s",
+            f"Pairs tested: {stats.candidate_pairs}",
+            f"Sprite cache: {self.sprites.hit_rate:.0%} hits",
+            self.governor.describe().capitalize(),
+            "SPACE: Random | M: Menu | P: Profiler"
         ]
         
+        drawn = []
         for i, text in enumerate(hud_info):
-            surface = font.render(text, True, GameConfig.COLORS['text'])
-            self.screen.blit(surface, (10, 10 + i * 25))
+            surface = self.text_cache.render(28, text, GameConfig.COLORS['text'])
+            drawn.append(self.screen.blit(surface, (10, 10 + i * 25)))
+        return drawn
     
     def run(self):
-        """Main game loop with proper timing"""
+        """Main game loop: fixed-rate physics with interpolated rendering"""
+        if self.sim_thread is not None:
+            self.run_threaded()
+            return
+        physics_dt = 1.0 / GameConfig.PHYSICS_HZ
+        accumulator = 0.0
         while self.running:
             current_time = pygame.time.get_ticks()
-            dt = (current_time - self.last_time) / 1000.0
+            accumulator += (current_time - self.last_time) / 1000.0
             self.last_time = current_time
+            profiler = self.profiler
             
-            self.handle_events()
-            self.update_simulation(dt)
-            self.render()
+            with profiler.phase("events"):
+                self.handle_events()
+
+            # Step physics in fixed increments; after a hitch, drop whatever
+            # backlog is left after MAX_SUBSTEPS so we slow down instead of spiralling
+            substeps = 0
+            with profiler.phase("update"):
+                while accumulator >= physics_dt and substeps < GameConfig.MAX_SUBSTEPS:
+                    self.update_simulation(physics_dt)
+                    accumulator -= physics_dt
+                    substeps += 1
+            if accumulator >= physics_dt:
+                accumulator = accumulator % physics_dt
+
+            with profiler.phase("render"):
+                self.render(accumulator / physics_dt)
             
-            self.clock.tick(GameConfig.FPS)
+            with profiler.phase("tick"):
+                self.clock.tick(GameConfig.FPS)
+            self.update_quality()
+            profiler.end_frame()
         
+        self.core.close()
+        if self.recorder is not None:
+            self.recorder.close()
         pygame.quit()
 
-# Recursive function for generating fractal-like patterns (bonus feature)
-def generate_spiral_positions(center: Vector2D, count: int, radius: float = 50, depth: int = 0) -> List[Vector2D]:
-    """Recursively generate spiral positions for object placement"""
+    def run_threaded(self):
+        """Main game loop with physics on the simulation thread
+
+        This thread only handles input and draws whatever snapshot was
+        published last; spawn and clear requests reach the core as commands.
+        """
+        sim_thread = self.sim_thread
+        paused = self.show_menu
+        sim_thread.set_paused(paused)
+        sim_thread.start()
+        try:
+            while self.running:
+                profiler = self.profiler
+                with profiler.phase("events"):
+                    self.handle_events()
+                if self.show_menu != paused:
+                    paused = self.show_menu
+                    sim_thread.set_paused(paused)
+
+                with profiler.phase("render"):
+                    self.render(sim_thread.alpha(), sim_thread.latest)
+
+                with profiler.phase("tick"):
+                    self.clock.tick(GameConfig.FPS)
+                self.update_quality()
+                profiler.end_frame()
+        finally:
+            sim_thread.stop()
+            self.core.close()
+            if self.recorder is not None:
+                self.recorder.close()
+            pygame.quit()
+
+    def run_offscreen(self, frames: int, encoder: FrameEncoder):
+        """Render `frames` frames of 1/FPS simulated seconds each into `encoder`
+
+        Nothing waits on a clock, so this runs as fast as simulation,
+        drawing and the encoder's backpressure allow.
+        """
+        physics_dt = 1.0 / GameConfig.PHYSICS_HZ
+        accumulator = 0.0
+        self.show_menu = False
+        try:
+            for _ in range(frames):
+                accumulator += 1.0 / GameConfig.FPS
+                with self.profiler.phase("update"):
+                    while accumulator >= physics_dt:
+                        self.update_simulation(physics_dt)
+                        accumulator -= physics_dt
+                with self.profiler.phase("render"):
+                    self.render(accumulator / physics_dt)
+                with self.profiler.phase("encode"):
+                    encoder.submit(pygame.image.tobytes(self.screen, "RGB"))
+                self.profiler.end_frame()
+        finally:
+            encoder.close()
+            self.core.close()
+            if self.recorder is not None:
+                self.recorder.close()
+
+def create_recorder(path: str, dt: float, seed: int) -> Recorder:
+    """Recorder for SimulationCore.record_rows(), sized by GameConfig"""
+    return Recorder(path, GameConfig.MAX_OBJECTS, SimulationCore.RECORD_FIELDS,
+                    SimulationCore.RECORD_LAYOUT, GameConfig.WIDTH, GameConfig.HEIGHT, dt, seed)
+
+class ReplayPlayer:
+    """Play back a recording from its memory map; scrubbing never re-simulates
+
+    SPACE pauses, LEFT/RIGHT step one frame (ten with SHIFT), HOME/END jump
+    to either end and ESC quits.
+    """
+    def __init__(self, replay: ReplayFile):
+        if replay.layout != SimulationCore.RECORD_LAYOUT:
+            raise ValueError(f"cannot play a '{replay.layout}' recording")
+        pygame.init()
+        self.screen = pygame.display.set_mode((replay.width, replay.height))
+        pygame.display.set_caption("Bouncing Simulation Replay")
+        self.clock = pygame.time.Clock()
+        self.replay = replay
+        self.background = compose_background()
+        self.text_cache = TextCache(GameConfig.TEXT_CACHE_SIZE)
+        self.sprites = SpriteCache(GameConfig.SPRITE_CACHE_BYTES)
+        self.frame = 0
+        self.paused = False
+        self.running = True
+
+    def seek(self, frame: int):
+        self.frame = max(0, min(frame, len(self.replay) - 1))
+
+    def handle_events(self):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
+            elif event.type == pygame.KEYDOWN:
+                stride = 10 if event.mod & pygame.KMOD_SHIFT else 1
+                if event.key == pygame.K_ESCAPE:
+                    self.running = False
+                elif event.key == pygame.K_SPACE:
+                    self.paused = not self.paused
+                elif event.key == pygame.K_LEFT:
+                    self.seek(self.frame - stride)
+                elif event.key == pygame.K_RIGHT:
+                    self.seek(self.frame + stride)
+                elif event.key == pygame.K_HOME:
+                    self.seek(0)
+                elif event.key == pygame.K_END:
+                    self.seek(len(self.replay) - 1)
+
+    def render(self):
+        self.screen.blit(self.background, (0, 0))
+        blits = []
+        for x, y, _, _, size, type_index, r, g, b in self.replay[self.frame]:
+            sprite = self.sprites.get(OBJECT_TYPES[int(type_index)], float(size),
+                                      (int(r), int(g), int(b)))
+            blits.append((sprite, (int(x) - sprite.get_width() // 2,
+                                   int(y) - sprite.get_height() // 2)))
+        self.screen.blits(blits, doreturn=False)
+
+        status = "paused" if self.paused else "playing"
+        hud_info = [
+            f"Frame {self.frame + 1}/{len(self.replay)} (step {self.replay.step(self.frame)}) {status}",
+            f"Seed: {self.replay.seed}",
+            "SPACE: Pause | LEFT/RIGHT: Step | HOME/END: Jump",
+        ]
+        for i, text in enumerate(hud_info):
+            surface = self.text_cache.render(28, text, GameConfig.COLORS['text'])
+            self.screen.blit(surface, (10, 10 + i * 25))
+        pygame.display.flip()
+
+    def run(self):
+        """Advance at the recorded step rate, a whole number of frames per tick"""
+        accumulator = 0.0
+        while self.running and len(self.replay):
+            accumulator += self.clock.tick(GameConfig.FPS) / 1000.0
+            self.handle_events()
+            if self.paused:
+                accumulator = 0.0
+            else:
+                frames = int(accumulator / self.replay.dt)
+                accumulator -= frames * self.replay.dt
+                self.seek(self.frame + frames)
+            self.render()
+        pygame.quit()
+
+# Spiral placement (bonus feature): rings of points around points, computed level by level
+def _spiral_levels(count: int, radius: float, depth: int) -> Tuple[List[int], List[float], List[int]]:
+    """Ring size and radius per level of a spiral, and how many points the
+    tree under one point of each level holds (itself included)"""
+    counts, radii = [count], [radius]
+    while depth + len(counts) - 1 < 2 and counts[-1] > 2:
+        counts.append(max(1, counts[-1] // 2))
+        radii.append(radii[-1] * 0.6)
+    subtree = [1] * len(counts)
+    for level in range(len(counts) - 2, -1, -1):
+        subtree[level] = 1 + counts[level + 1] * subtree[level + 1]
+    return counts, radii, subtree
+
+def spiral_positions(center: Tuple[float, float], count: int, radius: float = 50,
+                     depth: int = 0) -> np.ndarray:
+    """generate_spiral_positions as an (N, 2) array, built one ring level at a time.
+
+    Every point of a ring with more than two points gets a ring of half as
+    many points around it, 0.6 times the radius, down to depth 2. Points are
+    in depth-first order: each point is followed by the whole tree of rings
+    around it.
+    """
     if count <= 0 or depth > 3:
-        return []
-    
-    positions = []
-    angle_step = 2 * math.pi / count
-    
-    for i in range(count):
-        angle = i * angle_step
-        x = center.x + radius * math.cos(angle)
-        y = center.y + radius * math.sin(angle)
-        positions.append(Vector2D(x, y))
-        
-        # Recursive call for smaller spirals
-        if depth < 2 and count > 2:
-            sub_positions = generate_spiral_positions(
-                Vector2D(x, y), 
-                max(1, count // 2), 
-                radius * 0.6, 
-                depth + 1
-            )
-            positions.extend(sub_positions)
-    
+        return np.zeros((0, 2))
+    counts, radii, subtree = _spiral_levels(count, radius, depth)
+    positions = np.empty((count * subtree[0], 2))
+    centers = np.array([center], dtype=float)
+    parents = np.array([-1])
+    for level, (ring, ring_radius) in enumerate(zip(counts, radii)):
+        angles = np.arange(ring) * (2 * math.pi / ring)
+        offsets = np.column_stack([ring_radius * np.cos(angles), ring_radius * np.sin(angles)])
+        points = (centers[:, None, :] + offsets).reshape(-1, 2)
+        rows = (parents[:, None] + 1 + np.arange(ring) * subtree[level]).ravel()
+        positions[rows] = points
+        centers, parents = points, rows
     return positions
 
+def generate_spiral_positions(center: Vector2D, count: int, radius: float = 50, depth: int = 0) -> List[Vector2D]:
+    """Spiral positions for object placement (see spiral_positions)"""
+    return [Vector2D(x, y) for x, y in spiral_positions((center.x, center.y), count, radius, depth).tolist()]
+
+SPAWN_PATTERNS = ("uniform", "grid", "spiral")
+
+def spawn_positions(pattern: str, count: int, width: int, height: int,
+                    rng: np.random.Generator) -> np.ndarray:
+    """(count, 2) spawn points inside the arena, 50 px from the walls like spawn_object.
+
+    "uniform" is random, "grid" fills rows of evenly spaced cells, and
+    "spiral" takes the first `count` points of the smallest centered spiral
+    (spiral_positions) that holds them, scaled to fit.
+    """
+    margin = 50
+    low = np.array([margin, margin], dtype=float)
+    span = np.array([width - 2 * margin, height - 2 * margin], dtype=float)
+    if pattern == "uniform":
+        return low + rng.uniform(0.0, 1.0, (count, 2)) * span
+    if pattern == "grid":
+        columns = max(1, math.ceil(math.sqrt(count * span[0] / span[1])))
+        rows = max(1, math.ceil(count / columns))
+        index = np.arange(count)
+        cells = np.column_stack([index % columns, index // columns]) + 0.5
+        return low + cells * span / (columns, rows)
+    if pattern == "spiral":
+        ring = 1
+        while ring * _spiral_levels(ring, 1.0, 0)[2][0] < count:
+            ring += 1
+        # Nested rings reach out to the sum of their radii
+        reach = sum(_spiral_levels(ring, 1.0, 0)[1])
+        center = (width / 2, height / 2)
+        return spiral_positions(center, ring, span.min() / 2 / reach)[:count]
+    raise ValueError(f"unknown spawn pattern {pattern!r}")
+
+@dataclass
+class SpawnGroup:
+    """One spawn_batch call of a scenario"""
+    count: int
+    pattern: str = "uniform"
+    types: Optional[Dict[ObjectType, float]] = None
+
+# Scenario file contents, as loaded by json; also exercised by the tests
+EXAMPLE_SCENARIO = {
+    "seed": 7,
+    "config": {"GRAVITY": 300, "MAX_OBJECTS": 2000},
+    "spawn": [{"count": 1500, "pattern": "grid", "types": {"circle": 3, "square": 1}},
+              {"count": 200, "pattern": "spiral"}],
+}
+
+@dataclass
+class Scenario:
+    """A reproducible scene: a seed, GameConfig overrides and spawn groups.
+
+    Stored as JSON in the shape of EXAMPLE_SCENARIO.
+
+    Group i is spawned from the generator seeded with [seed, i], so adding
+    or resizing one group leaves the others where they were.
+    """
+    seed: int
+    spawn: List[SpawnGroup]
+    config: Dict[str, Any]
+
+    @property
+    def count(self) -> int:
+        return sum(group.count for group in self.spawn)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Scenario":
+        config = dict(data.get("config", {}))
+        for name in config:
+            if not name.isupper() or not hasattr(GameConfig, name):
+                raise ValueError(f"unknown GameConfig setting {name!r}")
+        spawn = []
+        for group in data.get("spawn", []):
+            pattern = group.get("pattern", "uniform")
+            if pattern not in SPAWN_PATTERNS:
+                raise ValueError(f"unknown spawn pattern {pattern!r}")
+            types = group.get("types")
+            spawn.append(SpawnGroup(int(group["count"]), pattern, {
+                ObjectType(name): float(weight) for name, weight in types.items()} if types else None))
+        return cls(int(data["seed"]), spawn, config)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "seed": self.seed,
+            "config": self.config,
+            "spawn": [{"count": group.count, "pattern": group.pattern,
+                       **({"types": {kind.value: weight for kind, weight in group.types.items()}}
+                          if group.types else {})}
+                      for group in self.spawn],
+        }
+
+    @classmethod
+    def load(cls, path: str) -> "Scenario":
+        with open(path) as handle:
+            return cls.from_dict(json.load(handle))
+
+    def save(self, path: str):
+        with open(path, "w") as handle:
+            json.dump(self.to_dict(), handle, indent=2)
+
+    def apply_config(self):
+        """Set the GameConfig overrides; call before creating the simulation"""
+        for name, value in self.config.items():
+            setattr(GameConfig, name, value)
+
+    def populate(self, core: "SimulationCore") -> int:
+        """Seed the global RNGs and spawn every group; returns the objects spawned"""
+        seed_rngs(self.seed)
+        return sum(core.spawn_batch(group.count, group.types, group.pattern, seed=[self.seed, index])
+                   for index, group in enumerate(self.spawn))
+
+def run_headless(object_count: int, steps: int, dt: float = 1 / GameConfig.FPS,
+                 recorder: Optional[Recorder] = None, pattern: str = "uniform",
+                 scenario: Optional[Scenario] = None) -> Dict[str, float]:
+    """Step a SimulationCore with no display and report raw throughput"""
+    core = SimulationCore()
+    if scenario is not None:
+        scenario.populate(core)
+    else:
+        core.spawn_batch(object_count, pattern=pattern)
+
+    try:
+        start = time.perf_counter()
+        for _ in range(steps):
+            core.step(dt)
+            if recorder is not None:
+                recorder.record(core.steps, core.record_rows())
+        elapsed = time.perf_counter() - start
+    finally:
+        core.close()
+        if recorder is not None:
+            recorder.close()
+
+    return {
+        "objects": len(core.objects),
+        "steps": steps,
+        "seconds": elapsed,
+        "steps_per_second": steps / elapsed if elapsed > 0 else float("inf"),
+        "total_collisions": core.stats.total_collisions,
+        "rested": core.stats.rested_count,
+        "mean_time_to_rest": core.stats.mean_time_to_rest,
+        "resting": core.stats.resting,
+        "sleeping": core.stats.sleeping,
+    }
+
 if __name__ == "__main__":
-    # Initialize and run the enhanced simulation
-    simulation = BouncingSimulation()
-    simulation.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Advanced bouncing simulation")
+    parser.add_argument("--headless", action="store_true",
+                        help="step the simulation without a window and report steps/sec")
+    parser.add_argument("--objects", type=int, default=100,
+                        help="objects to spawn in headless and offscreen mode")
+    parser.add_argument("--pattern", choices=SPAWN_PATTERNS, default="uniform",
+                        help="where those objects are placed")
+    parser.add_argument("--scenario", metavar="PATH",
+                        help="spawn the scene described by a scenario JSON file instead")
+    parser.add_argument("--max-objects", type=int, help="override GameConfig.MAX_OBJECTS")
+    parser.add_argument("--steps", type=int, default=1000, help="steps to run in headless mode")
+    parser.add_argument("--dt", type=float, help="seconds per step in headless mode (default 1/FPS)")
+    parser.add_argument("--ccd", action="store_true", default=None,
+                        help="continuous (swept) collision detection, for larger steps")
+    parser.add_argument("--backend", choices=["object", "numpy", "parallel"],
+                        help=f"physics backend (default: {GameConfig.PHYSICS_BACKEND})")
+    parser.add_argument("--workers", type=int,
+                        help=f"worker processes for the parallel backend (default: {GameConfig.PHYSICS_WORKERS})")
+    parser.add_argument("--seed", type=int, help="seed the RNGs so the run can be repeated")
+    parser.add_argument("--record", metavar="PATH", help="record every physics step to PATH")
+    parser.add_argument("--replay", metavar="PATH", help="play back a recording instead of simulating")
+    parser.add_argument("--telemetry", metavar="PATH",
+                        help="stream stats samples to PATH (.jsonl, otherwise binary records)")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="on exit, write per-phase frame timings to PATH (.json or .csv)")
+    parser.add_argument("--offscreen", metavar="DIR",
+                        help="render frames without a window into DIR as fast as possible")
+    parser.add_argument("--frames", type=int, default=600, help="frames to render in offscreen mode")
+    parser.add_argument("--format", choices=["png", "raw"], default="png",
+                        help="offscreen frame format")
+    parser.add_argument("--sim-thread", action="store_true", default=None,
+                        help="run physics on its own thread, decoupled from rendering")
+    args = parser.parse_args()
+    scenario = Scenario.load(args.scenario) if args.scenario else None
+    if scenario is not None:
+        scenario.apply_config()
+    # Options given on the command line win over the scenario's config, the rest keep it
+    for name, value in (("PHYSICS_BACKEND", args.backend), ("PHYSICS_WORKERS", args.workers),
+                        ("TELEMETRY_PATH", args.telemetry), ("SIMULATION_THREAD", args.sim_thread),
+                        ("CONTINUOUS_COLLISION", args.ccd)):
+        if value is not None:
+            setattr(GameConfig, name, value)
+
+    if args.replay:
+        ReplayPlayer(ReplayFile(args.replay)).run()
+    else:
+        if scenario is not None:
+            scenario.seed = args.seed if args.seed is not None else scenario.seed
+            seed = scenario.seed
+        else:
+            seed = args.seed if args.seed is not None else new_seed()
+        seed_rngs(seed)
+        if args.max_objects is not None:
+            GameConfig.MAX_OBJECTS = args.max_objects
+        elif scenario is not None:
+            if "MAX_OBJECTS" not in scenario.config:
+                GameConfig.MAX_OBJECTS = max(GameConfig.MAX_OBJECTS, scenario.count)
+        elif args.headless or args.offscreen:
+            GameConfig.MAX_OBJECTS = max(GameConfig.MAX_OBJECTS, args.objects)
+        step_dt = (args.dt or 1 / GameConfig.FPS) if args.headless else 1.0 / GameConfig.PHYSICS_HZ
+        recorder = create_recorder(args.record, step_dt, seed) if args.record else None
+
+        if args.headless:
+            result = run_headless(args.objects, args.steps, step_dt, recorder, args.pattern, scenario)
+            print(f"{result['objects']} objects, {result['steps']} steps in {result['seconds']:.2f}s "
+                  f"({result['steps_per_second']:.1f} steps/sec, {result['total_collisions']} collisions)")
+        elif args.offscreen:
+            simulation = BouncingSimulation(
+                recorder=recorder, screen=pygame.Surface((GameConfig.WIDTH, GameConfig.HEIGHT)),
+                threaded=False)
+            if scenario is not None:
+                scenario.populate(simulation.core)
+            else:
+                simulation.core.spawn_batch(args.objects, pattern=args.pattern)
+            encoder = FrameEncoder(args.offscreen, GameConfig.WIDTH, GameConfig.HEIGHT, args.format)
+            start = time.perf_counter()
+            simulation.run_offscreen(args.frames, encoder)
+            elapsed = time.perf_counter() - start
+            print(f"Rendered {args.frames} frames to {args.offscreen} in {elapsed:.2f}s "
+                  f"({args.frames / elapsed:.1f} frames/sec)")
+            if args.profile:
+                simulation.profiler.export(args.profile)
+        else:
+            # Initialize and run the enhanced simulation
+            simulation = BouncingSimulation(recorder=recorder)
+            if scenario is not None:
+                scenario.populate(simulation.core)
+            simulation.run()
+            if args.profile:
+                simulation.profiler.export(args.profile)
+        if args.record:
+            print(f"Recorded {recorder.frames} steps to {args.record} (seed {seed})")